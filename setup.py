@@ -8,5 +8,5 @@ setup(
     install_requires=[
         "PyQt5>=5.15.0",
     ],
-    python_requires=">=3.8",
+    python_requires=">=3.9",
 )
\ No newline at end of file
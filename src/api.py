@@ -1,10 +1,10 @@
 from parameter_set import get_algorithm_params
 from size_calculator import calculate_dimensions, parse_input
 from time_calculator import calculate_time
-from decryption_failure_calculator import compute_failure_probability
+from decryption_failure_calculator import compute_failure_probability, CANCELLED
 from utils import process_params
 
-def evaluate_performance(algorithm: str, params: list, eval_type: str) -> str:
+def evaluate_performance(algorithm: str, params: list, eval_type: str, progress=None, cancel=None) -> str:
     """
     接口函数：根据算法名称、参数列表和评估类型，执行对应的评估逻辑。
 
@@ -12,6 +12,8 @@ def evaluate_performance(algorithm: str, params: list, eval_type: str) -> str:
       algorithm: 算法名称
       params: 参数值列表，与 get_algorithm_params 返回的顺序一致
       eval_type: 评估类型，可为 "性能评估" 或 "正确性评估"
+      progress: 正确性评估的进度回调，接收 failure.progress.ProgressEvent
+      cancel: 正确性评估的取消令牌 failure.progress.CancelToken
 
     返回:
       一个字符串，包含选择的评估类型下对应内容。
@@ -62,8 +64,11 @@ def evaluate_performance(algorithm: str, params: list, eval_type: str) -> str:
     # === 正确性评估 ===
     elif eval_type == "正确性评估":
         try:
-            failure_prob_output = compute_failure_probability(algorithm, input_params)
-            result_text += f"\n解密失败概率评估:\n2^({failure_prob_output})\n"
+            failure_prob_output = compute_failure_probability(algorithm, input_params, progress=progress, cancel=cancel)
+            if failure_prob_output == CANCELLED:
+                result_text += f"\n解密失败概率评估:\n{CANCELLED}\n"
+            else:
+                result_text += f"\n解密失败概率评估:\n2^({failure_prob_output})\n"
         except Exception as e:
             result_text += f"计算解密失败概率时发生错误: {e}\n"
 
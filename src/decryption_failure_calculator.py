@@ -1,10 +1,25 @@
 # decryption_failure_calculator.py
 import importlib
 import traceback
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from failure.progress import Cancelled
 
-def compute_failure_probability(algorithm, recommended_params):
+# 计算被 CancelToken 取消时的返回值
+CANCELLED = "计算已取消"
+
+def compute_failure_probability(algorithm, recommended_params, mode="float", progress=None, cancel=None):
     """
     根据算法和推荐参数调用对应的解密失败概率计算模块
+
+    mode : "float" 浮点分布卷积；"exact" 精确整数计算；"saddlepoint" 鞍点法快速估计；
+           "log" 对数域分布卷积，尾部可低至 2^-1000 以下
+           （后三种仅 LWE/LWR/RLWE_2n/MLWE_2n/RLWR/MLWR）
+           float 的返回值附带 upper（严格上界）与 error（upper - 估计值）属性；
+           saddlepoint 的返回值附带 upper（Chernoff 上界）与 chernoff_gap 属性，不给出误差界
+    progress : 进度回调，在计算线程中以 failure.progress.ProgressEvent 调用
+               （阶段、完成比例、剩余时间估计、当前支撑大小）
+    cancel : failure.progress.CancelToken，取消后计算在下一个检查点停止
     """
 
     try:
@@ -13,13 +28,69 @@ def compute_failure_probability(algorithm, recommended_params):
             return f"无对应的解密失败概率模块{module_name}"
 
         failure_module = importlib.import_module(module_name)
-        return failure_module.compute_failure_probability(**recommended_params)
+        return failure_module.compute_failure_probability(mode=mode, **_with_progress(recommended_params, progress, cancel))
 
+    except Cancelled:
+        return CANCELLED
     except Exception as e:
         traceback.print_exc()
         return f"调用解密失败概率模块时发生错误: {e}"
 
 
+def compute_failure_curve(algorithm, recommended_params, progress=None, cancel=None):
+    """
+    一次构建误差分布，返回所有阈值下的失败概率曲线 (t, log2 失败概率)，
+    用于阈值扫描（仅 LWE/LWR/RLWE_2n/MLWE_2n/RLWR/MLWR）
+
+    progress、cancel 见 compute_failure_probability
+    """
+
+    try:
+        module_name = _select_failure_module(algorithm, recommended_params)
+        if module_name is None:
+            return f"无对应的解密失败概率模块{module_name}"
+
+        failure_module = importlib.import_module(module_name)
+        if not hasattr(failure_module, "compute_failure_curve"):
+            return f"该方案不支持失败概率曲线: {algorithm}"
+        return failure_module.compute_failure_curve(**_with_progress(recommended_params, progress, cancel))
+
+    except Cancelled:
+        return CANCELLED
+    except Exception as e:
+        traceback.print_exc()
+        return f"调用解密失败概率模块时发生错误: {e}"
+
+
+def compute_failure_probabilities(jobs, mode="float", max_workers=None, progress=None, cancel=None):
+    """
+    在线程池中批量计算多组参数的解密失败概率
+
+    jobs : [(algorithm, recommended_params), ...]
+    返回与 jobs 同序的列表，每项同 compute_failure_probability 的返回值
+    progress : 进度回调 progress(j, event)，j 为任务在 jobs 中的下标
+    cancel : CancelToken，一次取消整批任务
+
+    各线程共享进程内的幂表缓存与卷积代价模型，NumPy 卷积与 FFT 计算时释放 GIL；
+    3n 方案在线程内串行计算（processes=1），不再从多线程进程中 fork 进程池
+    """
+
+    jobs = [(algorithm, {"processes": 1, **params}) for algorithm, params in jobs]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(compute_failure_probability, algorithm, params, mode,
+                               None if progress is None else partial(progress, j), cancel)
+                   for j, (algorithm, params) in enumerate(jobs)]
+        return [f.result() for f in futures]
+
+
+def _with_progress(params, progress, cancel):
+    """
+    把进度回调与取消令牌并入参数（未指定时保留 params 中已有的）
+    """
+    extra = {key: value for key, value in (("progress", progress), ("cancel", cancel)) if value is not None}
+    return {**params, **extra} if extra else params
+
+
 def _select_failure_module(algorithm, params):
     """
     根据算法名 + 参数结构，选择正确的 failure 模块
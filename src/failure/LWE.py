@@ -1,37 +1,47 @@
 from .util import *
 from types import SimpleNamespace
 
-def lwe_final_error_distribution(ps):
+def lwe_error_terms(ps, exact=False):
     """
-    Compute the final decryption error distribution for standard LWE.
-    M = <E,R> - <S,E1> + E2
+    标准 LWE 最终误差 M = <E,R> - <S,E1> + E2 拆成的独立项
+
+    返回 [(分布, 重复次数), ...]；exact=True 时各分布为 ExactLaw
     """
     # 建立噪声分布
-    chis = build_centered_binomial_law(ps.ks)        # s的分布
-    chie_pk = build_centered_binomial_law(ps.ke_pk)     # e的分布
-    chir = build_centered_binomial_law(ps.kr)        # 临时秘密r的分布
-    chie = build_centered_binomial_law(ps.ke)        # 临时噪声e1,e2的分布
-
+    chis = build_centered_binomial_law(ps.ks, exact)        # s的分布
+    chie_pk = build_centered_binomial_law(ps.ke_pk, exact)     # e的分布
+    chir = build_centered_binomial_law(ps.kr, exact)        # 临时秘密r的分布
+    chie = build_centered_binomial_law(ps.ke, exact)        # 临时噪声e1,e2的分布
 
     # ----------- 乘积噪声 ① <E, r> -----------
     prod_Er = law_product(chie_pk, chir)
-    inner_Er = iter_law_convolution(prod_Er, ps.n)
 
     # ----------- 乘积噪声 ② <s, e1> -----------
     prod_se = law_product(chis, chie)
-    inner_se = iter_law_convolution(prod_se, ps.n)
 
-    # 两个内积噪声相加（减号在对称分布下等价）
-    inner_noise = law_convolution(inner_Er, inner_se)
+    # 两个内积噪声相加（减号在对称分布下等价），再加上加性噪声 ③ e2
+    return [(prod_Er, ps.n), (prod_se, ps.n), (chie, 1)]
 
-    # ----------- 加性噪声 ③ e2 -----------
-    final_error = law_convolution(inner_noise, chie)
-
-    return final_error
+def lwe_final_error_distribution(ps):
+    """
+    Compute the final decryption error distribution for standard LWE.
+    M = <E,R> - <S,E1> + E2
+    """
+    return sum_error_terms(lwe_error_terms(ps), *resolve_options(ps))
 
-def compute_failure_probability(**params):
+def compute_failure_probability(mode="float", **params):
+    """
+    mode 与 params 中的可选项见 failure_probability_by_mode / resolve_options
+    """
     ps = SimpleNamespace(**params)
-    F = lwe_final_error_distribution(ps)
-    proba = tail_probability(F, ps.threshold)
-    return log(proba)/log(2)
+    return failure_probability_by_mode(mode, ps, lwe_error_terms)
 
+def compute_failure_curve(**params):
+    """
+    一次构建最终误差分布，返回所有阈值下的失败概率曲线
+
+    返回 (t, log2 失败概率)，第 j 项与 threshold=t[j] 时 compute_failure_probability 的结果一致；
+    params 中的 threshold 不参与计算
+    """
+    ps = SimpleNamespace(**params)
+    return failure_curve(lwe_final_error_distribution(ps))
@@ -2,29 +2,30 @@ from .util import *
 from types import SimpleNamespace
 
 # ============================================================
-# LWR 最终解密误差分布
+# LWR 最终解密误差的独立项
 # ============================================================
-def lwr_final_error_distribution(ps):
+def lwr_error_terms(ps, exact=False):
     """
-    计算标准 LWR 的最终解密误差分布
+    标准 LWR 最终解密误差拆成的独立项
 
     在 LWR 中不存在显式噪声 e，
     所有噪声均来源于模数切换（取整）误差。
 
     误差模型：
         M = <ε_E, r> - <s, ε_E1> + ε_E2
-    """
 
+    返回 [(分布, 重复次数), ...]；exact=True 时各分布为 ExactLaw
+    """
     q  = ps.q          # 原模数
     rq = ps.p         # 压缩模数（如 p）
 
-    chis = build_centered_binomial_law(ps.ks)  # s的分布
-    chir = build_centered_binomial_law(ps.kr)  # 临时秘密r的分布
+    chis = build_centered_binomial_law(ps.ks, exact)  # s的分布
+    chir = build_centered_binomial_law(ps.kr, exact)  # 临时秘密r的分布
 
     # --------------------------------------------------------
     # 模数切换误差分布（LWR 的“噪声分布”）
     # --------------------------------------------------------
-    chi_ms = build_mod_switching_error_law(q, rq)
+    chi_ms = build_mod_switching_error_law(q, rq, exact)
 
     # --------------------------------------------------------
     # ① <ε_E, r>
@@ -32,37 +33,46 @@ def lwr_final_error_distribution(ps):
     # 因此 r 对应的噪声仍然是 chi_ms
     # --------------------------------------------------------
     prod_Er = law_product(chi_ms, chir)
-    inner_Er = iter_law_convolution(prod_Er, ps.n)
 
     # --------------------------------------------------------
     # ② <s, ε_E1>
     # s 是均匀秘密，但误差仍由取整产生
     # --------------------------------------------------------
     prod_se = law_product(chi_ms, chis)
-    inner_se = iter_law_convolution(prod_se, ps.n)
 
-    # 内积噪声合并（减号在对称分布下等价）
-    inner_noise = law_convolution(inner_Er, inner_se)
+    # 内积噪声合并（减号在对称分布下等价），
+    # 再加上 ③ 加性模数切换误差 ε_E2
+    return [(prod_Er, ps.n), (prod_se, ps.n), (chi_ms, 1)]
 
-    # --------------------------------------------------------
-    # ③ 加性模数切换误差 ε_E2
-    # --------------------------------------------------------
-    final_error = law_convolution(inner_noise, chi_ms)
 
-    return final_error
+# ============================================================
+# LWR 最终解密误差分布
+# ============================================================
+def lwr_final_error_distribution(ps):
+    """
+    计算标准 LWR 的最终解密误差分布，误差模型见 lwr_error_terms
+    """
+    return sum_error_terms(lwr_error_terms(ps), *resolve_options(ps))
 
 
 # ============================================================
 # LWR 解密失败概率
 # ============================================================
-def compute_failure_probability(**params):
+def compute_failure_probability(mode="float", **params):
     """
     计算 LWR 解密失败概率
+
+    mode 与 params 中的可选项见 failure_probability_by_mode / resolve_options
     """
     ps = SimpleNamespace(**params)
-    F = lwr_final_error_distribution(ps)
+    return failure_probability_by_mode(mode, ps, lwr_error_terms)
 
-    # 判决阈值与 LWE 类似，只是参数来源不同
-    proba = tail_probability(F, ps.threshold)
+def compute_failure_curve(**params):
+    """
+    一次构建最终误差分布，返回所有阈值下的失败概率曲线
 
-    return log(proba)/log(2)
+    返回 (t, log2 失败概率)，第 j 项与 threshold=t[j] 时 compute_failure_probability 的结果一致；
+    params 中的 threshold 不参与计算
+    """
+    ps = SimpleNamespace(**params)
+    return failure_curve(lwr_final_error_distribution(ps))
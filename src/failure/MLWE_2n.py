@@ -1,29 +1,32 @@
-from .util import *
+from math import ceil, log
 from types import SimpleNamespace
 
-def mlwe_final_error_distribution(ps):
+from .util import *
+
+def mlwe_error_terms(ps, exact=False):
     """
-    构建二次分圆环 (X^n+1) 上、模 2 消息编码的 MLWE 加密方案最终误差分布
+    二次分圆环 (X^n+1) 上、模 2 消息编码的 MLWE 加密方案最终误差的独立项
     噪声模型：r*e - s*(e1+e'') + e2 + e'
+
+    返回 [(分布, 重复次数), ...]；exact=True 时各分布为 ExactLaw
     """
-    if ps.ke_ct is None:
-        ps.ke_ct = ps.ke
-    if ps.rqk is None:
-        ps.rqk = 2 ** ceil(log(ps.q, 2))
+    # 缺省值只在本地补全，不改动 ps（同一参数集可被多个线程同时计算）
+    ke_ct = ps.ke if ps.ke_ct is None else ps.ke_ct
+    rqk = 2 ** ceil(log(ps.q, 2)) if ps.rqk is None else ps.rqk
 
     # ===============================
     # 基础噪声分布
     # ===============================
-    dist_s  = build_centered_binomial_law(ps.ks)        # s
-    dist_e1 = build_centered_binomial_law(ps.ke_ct)     # e1, e2
-    dist_ep = build_centered_binomial_law(ps.ke)        # e
-    dist_r  = build_centered_binomial_law(ps.ks)        # r
+    dist_s  = build_centered_binomial_law(ps.ks, exact)        # s
+    dist_e1 = build_centered_binomial_law(ke_ct, exact)        # e1, e2
+    dist_ep = build_centered_binomial_law(ps.ke, exact)        # e
+    dist_r  = build_centered_binomial_law(ps.ks, exact)        # r
 
     # ===============================
     # 模切换误差分布
     # ===============================
-    err_pk = build_mod_switching_error_law(ps.q, ps.rqk)   # 公钥模切换（不压缩为 0）
-    err_u  = build_mod_switching_error_law(ps.q, ps.rqc)   # u 的模切换误差
+    err_pk = build_mod_switching_error_law(ps.q, rqk, exact)      # 公钥模切换（不压缩为 0）
+    err_u  = build_mod_switching_error_law(ps.q, ps.rqc, exact)   # u 的模切换误差
 
     # ===============================
     # 合成中间分布
@@ -37,31 +40,39 @@ def mlwe_final_error_distribution(ps):
     term_re = law_product(dist_ep, law_r_eff)              # e * r
     term_se = law_product(dist_s,  law_e_eff)              # s * (e1+e'')
 
-    # ===============================
-    # n·m 次累加
-    # ===============================
-    acc_re = iter_law_convolution(term_re, ps.m * ps.n)
-    acc_se = iter_law_convolution(term_se, ps.m * ps.n)
-
-    mix_core = law_convolution(acc_re, acc_se)
-
     # ===============================
     # 最终误差项
     # ===============================
-    err_v = build_mod_switching_error_law(ps.q, ps.rq2)    # v 的模切换误差
+    err_v = build_mod_switching_error_law(ps.q, ps.rq2, exact)    # v 的模切换误差
     tail  = law_convolution(err_v, dist_e1)                # e2 + e'
 
-    final_law = law_convolution(mix_core, tail)
+    # 核心乘积项各做 n·m 次累加
+    return [(term_re, ps.m * ps.n), (term_se, ps.m * ps.n), (tail, 1)]
 
-    return final_law
+
+def mlwe_final_error_distribution(ps):
+    """
+    构建二次分圆环 (X^n+1) 上、模 2 消息编码的 MLWE 加密方案最终误差分布
+    噪声模型见 mlwe_error_terms
+    """
+    return sum_error_terms(mlwe_error_terms(ps), *resolve_options(ps))
 
 
-def compute_failure_probability(**params):
+def compute_failure_probability(mode="float", **params):
     """
     计算最终误差超过阈值的失败概率（以 log2 表示）
+
+    mode 与 params 中的可选项见 failure_probability_by_mode / resolve_options
     """
     ps = SimpleNamespace(**params)
-    err_dist = mlwe_final_error_distribution(ps)
-    fail_p   = tail_probability(err_dist, ps.threshold)
+    return failure_probability_by_mode(mode, ps, mlwe_error_terms, ps.n)
+
+def compute_failure_curve(**params):
+    """
+    一次构建最终误差分布，返回所有阈值下的失败概率曲线
 
-    return log(ps.n * fail_p) / log(2)
+    返回 (t, log2 失败概率)，第 j 项与 threshold=t[j] 时 compute_failure_probability 的结果一致；
+    params 中的 threshold 不参与计算
+    """
+    ps = SimpleNamespace(**params)
+    return failure_curve(mlwe_final_error_distribution(ps), ps.n)
@@ -1,9 +1,19 @@
+import logging
 import math
-from .util import *
-from collections import defaultdict
-from multiprocessing import Pool, cpu_count
+from contextlib import ExitStack, closing
 from types import SimpleNamespace
 
+import numpy as np
+
+from .util import *
+from .law import as_symmetric
+from .fft import fused_tails
+from .shared import SharedLaws, attach_laws
+from .executor import map_tasks
+from .progress import NO_PROGRESS, as_progress
+
+logger = logging.getLogger(__name__)
+
 # 噪声为r*e-s*(e1+e'')+e2+e'
 
 
@@ -12,49 +22,33 @@ from types import SimpleNamespace
 # ===============================
 # c'
 def build_re_table1(sigma):
-    print("[ENTER] build_re_table1, sigma =", sigma)
+    logger.debug("build_re_table1, sigma = %s", sigma)
     # e ~ 离散高斯
     e_dist = build_discrete_gaussian_law(sigma)  #[-6,6]
     # r ~ 离散高斯
     r_dist = build_discrete_gaussian_law(sigma)
 
     # 构建乘积分布
-    law = defaultdict(float)
-
-    for a1, p1 in e_dist.items():
-        for a2, p2 in e_dist.items():
-            for b1, p3 in r_dist.items():
-                for b2, p4 in r_dist.items():
-                    val = a1 * a2 + b1 * b2
-                    law[val] += p1 * p2 * p3 * p4
-
-    return dict(law)
+    law = quadratic_form_law(e_dist, r_dist)
+    return as_symmetric(law)
 
 # c
 def build_re_table2(sigma):
-    print("[ENTER] build_re_table2, sigma =", sigma)
+    logger.debug("build_re_table2, sigma = %s", sigma)
     # e ~ 离散高斯
     e_dist = build_discrete_gaussian_law(sigma)
     # r ~ 离散高斯
     r_dist = build_discrete_gaussian_law(sigma)
 
-    law = defaultdict(float)
-
-    for a1, p1 in e_dist.items():
-        for a2, p2 in e_dist.items():
-            for b1, p3 in r_dist.items():
-                for b2, p4 in r_dist.items():
-                    val = (a1 * b1) + b2 * (a1 + a2)
-                    law[val] += p1 * p2 * p3 * p4
-    law = dict(law)
-    return law
+    law = quadratic_form_law(e_dist, r_dist, mixed=True)
+    return as_symmetric(law)
 
 
 # ===============================
 # RLWE-3n 噪声基本项s*(e1+e'')
 # ===============================
 def build_se_table1(sigma, q, rq):
-    print("[ENTER] build_se_table1")
+    logger.debug("build_se_table1, sigma = %s", sigma)
     # s ~ 离散高斯
     s_dist = build_discrete_gaussian_law(sigma)
     # e1 ~ 离散高斯
@@ -65,20 +59,12 @@ def build_se_table1(sigma, q, rq):
     Re_dist = law_convolution(e1_dist, Rc_dist)
 
     # 构建乘积分布
-    law = defaultdict(float)
-
-    for a1, p1 in s_dist.items():
-        for a2, p2 in s_dist.items():
-            for b1, p3 in Re_dist.items():
-                for b2, p4 in Re_dist.items():
-                    val = a1 * a2 + b1 * b2
-                    law[val] += p1 * p2 * p3 * p4
-
-    return dict(law)
+    law = quadratic_form_law(s_dist, Re_dist)
+    return as_symmetric(law)
 
 
 def build_se_table2(sigma, q, rq):
-    print("[ENTER] build_se_table2")
+    logger.debug("build_se_table2, sigma = %s", sigma)
     # s ~ 离散高斯
     s_dist = build_discrete_gaussian_law(sigma)
     # e1 ~ 离散高斯
@@ -88,50 +74,80 @@ def build_se_table2(sigma, q, rq):
     # e1+e''
     Re_dist = law_convolution(e1_dist, Rc_dist)
 
-    law = defaultdict(float)
-
-    for a1, p1 in s_dist.items():
-        for a2, p2 in s_dist.items():
-            for b1, p3 in Re_dist.items():
-                for b2, p4 in Re_dist.items():
-                    val = (a1 * b1) + b2 * (a1 + a2)
-                    law[val] += p1 * p2 * p3 * p4
-
-    return dict(law)
+    law = quadratic_form_law(s_dist, Re_dist, mixed=True)
+    return as_symmetric(law)
 
 # ===============================
 # 多进程调用的循环部分
 # ===============================
-def _compute_single_i(args):
-    i, n, k, threshold, law1, law2, law3, law4, D_lin = args
+def _tail_term(prefix, suffix, threshold):
+    """
+    单个 i 的尾概率
 
-    D_re1 = iter_law_convolution(law1, i * k)
-    D_re2 = iter_law_convolution(law2, (n // 2 - i) * k)
-    D_re = law_convolution(D_re1, D_re2)
+    prefix 为 (law1 + law3)^(i·k)，suffix 为 (law2 + law4)^((n/2-i)·k) + D_lin，
+    均由沿 i 的递推给出，这里只做最后一次卷积
+    """
+    D = law_convolution(prefix, suffix)
 
-    D_se1 = iter_law_convolution(law3, i * k)
-    D_se2 = iter_law_convolution(law4, (n // 2 - i) * k)
-    D_se = law_convolution(D_se1, D_se2)
+    tail_prob = float(D.probs[np.abs(D.support()) > threshold].sum())
 
-    D = law_convolution(D_re, D_se)
-    D = law_convolution(D, D_lin)
+    return tail_prob
 
-    tail_prob = 0.0
-    for x, p in D.items():
-        if abs(x) > threshold:
-            tail_prob += p
 
-    return math.log1p(-2 * tail_prob)
+def _compute_single_i(args):
+    """
+    工作进程中的单个 i，前缀与后缀从共享内存中的分布表取得，任务只传元数据
+    """
+    name, spec, threshold = args
+    _, (prefix, suffix) = attach_laws(name, spec)
+    return _tail_term(prefix, suffix, threshold)
+
+
+def _sweep_tails(U, V, D_lin, n, k, threshold, processes=None, progress=NO_PROGRESS):
+    """
+    逐个位置卷积求尾概率（method="sweep"）
+
+    前缀 U^(ik) 沿 i 递增、后缀 V^((n/2-i)k) + D_lin 沿 i 递减逐步递推，
+    每步只与 U^k 或 V^k 卷积一次，不再对每个 i 重新求幂
+    """
+    prefixes = list(iter_power_sweep(U, k, n // 2, progress=progress, stage="prefixes"))
+    suffixes = list(iter_power_sweep(V, k, n // 2 + 1, start=D_lin, progress=progress, stage="suffixes"))[::-1]
+
+    #这部分在共用的进程池中并行（见 failure.executor）；processes 限制并发，
+    #processes=1 时在调用线程内串行计算（供线程池批量调用）
+    #分布表只放进共享内存一次，工作进程零拷贝挂接，任务只传元数据
+    tails = []
+    with ExitStack() as stack:
+        if processes != 1:
+            shared = stack.enter_context(SharedLaws(prefixes + suffixes[:n // 2]))
+            args = [(shared.name, [shared.spec[i], shared.spec[n // 2 + i]], threshold) for i in range(n // 2)]
+            # 每个任务同时持有前缀、后缀、二者的卷积及其支撑点
+            task_bytes = 32 * (len(prefixes[-1]) + len(suffixes[0]))
+            # 取消时关闭生成器，尚未开始的任务随之撤销
+            results = stack.enter_context(closing(map_tasks(_compute_single_i, args, task_bytes, processes)))
+        else:
+            results = (_tail_term(prefixes[i], suffixes[i], threshold) for i in range(n // 2))
+        progress.update("positions", 0, n // 2)
+        for cnt, val in enumerate(results, 1):
+            tails.append(val)
+            logger.info("finished %d/%d", cnt, n // 2)
+            progress.update("positions", cnt, n // 2, len(prefixes[cnt - 1]) + len(suffixes[cnt - 1]) - 1)
+    return np.array(tails)
 
 # ============================================================
 # MLWE-3n 解密失败概率计算
 # ============================================================
-def compute_failure_probability(**params):
+def compute_failure_probability(mode="float", **params):
     """
     参数 ps : ParameterSet
         参数集合，需包含：
             ps.n : 环维度 n
             ps.q : 模数 q
+        可选 ps.method："fused"（默认）变换域批量计算，"sweep" 逐个位置卷积
+        可选 ps.processes：sweep 的并发任务数上限，默认由 failure.executor 按工作
+        进程数与内存预算决定，1 为当前线程内串行
+        可选 ps.progress：进度回调，接收 ProgressEvent；ps.cancel：CancelToken，
+        取消后抛出 Cancelled，未开始的任务不再执行
 
     返回 log_p_success : float
         解密成功概率的自然对数 ln(P_success)
@@ -140,11 +156,14 @@ def compute_failure_probability(**params):
         解密失败概率的以 2 为底的对数 log2(P_failure)
         （当失败概率极小时，使用近似公式计算）
     """
-    print("[ENTER] mlwe_3n_failure_probability")
+    if mode != "float":
+        raise ValueError(f"该方案不支持计算模式: {mode}")
     ps = SimpleNamespace(**params)
+    logger.debug("mlwe_3n_failure_probability, n = %s, k = %s", ps.n, ps.k)
     n, q, k, threshold = ps.n, ps.q, ps.k, ps.threshold
     sigma = ps.psi_1
     rqc, rq2 = ps.rqc, ps.rq2
+    progress = as_progress(getattr(ps, "progress", None), getattr(ps, "cancel", None))
 
     # 两类噪声项对应的概率分布表
     # law1：对应 (a1*a2 + b1*b2) 形式的二次项
@@ -165,21 +184,25 @@ def compute_failure_probability(**params):
     # 对应 Sage 代码中的：
     #   for i in range(0, n/2):
     #       p *= (1 - 2*sum)
+    #
+    # 第 i 项为 law1^(ik) + law2^((n/2-i)k) + law3^(ik) + law4^((n/2-i)k) + D_lin，
+    # 幂次相同的两项先合并为 U、V
     # ------------------------------------------------------------
-    args = [
-        (i, n, k, threshold, law1, law2, law3, law4, D_lin)
-        for i in range(0, n // 2)
-    ]
-
-    log_p_success = 0.0
+    U = law_convolution(law1, law3)
+    V = law_convolution(law2, law4)
+
+    # "fused"：所有 i 在变换域中一起计算（见 fused_tails），尾部不受剪枝影响；
+    # "sweep"：沿 i 递推逐个卷积（见 _sweep_tails）
+    method = getattr(ps, "method", "fused")
+    if method == "fused":
+        counts = [(i * k, (n // 2 - i) * k, 1) for i in range(n // 2)]
+        tails, _ = fused_tails([U, V, D_lin], counts, threshold, progress)
+    elif method == "sweep":
+        tails = _sweep_tails(U, V, D_lin, n, k, threshold, getattr(ps, "processes", None), progress)
+    else:
+        raise ValueError(f"未知的计算方法: {method}")
 
-    #这部分改为多进程加速运行
-    with Pool(processes=cpu_count()) as pool:
-        for cnt, val in enumerate(
-                pool.imap_unordered(_compute_single_i, args), 1
-        ):
-            log_p_success += val
-            print(f"[PROGRESS] finished {cnt}/{n // 2}")
+    log_p_success = float(np.log1p(-2 * tails).sum())
 
     # ------------------------------------------------------------
     # 第二部分：最后一项
@@ -188,22 +211,8 @@ def compute_failure_probability(**params):
     #   p *= (1 - 2*sum)^(n/2)
     # ------------------------------------------------------------
 
-    # 计算r*e的c^(n/2),得到r*e下半部分每一个元素的分布
-    D_re_last = iter_law_convolution(law2, n // 2 * k)
-
-    # 计算s*(e1+e'')的c^(n/2)，得到s*(e1+e'')下半部分每一个元素的分布
-    D_se_last = iter_law_convolution(law4, n // 2 * k)
-
-    # 计算r*e+s*(e1+e'')的下半部分每一个元素的分布
-    D_mul_last = law_convolution(D_re_last, D_se_last)
-
-    # 计算r*e+s*(e1+e'')+（e2+e'）的下半部分每一个元素的分布
-    D_last = law_convolution(D_mul_last, D_lin)
-
-    tail_last = 0.0
-    for x, p in D_last.items():
-        if abs(x) > threshold:
-            tail_last += p
+    # r*e+s*(e1+e'')+（e2+e'）的下半部分每一个元素的分布即 i = 0 的一项
+    tail_last = float(tails[0])
 
     log_p_success += (n // 2) * math.log1p(-2 * tail_last)
 
@@ -1,42 +1,53 @@
 from .util import *
 from types import SimpleNamespace
 
-def mlwr_final_error_distribution(ps):
+def mlwr_error_terms(ps, exact=False):
     """
-    构建二次分圆环(X^n+1)基于模2消息编码的RLWR加密方案中最终误差的分布
+    二次分圆环(X^n+1)基于模2消息编码的MLWR加密方案中最终误差的独立项
     :param ps: parameter set (ParameterSet) - 需要包含MLWR特定的参数
+    返回 [(分布, 重复次数), ...]；exact=True 时各分布为 ExactLaw
     """
     # MLWR中没有LWE误差分布，只有模切换误差
-    s = build_centered_binomial_law(ps.ks)  # 密钥s的分布
+    s = build_centered_binomial_law(ps.ks, exact)  # 密钥s的分布
 
     # MLWR中的误差来源：
     # 1. 公钥生成时的模约简误差
-    e = build_mod_switching_error_law(ps.q, ps.rqk)  # 公钥模约简误差
+    e = build_mod_switching_error_law(ps.q, ps.rqk, exact)  # 公钥模约简误差
     re = law_product(s,e)
 
-    # 计算
-    D1 = iter_law_convolution(re, ps.m * ps.n)
-
     # 2. 密文生成时的模约简误差
-    e1 = build_mod_switching_error_law(ps.q, ps.rqc)  # 第一密文分量u的模约简误差
+    e1 = build_mod_switching_error_law(ps.q, ps.rqc, exact)  # 第一密文分量u的模约简误差
     re1 = law_product(s,e1)
 
-    D2 = iter_law_convolution(re1, ps.m * ps.n)
+    e2 = build_mod_switching_error_law(ps.q, ps.rq2, exact)  # 第二密文分量v的模约简误差
 
-    D = law_convolution(D1, D2)
+    return [(re, ps.m * ps.n), (re1, ps.m * ps.n), (e2, 1)]
 
-    e2 = build_mod_switching_error_law(ps.q, ps.rq2)  # 第二密文分量v的模约简误差
 
-    D = law_convolution(D, e2)
-
-    return D
+def mlwr_final_error_distribution(ps):
+    """
+    构建二次分圆环(X^n+1)基于模2消息编码的MLWR加密方案中最终误差的分布
+    :param ps: parameter set (ParameterSet) - 需要包含MLWR特定的参数
+    误差模型见 mlwr_error_terms
+    """
+    return sum_error_terms(mlwr_error_terms(ps), *resolve_options(ps))
 
 
-def compute_failure_probability(**params):
+def compute_failure_probability(mode="float", **params):
     """
     计算MLWR最终误差分布在尾部（超过某个阈值）的概率
+
+    mode 与 params 中的可选项见 failure_probability_by_mode / resolve_options
+    """
+    ps = SimpleNamespace(**params)
+    return failure_probability_by_mode(mode, ps, mlwr_error_terms, ps.n)
+
+def compute_failure_curve(**params):
+    """
+    一次构建最终误差分布，返回所有阈值下的失败概率曲线
+
+    返回 (t, log2 失败概率)，第 j 项与 threshold=t[j] 时 compute_failure_probability 的结果一致；
+    params 中的 threshold 不参与计算
     """
     ps = SimpleNamespace(**params)
-    F = mlwr_final_error_distribution(ps)
-    proba = tail_probability(F, ps.threshold)
-    return log(ps.n * proba) / log(2)
\ No newline at end of file
+    return failure_curve(mlwr_final_error_distribution(ps), ps.n)
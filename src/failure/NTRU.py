@@ -1,47 +1,50 @@
-from mpmath import mp
-from .util import *
+from math import log
 
-def log2(x):
-    if x == 0:
-        return 0
-    return mp.log(x, 2)
+from .util import *
+from .loglaw import iter_log_law_convolution, log_dist_scale, log_law_convolution, log_tail_probability
+from .progress import NO_PROGRESS, as_progress
 
-def calculate_decryption_failure_probability(n, q):
+def calculate_decryption_failure_probability(n, q, progress=NO_PROGRESS):
     wt = q // 8 - 2
 
-    # 定义 f 的分布
+    # 定义 f 的分布（对数域计算，尾部低于 float64 下溢阈值也不会丢失）
     t = {0: 1/3, 1: 2/3}
-    Df = iter_law_convolution(t, n - 1)
-    Df = dist_scale(Df, 9)
+    progress.update("terms", 0, 3)
+    Df = iter_log_law_convolution(t, n - 1, progress=progress)
+    progress.update("terms", 1, 3, len(Df))
+    Df = log_dist_scale(Df, 9)
 
     # 定义 g 的分布
     Dg = {9 * wt: 1}
 
     # 计算 one-shot 分布
     t_fm = {-1: 1/3, 0: 1/3, 1: 1/3}
-    Dfm = iter_law_convolution(t_fm, wt)
-    Dfm = dist_scale(Dfm, 3)
+    Dfm = iter_log_law_convolution(t_fm, wt, progress=progress)
+    progress.update("terms", 2, 3, len(Dfm))
+    Dfm = log_dist_scale(Dfm, 3)
 
     t_gr = {-3: 1/2, 3: 1/2}
-    Dgr = iter_law_convolution(t_gr, wt)
-    one_shot_dist = law_convolution(Dfm, Dgr)
+    Dgr = iter_log_law_convolution(t_gr, wt, progress=progress)
+    one_shot_dist = log_law_convolution(Dfm, Dgr)
+    progress.update("terms", 3, 3, len(one_shot_dist))
 
     # 计算阈值
     threshold = q // 2 - 2
 
-    # 计算解密失败概率
-    failure_probability = tail_probability(one_shot_dist, threshold)
-    return failure_probability
+    # 计算解密失败概率（自然对数）
+    return log_tail_probability(one_shot_dist, threshold)
 
-def compute_failure_probability(**params):
+def compute_failure_probability(mode="float", **params):
     '''
     计算解密失败概率，并返回一个格式化的字符串
+    params 可含 progress：进度回调，接收 ProgressEvent；cancel：CancelToken，取消后抛出 Cancelled
     '''
+    if mode != "float":
+        raise ValueError(f"该方案不支持计算模式: {mode}")
     n = int(params.get("n"))
     q = int(params.get("q"))
-    mp.dps = 50  # 设置高精度
-    failure_prob = calculate_decryption_failure_probability(n, q)
+    progress = as_progress(params.get("progress"), params.get("cancel"))
+    log_failure_prob = calculate_decryption_failure_probability(n, q, progress)
     # 计算对数：失败概率的对数形式
-    failure_prob_log2 = -mp.log(failure_prob, 2)
-    failure_prob_log2_float = float(failure_prob_log2)
+    failure_prob_log2_float = -log_failure_prob / log(2)
     return f"Parameters: n={n}, q={q}\nDecryption failure probability: 2^(-{failure_prob_log2_float:.2f})"
@@ -1,42 +1,57 @@
-from .util import *
+from math import ceil, log
 from types import SimpleNamespace
 
-def rlwe_final_error_distribution(ps):
+from .util import *
+
+def rlwe_error_terms(ps, exact=False):
     """
-    构建二次分圆环(X^n+1)基于模2消息编码的MLWE加密方案中最终误差的分布
+    二次分圆环(X^n+1)基于模2消息编码的RLWE加密方案中最终误差的独立项
     :param ps: parameter set (ParameterSet)
     这里假设噪声为r*e-s*(e1+e'')+e2+e'
+    返回 [(分布, 重复次数), ...]；exact=True 时各分布为 ExactLaw
     """
-    if ps.rqk is None:
-        ps.rqk = 2 ** ceil(log(ps.q, 2))
+    # 缺省值只在本地补全，不改动 ps（同一参数集可被多个线程同时计算）
+    rqk = 2 ** ceil(log(ps.q, 2)) if ps.rqk is None else ps.rqk
 
-    chis = build_centered_binomial_law(ps.ks)           # s的分布
-    chie = build_centered_binomial_law(ps.ke)           # e1,e2的分布
-    chie_pk = build_centered_binomial_law(ps.ke)        # e的分布
-    chir = build_centered_binomial_law(ps.ks)           # r的分布
-    Rk = build_mod_switching_error_law(ps.q, ps.rqk)    # 不压缩公钥是0
-    Rc = build_mod_switching_error_law(ps.q, ps.rqc)    # u的模切换误差分布
+    chis = build_centered_binomial_law(ps.ks, exact)           # s的分布
+    chie = build_centered_binomial_law(ps.ke, exact)           # e1,e2的分布
+    chie_pk = build_centered_binomial_law(ps.ke, exact)        # e的分布
+    chir = build_centered_binomial_law(ps.ks, exact)           # r的分布
+    Rk = build_mod_switching_error_law(ps.q, rqk, exact)       # 不压缩公钥是0
+    Rc = build_mod_switching_error_law(ps.q, ps.rqc, exact)    # u的模切换误差分布
     chiRs = law_convolution(chir, Rk)                   # 公钥不压缩时可以理解为r的分布
     chiRe = law_convolution(chie, Rc)                   # e1+e''
 
     B1 = law_product(chie_pk, chiRs)                    # e*r
     B2 = law_product(chis, chiRe)                       # (e1+e'')*s
 
-    C1 = iter_law_convolution(B1, ps.n)
-    C2 = iter_law_convolution(B2, ps.n)
-
-    C = law_convolution(C1, C2)
-
-    R2 = build_mod_switching_error_law(ps.q, ps.rq2)    # v的模切换误差分布
+    R2 = build_mod_switching_error_law(ps.q, ps.rq2, exact)    # v的模切换误差分布
     F = law_convolution(R2, chie)                       # e2+e'
-    D = law_convolution(C, F)                           # Final error
-    return D
+    return [(B1, ps.n), (B2, ps.n), (F, 1)]
 
-def compute_failure_probability(**params):
+def rlwe_final_error_distribution(ps):
+    """
+    构建二次分圆环(X^n+1)基于模2消息编码的RLWE加密方案中最终误差的分布
+    :param ps: parameter set (ParameterSet)
+    误差模型见 rlwe_error_terms
+    """
+    return sum_error_terms(rlwe_error_terms(ps), *resolve_options(ps))
+
+def compute_failure_probability(mode="float", **params):
     """
     计算最终误差分布在尾部（超过某个阈值）的概率
+
+    mode 与 params 中的可选项见 failure_probability_by_mode / resolve_options
+    """
+    ps = SimpleNamespace(**params)
+    return failure_probability_by_mode(mode, ps, rlwe_error_terms, ps.n)
+
+def compute_failure_curve(**params):
+    """
+    一次构建最终误差分布，返回所有阈值下的失败概率曲线
+
+    返回 (t, log2 失败概率)，第 j 项与 threshold=t[j] 时 compute_failure_probability 的结果一致；
+    params 中的 threshold 不参与计算
     """
     ps = SimpleNamespace(**params)
-    F = rlwe_final_error_distribution(ps)
-    proba = tail_probability(F, ps.threshold)
-    return log(ps.n * proba) / log(2)
+    return failure_curve(rlwe_final_error_distribution(ps), ps.n)
@@ -1,9 +1,16 @@
 import math
-from .util import *
-from collections import defaultdict
-from multiprocessing import Pool, cpu_count
+from contextlib import closing
 from types import SimpleNamespace
 
+import numpy as np
+
+from .util import *
+from .law import as_symmetric
+from .fft import fused_tails
+from .shared import SharedLaws, attach_laws
+from .executor import map_tasks
+from .progress import NO_PROGRESS, as_progress
+
 # ===============================
 # 这里假设噪声是gr+fe，且均服从中心二项分布
 # ===============================
@@ -20,54 +27,82 @@ def psi_1_law():
 # ===============================
 def build_table1():
     psi = psi_1_law()
-    law = defaultdict(float)
-
-    for a1, p1 in psi.items():
-        for a2, p2 in psi.items():
-            for b1, p3 in psi.items():
-                for b2, p4 in psi.items():
-                    val = a1*a2 + b1*b2
-                    law[val] += p1*p2*p3*p4
-
-    return dict(law)
+    law = quadratic_form_law(psi, psi)
+    return as_symmetric(law)
 
 def build_table2():
     psi = psi_1_law()
-    law = defaultdict(float)
-
-    for a1, p1 in psi.items():
-        for a2, p2 in psi.items():
-            for b1, p3 in psi.items():
-                for b2, p4 in psi.items():
-                    val = (a1*b1) + b2*(a1 + a2)
-                    law[val] += p1*p2*p3*p4
-    law = dict(law)
-    return law
+    law = quadratic_form_law(psi, psi, mixed=True)
+    return as_symmetric(law)
 
 # ===============================
 # RLWE-3n 解密失败概率计算（多进程版）
 # ===============================
-def _compute_single_i(args):
+def _tail_term(D1, D2, threshold):
     """
     单个 i 下的卷积和尾概率计算
-    """
-    i, n, law1, law2, threshold = args
 
-    # D = law1^(2*i) * law2^(n - 2*i)
-    D1 = iter_law_convolution(law1, 2 * i)
-    D2 = iter_law_convolution(law2, n - 2 * i)
+    D = law1^(2*i) * law2^(n - 2*i)，两个幂由沿 i 的递推给出
+    """
     D = law_convolution(D1, D2)
 
-    tail_prob = sum(p for x, p in D.items() if abs(x) > threshold)
+    tail_prob = float(D.probs[np.abs(D.support()) > threshold].sum())
     return tail_prob
 
-def compute_failure_probability(**params):
+def _compute_single_i(args):
+    """
+    工作进程中的单个 i，两个幂从共享内存中的分布表取得，任务只传元数据
+    """
+    name, spec, threshold = args
+    _, (prefix, suffix) = attach_laws(name, spec)
+    return _tail_term(prefix, suffix, threshold)
+
+def _sweep_tails(law1, law2, n, threshold, processes=None, progress=NO_PROGRESS):
+    """
+    逐个位置卷积求尾概率（method="sweep"）
+
+    law1^(2i) 沿 i 递增、law2^(n-2i) 沿 i 递减逐步递推，
+    每步只与 law1^2 或 law2^2 卷积一次
+    """
+    prefixes = list(iter_power_sweep(law1, 2, n // 2, progress=progress, stage="prefixes"))
+    suffixes = list(iter_power_sweep(law2, 2, n // 2 + 1, progress=progress, stage="suffixes"))[::-1]
+
+    # 使用共用的进程池（见 failure.executor）；processes 限制并发，
+    # processes=1 时在调用线程内串行计算（供线程池批量调用）
+    # 分布表只放进共享内存一次，工作进程零拷贝挂接，任务只传元数据
+    # 每完成一个位置回报进度并检查取消；取消时关闭生成器，尚未开始的任务随之撤销
+    tails = []
+    progress.update("positions", 0, n // 2)
+    if processes != 1:
+        with SharedLaws(prefixes + suffixes[:n // 2]) as shared:
+            args_list = [(shared.name, [shared.spec[i], shared.spec[n // 2 + i]], threshold) for i in range(n // 2)]
+            # 每个任务同时持有两个幂、二者的卷积及其支撑点
+            task_bytes = 32 * (len(prefixes[-1]) + len(suffixes[0]))
+            with closing(map_tasks(_compute_single_i, args_list, task_bytes, processes)) as results:
+                for i, val in enumerate(results):
+                    tails.append(val)
+                    progress.update("positions", i + 1, n // 2, len(prefixes[i]) + len(suffixes[i]) - 1)
+        return tails
+    for i in range(n // 2):
+        tails.append(_tail_term(prefixes[i], suffixes[i], threshold))
+        progress.update("positions", i + 1, n // 2, len(prefixes[i]) + len(suffixes[i]) - 1)
+    return tails
+
+def compute_failure_probability(mode="float", **params):
     """
     多进程版本：加速卷积部分
+    params 可含 method："fused"（默认）变换域批量计算，"sweep" 逐个位置卷积；
+    processes：sweep 的并发任务数上限，默认由 failure.executor 按工作进程数与
+    内存预算决定，1 为当前线程内串行；
+    progress：进度回调，接收 ProgressEvent；cancel：CancelToken，取消后抛出 Cancelled，
+    未开始的任务不再执行
     """
 
+    if mode != "float":
+        raise ValueError(f"该方案不支持计算模式: {mode}")
     ps = SimpleNamespace(**params)
     n, q = ps.n, ps.q
+    progress = as_progress(getattr(ps, "progress", None), getattr(ps, "cancel", None))
 
     # 构建概率分布表
     law1 = build_table1()
@@ -75,22 +110,21 @@ def compute_failure_probability(**params):
 
     threshold = math.floor((q - 3) / 6)
 
-    # 准备参数列表
-    args_list = [(i, n, law1, law2, threshold) for i in range(n // 2)]
-
-    log_p_success = 0.0
-
-    # 使用多进程
-    with Pool(cpu_count()) as pool:
-        tail_probs = pool.map(_compute_single_i, args_list)
+    # "fused"：所有 i 在变换域中一起计算（见 fused_tails），尾部不受剪枝影响；
+    # "sweep"：沿 i 递推逐个卷积（见 _sweep_tails）
+    method = getattr(ps, "method", "fused")
+    if method == "fused":
+        tails, _ = fused_tails([law1, law2], [(2 * i, n - 2 * i) for i in range(n // 2)], threshold, progress)
+    elif method == "sweep":
+        tails = _sweep_tails(law1, law2, n, threshold, getattr(ps, "processes", None), progress)
+    else:
+        raise ValueError(f"未知的计算方法: {method}")
 
     # 累加每个 i 对应的 log(1 - 2*tail_prob)
-    for tail_prob in tail_probs:
-        log_p_success += math.log1p(-2 * tail_prob)
+    log_p_success = float(np.log1p(-2 * np.asarray(tails)).sum())
 
-    # 最后一项 n/2
-    D_last = iter_law_convolution(law2, n)
-    tail_last = sum(p for x, p in D_last.items() if abs(x) > threshold)
+    # 最后一项 n/2，即 i = 0 的 law2^n
+    tail_last = float(tails[0])
     log_p_success += (n // 2) * math.log1p(-2 * tail_last)
 
     # 由成功概率计算失败概率
@@ -0,0 +1,109 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .law import SymmetricLaw
+
+# =============================
+# 自卷积幂表缓存
+# =============================
+#
+# iter_law_convolution(A, i) 需要 A^(2^j) (j = 0, 1, ...)。参数扫描时
+# （n ∈ {256, 512, ...}、k ∈ {2, 3, 4}）同一个基础分布会被反复求幂，
+# 这里按分布内容缓存它的二进制幂表，任意指数都由表中各项组合得到。
+#
+# 键是分布内容的摘要而不是对象 id：各模块每次调用都会重新构造分布，
+# 内容相同的分布应命中同一张表。
+
+
+def law_digest(A, *extra):
+    """
+    分布内容（含误差信息与定点表示）的摘要，extra 为附加的区分项（如卷积方法）
+    """
+    h = hashlib.blake2b(digest_size=16)
+    data = A.half if isinstance(A, SymmetricLaw) else A.probs
+    meta = (type(A).__name__, A.offset, A.stride, A.scale, A.err, A.dropped) + extra
+    h.update(repr(meta).encode())
+    h.update(np.ascontiguousarray(data).tobytes())
+    return h.digest()
+
+
+def _law_nbytes(A):
+    return (A.half if isinstance(A, SymmetricLaw) else A.probs).nbytes
+
+
+class PowerTableCache:
+    """
+    A^(2^j) 幂表的 LRU 缓存，总内存不超过 max_bytes
+
+    多线程共享：表的读写在锁内完成，求幂本身在锁外进行
+    """
+
+    def __init__(self, max_bytes=1 << 28):
+        self._tables = OrderedDict()
+        self._nbytes = 0
+        self._max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value):
+        with self._lock:
+            self._max_bytes = int(value)
+            self._evict()
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def __len__(self):
+        return len(self._tables)
+
+    def table(self, key):
+        """
+        返回已缓存的幂表（list 副本，第 j 项为 A^(2^j)），没有则返回 None
+        """
+        with self._lock:
+            powers = self._tables.get(key)
+            if powers is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._tables.move_to_end(key)
+            return list(powers)
+
+    def store(self, key, powers):
+        """
+        保存（或用更长的表替换）key 对应的幂表，必要时按 LRU 淘汰
+        """
+        size = sum(_law_nbytes(P) for P in powers)
+        with self._lock:
+            old = self._tables.get(key)
+            if old is not None:
+                if len(old) >= len(powers):
+                    return
+                self._nbytes -= sum(_law_nbytes(P) for P in old)
+            if size > self._max_bytes:
+                self._tables.pop(key, None)
+                return
+            self._tables[key] = list(powers)
+            self._tables.move_to_end(key)
+            self._nbytes += size
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+            self._nbytes = 0
+
+    def _evict(self):
+        while self._nbytes > self._max_bytes and self._tables:
+            _, powers = self._tables.popitem(last=False)
+            self._nbytes -= sum(_law_nbytes(P) for P in powers)
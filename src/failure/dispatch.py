@@ -0,0 +1,177 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from math import log2
+
+import numpy as np
+
+from .fft import _fft_size
+from .law import SymmetricLaw
+
+# =============================
+# 卷积方法的自动选择
+# =============================
+#
+# law_convolution(method="auto") 按代价模型在三种浮点卷积中选择：
+#     direct : c_d·W                           np.convolve，W 为乘加次数（一般为 |A|·|B|）
+#     sparse : c_s·nnz(A)·nnz(B) + c_z·输出长度   非零点外积 + bincount
+#     fft    : c_f·N·log2(N)·倾斜次数          tilted_convolution
+#     parallel : c_d·W/w + c_t·w + c_z·(输出长度 + w·|B|)
+#                                            较长的一方切成 w 块重叠相加，在线程池中计算；
+#                                            后两项为调度开销与重叠部分的累加
+# 两边都是 ExactLaw 时总是做精确整数卷积，不经过这里。精确卷积有意不作为候选：
+# 浮点输入没有对应的整数计数，换成精确表示并不能提高结果的精度，
+# 而 ExactLaw 之间也没有更便宜的浮点替代（结果必须是精确的分数）。
+#
+# 常数 c_d、c_s、c_z、c_f、c_t 在首次使用时在本机上实测（c_t 为线程池每个任务的调度开销）。
+#
+# fft 的倾斜次数由目标相对精度 rtol 与输出的动态范围决定：一次倾斜的
+# FFT 误差约为 u·log2(N)，相对于倾斜峰值能保证 rtol 的范围约为
+#     53 - log2(1/rtol) - log2(log2 N)  bit
+# 峰值两侧各覆盖一段。直接卷积的每个输出点都有相对误差界，
+# 动态范围再大也只算一次。
+
+
+class ConvolutionCostModel:
+    """
+    卷积代价模型，常数在首次使用时测定（线程安全）
+    """
+
+    # 测定时使用的规模
+    _DIRECT_SIZE = 2048
+    _SPARSE_SIZE = 1024
+    _FFT_SIZE = 1 << 14
+
+    def __init__(self):
+        self._consts = None
+        self._lock = threading.Lock()
+
+    @property
+    def consts(self):
+        """
+        (c_d, c_s, c_z, c_f, c_t)，秒
+        """
+        if self._consts is None:
+            with self._lock:
+                if self._consts is None:
+                    self._consts = self._calibrate()
+        return self._consts
+
+    def _calibrate(self):
+        rng = np.random.default_rng(0)
+
+        def best(f, repeat=3):
+            t = np.inf
+            for _ in range(repeat):
+                start = time.perf_counter()
+                f()
+                t = min(t, time.perf_counter() - start)
+            return max(t, 1e-9)
+
+        n = self._DIRECT_SIZE
+        a, b = rng.random(n), rng.random(n)
+        c_d = best(lambda: np.convolve(a, b)) / (n * n)
+
+        n = self._SPARSE_SIZE
+        xa, xb = np.sort(rng.choice(16 * n, n, replace=False)), np.sort(rng.choice(16 * n, n, replace=False))
+        size = int(xa[-1] + xb[-1]) + 1
+        pa, pb = rng.random(n), rng.random(n)
+        c_s = best(lambda: np.bincount(np.add.outer(xa, xb).ravel(),
+                                       weights=np.multiply.outer(pa, pb).ravel(), minlength=size)) / (n * n)
+        z = np.zeros(1 << 20)
+
+        def scan():
+            # 找出非零点并分配输出数组，与输出长度成正比的部分
+            np.flatnonzero(z)
+            np.zeros(len(z))
+
+        c_z = best(scan) / len(z)
+
+        n = self._FFT_SIZE
+        x = rng.random(n // 2)
+
+        def one_tilt():
+            # tilted_convolution 每次倾斜：两次 exp、两次正变换、一次逆变换
+            ta, tb = np.exp(x), np.exp(x)
+            np.fft.irfft(np.fft.rfft(ta, n) * np.fft.rfft(tb, n), n)
+
+        c_f = best(one_tilt) / (n * log2(n))
+
+        tasks = 64
+        with ThreadPoolExecutor(2) as pool:
+            c_t = best(lambda: list(pool.map(abs, range(tasks)))) / tasks
+        return c_d, c_s, c_z, c_f, c_t
+
+    def tilts(self, A, B, rtol):
+        """
+        tilted_convolution 达到 rtol 所需倾斜次数的估计，无法达到时返回 inf
+        """
+        n = _fft_size(len(A) + len(B) - 1)
+        per_tilt = 53 - log2(1 / rtol) - log2(max(log2(n), 1)) - 2
+        if per_tilt <= 0:
+            return np.inf
+        span = _log2_range(A.probs) + _log2_range(B.probs)
+        return 1 + np.ceil(span / (2 * per_tilt))
+
+    def costs(self, A, B, rtol, workers=1):
+        """
+        各方法的预计耗时（秒）
+
+        参数
+        ----
+        A, B : Law
+            已对齐到共同格点的分布
+        workers : int
+            可用于 parallel 的线程数，1 时不估计 parallel
+
+        返回
+        ----
+        dict {method: float}
+        """
+        c_d, c_s, c_z, c_f, c_t = self.consts
+        la, lb = len(A), len(B)
+        nnz = np.count_nonzero(A.probs) * np.count_nonzero(B.probs)
+        n = _fft_size(la + lb - 1)
+        blocks, short = _direct_shape(A, B)
+        costs = {
+            "direct": c_d * blocks * short,
+            "sparse": c_s * nnz + c_z * (la + lb),
+            "fft": c_f * n * log2(n) * self.tilts(A, B, rtol),
+        }
+        if workers > 1:
+            w = min(workers, blocks)
+            costs["parallel"] = costs["direct"] / w + c_t * w + c_z * (blocks + short + w * short)
+        return costs
+
+    def choose(self, A, B, rtol, workers=1):
+        """
+        预计耗时最少的方法；fft 只有在明显更快时才使用（它的误差界更宽）
+        """
+        costs = self.costs(A, B, rtol, workers)
+        method = min((m for m in costs if m != "fft"), key=costs.get)
+        if costs["fft"] < 0.5 * costs[method]:
+            method = "fft"
+        return method
+
+
+def _direct_shape(A, B):
+    """
+    直接卷积中被切块的一方的长度与另一方的长度，二者之积为乘加次数
+
+    两个对称分布只算 x ≥ 0 的输出：较宽一方取 [-hb, ha] 一段（ha + hb + 1 个点）
+    与较窄一方的完整支撑（2hb + 1 个点）卷积
+    """
+    if isinstance(A, SymmetricLaw) and isinstance(B, SymmetricLaw):
+        ha, hb = sorted((len(A.half) - 1, len(B.half) - 1), reverse=True)
+        return ha + hb + 1, 2 * hb + 1
+    return max(len(A), len(B)), min(len(A), len(B))
+
+
+def _log2_range(probs):
+    """
+    非零概率的动态范围（bit）
+    """
+    p = probs[probs > 0]
+    if not p.size:
+        return 0.0
+    return float(log2(p.max()) - log2(p.min()))
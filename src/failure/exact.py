@@ -0,0 +1,624 @@
+from fractions import Fraction
+from functools import lru_cache, reduce
+from math import ceil, gcd, log2
+
+import numpy as np
+
+from .law import Law
+from .progress import NO_PROGRESS
+from .saddlepoint import saddlepoint_tail
+
+# =============================
+# 精确整数分布
+# =============================
+
+class ExactLaw:
+    """
+    有理概率分布：P(X = offset + j) = counts[j] / denom
+
+    中心二项分布的概率是 2 的幂分之一，模数切换误差是 1/q 的整数倍，
+    它们的乘积与卷积仍然是同一公分母下的整数计数，可以精确计算。
+    """
+
+    __slots__ = ("offset", "counts", "denom")
+
+    def __init__(self, offset, counts, denom):
+        counts = [int(c) for c in counts]
+        # 约去公因子，减少后续需要的素数个数
+        g = reduce(gcd, counts, int(denom))
+        self.offset = int(offset)
+        self.counts = [c // g for c in counts]
+        self.denom = int(denom) // g
+
+    @classmethod
+    def from_dict(cls, D, denom):
+        """
+        由计数 dict {x: count} 构造
+        """
+        lo, hi = min(D), max(D)
+        counts = [0] * (hi - lo + 1)
+        for x, c in D.items():
+            counts[x - lo] += c
+        return cls(lo, counts, denom)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __repr__(self):
+        return f"ExactLaw(offset={self.offset}, size={len(self.counts)}, denom={self.denom})"
+
+    @property
+    def lo(self):
+        return self.offset
+
+    @property
+    def hi(self):
+        return self.offset + len(self.counts) - 1
+
+    def to_law(self):
+        """
+        转换为浮点 Law
+        """
+        return Law(self.offset, [float(Fraction(c, self.denom)) for c in self.counts])
+
+
+def exact_law_convolution(A, B):
+    """
+    精确分布之和（整数计数卷积）
+    """
+    counts = np.convolve(np.array(A.counts, dtype=object), np.array(B.counts, dtype=object))
+    return ExactLaw(A.offset + B.offset, counts.tolist(), A.denom * B.denom)
+
+
+def exact_law_product(A, B):
+    """
+    精确分布之积（外积后按乘积值去重累加）
+    """
+    ca = np.array(A.counts, dtype=object)
+    cb = np.array(B.counts, dtype=object)
+    ia, ib = np.flatnonzero(ca != 0), np.flatnonzero(cb != 0)
+    v = np.multiply.outer(ia + A.offset, ib + B.offset).ravel()
+    c = np.multiply.outer(ca[ia], cb[ib]).ravel()
+    u, inv = np.unique(v, return_inverse=True)
+    acc = np.zeros(len(u), dtype=object)
+    np.add.at(acc, inv, c)
+    lo = int(u[0])
+    counts = [0] * (int(u[-1]) - lo + 1)
+    for x, n in zip((u - lo).tolist(), acc.tolist()):
+        counts[x] = n
+    return ExactLaw(lo, counts, A.denom * B.denom)
+
+
+# =============================
+# 多素数 NTT
+# =============================
+#
+# 最终误差 = Σ 各项的 count 次自卷积。整个计算在每个素数 p 下独立完成：
+# 各基础分布只做一次正变换，在变换域里做幂和乘积。尾部计数是结果的
+# 一个加权和，逆变换只需做四步法的前一半（见 _Readout），
+# 最后只对这一个整数做 CRT 重构。
+#
+# 阈值 t0 ≥ 1 时改为读出中间窗口 |x| < t0 的计数，tail = denom - 中间 - 端点，
+# 变换长度只需覆盖 max|x| + t0，不必覆盖整个支撑 hi - lo。
+# 只有一两个点的 count = 1 项（如 LWR 的舍入项）直接折进权重，不参与变换。
+#
+# 素数取 p = c·2^s + 1 < 2^32，乘积 < 2^64，可以直接用 uint64 运算。
+# 所需素数个数由尾部计数的 Chernoff 上界决定，而不是 2·公分母。
+#
+# 分布按 x mod N 循环放置（负数取值绕到数组末尾）：关于 0 对称的分布
+# 变换后满足 F[k] = F[N-k]，求幂只需算前一半。基础分布很短，正变换把
+# 长度 N 拆成 N/M 个长度 M 的小变换（M 为不小于分布长度的 2 的幂）。
+
+# 单批处理的 (素数个数 × 变换长度) 上限：数组留在缓存中时取模运算快一倍以上
+_CHUNK_ELEMENTS = 1 << 16
+
+# Chernoff 上界按浮点计算，确定素数个数时额外留出的位数
+_BOUND_MARGIN = 8
+
+
+def _is_prime(n):
+    """
+    确定性 Miller-Rabin，对 n < 4,759,123,141 有效
+    """
+    if n < 2:
+        return False
+    for p in (2, 3, 5, 7, 11, 13):
+        if n % p == 0:
+            return n == p
+    d, r = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        r += 1
+    for a in (2, 7, 61):
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(r - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _prime_factors(n):
+    f, d = set(), 2
+    while d * d <= n:
+        while n % d == 0:
+            f.add(d)
+            n //= d
+        d += 1
+    if n > 1:
+        f.add(n)
+    return f
+
+
+def _primitive_root(p):
+    factors = _prime_factors(p - 1)
+    g = 2
+    while any(pow(g, (p - 1) // f, p) == 1 for f in factors):
+        g += 1
+    return g
+
+
+@lru_cache(maxsize=None)
+def _ntt_primes(s, bits):
+    """
+    返回形如 c·2^s + 1 的素数及其原根，乘积超过 2^bits
+
+    返回
+    ----
+    list of (p, g)
+    """
+    primes, M = [], 1
+    c = ((1 << 32) - 1) >> s
+    while M.bit_length() <= bits:
+        if c <= 0:
+            raise ValueError(f"长度 2^{s} 的 NTT 素数不足以表示 {bits} 位的精确计数")
+        p = (c << s) + 1
+        if _is_prime(p):
+            primes.append((p, _primitive_root(p)))
+            M *= p
+        c -= 1
+    return primes
+
+
+def _bit_reverse(N):
+    bits = N.bit_length() - 1
+    idx = np.arange(N)
+    rev = np.zeros(N, dtype=np.int64)
+    for b in range(bits):
+        rev |= ((idx >> b) & 1) << (bits - 1 - b)
+    return rev
+
+
+def _power_table(w, N, P):
+    """
+    每个素数下 w^j (j < N)，w 为 (k,1) 数组，w 为 N 次本原单位根
+
+    返回
+    ----
+    (T, T')
+        T' = floor(T·2^32 / p) 为 Shoup 乘法的预计算值，见 _mul_shoup
+    """
+    k = P.shape[0]
+    T = np.ones((k, max(N, 2)), dtype=np.uint64)
+    b, wb = 1, w[:, 0].copy()
+    while b < N // 2:
+        T[:, b:2 * b] = T[:, :b] * wb[:, None] % P
+        wb = wb * wb % P[:, 0]
+        b *= 2
+    # w^(N/2) = -1
+    T[:, N // 2:N] = (P - T[:, :N // 2]) % P
+    T = T[:, :N]
+    return T, (T << np.uint64(32)) // P
+
+
+def _reduce(r, P, tmp=None):
+    """
+    [0, 2p) 上的值原地约化到 [0, p)：r < p 时 r - p 回绕成极大的数，取较小者即可
+    """
+    return np.minimum(r, np.subtract(r, P, out=tmp), out=r)
+
+
+def _mul_shoup(v, T, Tc, P, out=None, tmp=None):
+    """
+    v·T mod p，T 为固定的乘数，Tc = floor(T·2^32 / p)
+
+    v, T < p < 2^32 时 q = floor(v·Tc / 2^32) 与 floor(v·T / p) 至多差 1，
+    v·T - q·p ∈ [0, 2p)（uint64 回绕相减结果不变），只需一次条件减法，不用除法。
+    out / tmp 为可复用的缓冲区：大数组的临时分配（缺页）比运算本身还贵
+    """
+    q = np.multiply(v, Tc, out=tmp)
+    q >>= np.uint64(32)
+    q *= P
+    r = np.multiply(v, T, out=out)
+    r -= q
+    return _reduce(r, P, q)
+
+
+def _ntt(a, table, P):
+    """
+    对 a 的第二维做长度 n 的数论变换（迭代 Cooley-Tukey，各素数、各列并行）
+
+    最后一维是连续存放的一批独立序列，每一步蝶形运算都在长度 ≥ c 的连续段上进行，
+    避免 m 较小的几层在 numpy 中逐段循环
+
+    参数
+    ----
+    a : (k, n, c) uint64
+    table : (T, T')
+        每个素数下 n 次本原单位根的幂，见 _power_table
+    P : (k, 1) uint64
+    """
+    k, n, c = a.shape
+    T, Tc = table
+    a = a[:, _bit_reverse(n), :]
+    P4 = P[:, :, None, None]
+    buf = np.empty((2, k * n * c // 2), dtype=np.uint64)
+    m = 1
+    while m < n:
+        b = a.reshape(k, n // (2 * m), 2, m, c)
+        u, v = b[:, :, 0], b[:, :, 1]
+        x, y = buf[0].reshape(u.shape), buf[1].reshape(u.shape)
+        if m > 1:
+            tw = slice(None, n // 2, n // (2 * m))
+            v = _mul_shoup(v, T[:, None, tw, None], Tc[:, None, tw, None], P4, x, y)
+        # (u, v) → (u + v, u - v)，差值先加 p 保持非负，结果直接写回原位
+        np.subtract(u, v, out=y)
+        y += P4
+        u += v
+        _reduce(u, P4, x)
+        np.minimum(y, np.subtract(y, P4, out=x), out=b[:, :, 1])
+        m *= 2
+    return a
+
+
+def _split(N):
+    """
+    四步法的分解 N = n1·n2（n1 ≥ n2）
+    """
+    n2 = 1 << ((N.bit_length() - 1) // 2)
+    return N // n2, n2
+
+
+def _first_half(a, table, P):
+    """
+    四步法的前一半：先做 n2 个长度 n1 的变换，再乘旋转因子 w^(i2·k1)
+
+    返回 (k, n1, n2) 数组 A[k1, i2]；对每个 k1 沿 i2 再做一次长度 n2 的变换，
+    即得下标为 k1 + n1·k2 的输出
+    """
+    k, N = a.shape
+    T, Tc = table
+    n1, n2 = _split(N)
+    A = _ntt(a.reshape(k, n1, n2), (T[:, ::n2], Tc[:, ::n2]), P)
+    j = np.multiply.outer(np.arange(n1), np.arange(n2)) % N
+    return _mul_shoup(A, T[:, j], Tc[:, j], P[:, :, None])
+
+
+def _transform(a, table, P):
+    """
+    长度 N 的完整变换（四步法），输出为自然顺序
+
+    参数
+    ----
+    a : (k, N) uint64
+    table : (T, T')
+        N 次本原单位根的幂，见 _power_table
+    """
+    k, N = a.shape
+    T, Tc = table
+    n1, n2 = _split(N)
+    A = np.ascontiguousarray(_first_half(a, table, P).transpose(0, 2, 1))
+    return _ntt(A, (T[:, ::n1], Tc[:, ::n1]), P).reshape(k, N)
+
+
+class _Readout:
+    """
+    读出 Σ_x w_x·r_x 所需的、与素数无关的预处理（r 为逆变换的结果）
+
+    只需要这一个线性组合，不必求出 r。逆变换按四步法分解，x = k1 + n1·k2：
+    做完长度 n1 的变换 A[k1, i2] 之后，
+        Σ_x w_x·r_x = Σ A[k1, i2]·w^(-i2·k1)·Ŵ[k1, i2]
+    Ŵ 为权重 W[k1, k2] = w[k1 + n1·k2] 沿 k2 的长度 n2 变换（单位根 ζ = w^(-n1)）。
+    区间一类的权重沿 k2 的差分 D 只有寥寥几个非零项，
+    Ŵ(i) = D̂(i) / (1 - ζ^i)（i ≠ 0），Ŵ(0) 即行和。
+
+    属性
+    ----
+    idx : (n1, e, n2) int64
+        w^(-i2·k1)·ζ^(k2·i2) = w^idx，k2 为差分的第 j 个非零项
+    d : (n1, e) int64
+        差分的值（不足 e 项的行补 0）
+    total : (n1,) int64
+        各行之和
+    """
+
+    __slots__ = ("idx", "d", "total")
+
+    def __init__(self, w):
+        N = len(w)
+        n1, n2 = _split(N)
+        W = w.reshape(n2, n1).T
+        D = W - np.roll(W, 1, axis=1)
+        nz = D != 0
+        e = max(1, int(nz.sum(axis=1).max()))
+        k2 = np.argsort(~nz, axis=1, kind="stable")[:, :e]
+        x = np.arange(n1)[:, None] + n1 * k2
+        self.idx = -np.multiply.outer(x, np.arange(n2)) % N
+        self.d = np.take_along_axis(D, k2, axis=1)
+        self.total = W.sum(axis=1)
+
+    @property
+    def bound(self):
+        """
+        |Σ_j d_j·w^(...)| 的上界（按 int64 累加，须小于 2^63）
+        """
+        return self.d.shape[1] * int(np.abs(self.d).max(initial=0)) << 32
+
+
+def _weighted_sum(S, readout, table, P):
+    """
+    Σ_x w_x·r_x mod p，r 为 S 的逆变换（未除以 N），w 见 _Readout
+
+    参数
+    ----
+    S : (k, N) uint64
+    table : (T, T')
+        正变换所用单位根的幂（w^-j = w^(N-j)）
+    """
+    T, Tc = table
+    k, N = S.shape
+    n1, n2 = _split(N)
+    P3 = P[:, :, None]
+    neg = -np.arange(0, N, n2) % N
+    A = _ntt(S.reshape(k, n1, n2), (T[:, neg], Tc[:, neg]), P)
+
+    # D̂[k1, i2]（含旋转因子）：|d|·w^j < 2^63 / e，有符号累加不会溢出
+    Dh = np.einsum("kaei,ae->kai", T.view(np.int64)[:, readout.idx], readout.d) % P3.view(np.int64)
+    # i2 = 0：D̂(0) = 0，Ŵ(0) 为行和
+    col0 = (A[:, :, 0] * (readout.total % P) % P).sum(axis=1, dtype=np.uint64) % P[:, 0]
+    col = _mulmod(A, Dh.view(np.uint64), P3).sum(axis=1, dtype=np.uint64) % P
+    col[:, 0] = col0
+
+    # 1 / (1 - ζ^i) = -(1/n2)·Σ_j j·ζ^(ij)（ζ^n2 = 1, ζ^i ≠ 1）
+    j = np.arange(n2)
+    ramp = (T[:, -n1 * np.multiply.outer(j, j) % N] * j.astype(np.uint64)).sum(axis=2, dtype=np.uint64) % P
+    scale = np.array([[p - pow(n2, int(p) - 2, int(p))] for p in P[:, 0].tolist()], dtype=np.uint64)
+    inv = ramp * scale % P
+    inv[:, 0] = 1
+    return (col * inv % P).sum(axis=1, dtype=np.uint64) % P[:, 0]
+
+
+def _fold(w, law):
+    """
+    w'_z = Σ_y P(y)·w_(z+y)（循环下标）：Σ_x w_x·(r ⋆ law)_x = Σ_z w'_z·r_z
+    """
+    out = np.zeros_like(w)
+    for j, c in enumerate(law.counts):
+        if c:
+            out += c * np.roll(w, -(law.offset + j))
+    return out
+
+
+def _forward(law, N, table, P):
+    """
+    长度 N 的正变换，分布按 x mod N 循环放置
+
+    分布较短时 F[s·R + r] = Σ_x a_x·w^(x·r)·(w^R)^(x·s)，R = N/M：
+    对每个 r 做一次长度 M 的小变换，结果按 (s, r) 排列即为自然顺序
+    """
+    k = P.shape[0]
+    T, Tc = table
+    L = len(law)
+    x = law.offset + np.arange(L, dtype=np.int64)
+    a = _residues(law.counts, P)
+    M = 1
+    while M < L:
+        M <<= 1
+    R = N // M
+    if R < 8:
+        X = np.zeros((k, N), dtype=np.uint64)
+        X[:, x % N] = a
+        return _transform(X, table, P)
+    j = np.multiply.outer(x, np.arange(R, dtype=np.int64)) % N
+    X = np.zeros((k, M, R), dtype=np.uint64)
+    X[:, x % M, :] = _mul_shoup(a[:, :, None], T[:, j], Tc[:, j], P[:, :, None])
+    return _ntt(X, (T[:, ::R], Tc[:, ::R]), P).reshape(k, N)
+
+
+def _powmod(F, e, P):
+    R = None
+    F = F.copy()
+    while e:
+        if e & 1:
+            R = F.copy() if R is None else _mulmod(R, F, P)
+        e >>= 1
+        if e:
+            _mulmod(F, F, P)
+    return R
+
+
+def _mulmod(a, b, P):
+    """
+    a·b mod p，结果写回 a
+    """
+    a *= b
+    a %= P
+    return a
+
+
+def _residues(counts, P):
+    """
+    整数计数对每个素数取模，返回 (k, len) uint64
+    """
+    if max(counts) < (1 << 63) and min(counts) >= 0:
+        return np.array(counts, dtype=np.uint64)[None, :] % P
+    return np.array([[c % int(p) for c in counts] for p in P[:, 0]], dtype=np.uint64)
+
+
+def _is_symmetric(law):
+    return law.offset == -law.hi and law.counts == law.counts[::-1]
+
+
+def _merge_terms(terms):
+    """
+    重复次数相同的项先精确卷积合并，每个素数下少做正变换与求幂
+    """
+    merged = {}
+    for law, c in terms:
+        if c:
+            merged[c] = law if c not in merged else exact_law_convolution(merged[c], law)
+    return [(law, c) for c, law in merged.items()]
+
+
+def tail_weights(lo, hi, t):
+    """
+    与 tail_probability 一致的尾部权重：
+    对 i ∈ [ceil(t), hi) 累加 P(i) + P(-i)，返回支撑 [lo, hi] 上每点被计入的次数
+    """
+    x = np.arange(lo, hi + 1)
+    t0 = int(ceil(t))
+    return ((x >= t0) & (x < hi)).astype(np.int64) + ((-x >= t0) & (-x < hi)).astype(np.int64)
+
+
+def _tail_count_bits(terms, t, denom):
+    """
+    尾部计数 T = denom · P(尾部) 的位数上界
+
+    P(尾部) 用鞍点法的 Chernoff 上界（严格成立，与 tail_probability 的求和范围一致）
+    """
+    bits = (2 * denom).bit_length()
+    try:
+        _, upper, _ = saddlepoint_tail([(law.to_law(), c) for law, c in terms], t)
+    except (ValueError, ArithmeticError):
+        return bits
+    if upper == float("-inf"):
+        return 1
+    return min(bits, denom.bit_length() + max(ceil(upper), -bits) + _BOUND_MARGIN)
+
+
+def exact_tail_probability(terms, t, progress=NO_PROGRESS):
+    """
+    精确计算 Σ 独立项之和的尾概率 P(|X| > t)
+
+    参数
+    ----
+    terms : list of (ExactLaw, int)
+        各独立项的分布及其重复次数
+    t : int
+        阈值
+    progress : Progress
+        每完成一批素数回报 "primes" 阶段的进度，见 failure.progress
+
+    返回
+    ----
+    Fraction
+        精确的尾概率
+    """
+    terms = _merge_terms(terms)
+    lo = sum(law.lo * c for law, c in terms)
+    hi = sum(law.hi * c for law, c in terms)
+    denom = 1
+    for law, c in terms:
+        denom *= law.denom ** c
+    if t >= hi:
+        return Fraction(0)
+
+    t0 = int(ceil(t))
+    if t0 >= 1 and lo >= -hi:
+        # 尾部之外只有中间的 (-t0, t0) 与端点 ±hi：循环长度 ≥ max(hi, -lo) + t0 时
+        # 回绕的项落不进中间，读出中间的计数即可，尾部计数 = 公分母 - 中间 - 端点
+        size = max(hi, -lo) + t0
+        x, w = np.arange(1 - t0, t0), 1
+        edge = 1
+        for law, c in terms:
+            edge *= law.counts[-1] ** c
+        if lo == -hi:
+            bottom = 1
+            for law, c in terms:
+                bottom *= law.counts[0] ** c
+            edge += bottom
+    else:
+        size = hi - lo + 1
+        x, w, edge = np.arange(lo, hi + 1), tail_weights(lo, hi, t), None
+    N = 2
+    while N < size:
+        N <<= 1
+    s = N.bit_length() - 1
+    weights = np.zeros(N, dtype=np.int64)
+    weights[x % N] = w
+
+    # 只出现一次的短分布不做变换，直接并入读出的权重；
+    # 至少保留一项做变换，权重的差分过大（int64 累加可能溢出）时不并入
+    n1, _ = _split(N)
+    powered = sorted(terms, key=lambda term: (term[1] == 1 and len(term[0]) <= 2 * n1, -len(term[0])))
+    readout = None
+    while len(powered) > 1 and powered[-1][1] == 1 and len(powered[-1][0]) <= 2 * n1:
+        folded = _fold(weights, powered[-1][0])
+        candidate = _Readout(folded)
+        if candidate.bound >= 1 << 63:
+            break
+        weights, readout = folded, candidate
+        powered.pop()
+    if readout is None:
+        readout = _Readout(weights)
+    denom_powered = 1
+    for law, c in powered:
+        denom_powered *= law.denom ** c
+    # 全部对称时变换也对称，只对前一半求幂
+    half = N // 2 + 1 if all(_is_symmetric(law) for law, _ in powered) else N
+
+    primes = _ntt_primes(s, _tail_count_bits(terms, t, denom))
+    chunk = max(1, _CHUNK_ELEMENTS // N)
+    residues = []
+
+    progress.update("primes", 0, len(primes), size)
+    for start in range(0, len(primes), chunk):
+        batch = primes[start:start + chunk]
+        P = np.array([[p] for p, _ in batch], dtype=np.uint64)
+        omega = np.array([[pow(g, (p - 1) // N, p)] for p, g in batch], dtype=np.uint64)
+        fwd = _power_table(omega, N, P)
+
+        S = None
+        for law, c in powered:
+            F = _powmod(_forward(law, N, fwd, P)[:, :half], c, P)
+            S = F if S is None else _mulmod(S, F, P)
+        if half < N:
+            S = np.concatenate((S, S[:, N - half:0:-1]), axis=1)
+
+        # 逆变换不除以 N，求和之后再乘 N^-1
+        read = _weighted_sum(S, readout, fwd, P)
+        for (p, _), a, b in zip(batch, S[:, 0].tolist(), read.tolist()):
+            # 自检：零频分量即计数之和，必须等于公分母
+            if a != denom_powered % p:
+                raise ArithmeticError("NTT 精确卷积自检失败")
+            b = b * pow(N, p - 2, p) % p
+            residues.append(b if edge is None else (denom - edge - b) % p)
+        progress.update("primes", len(residues), len(primes), size)
+
+    # CRT 重构尾部计数
+    M = 1
+    for p, _ in primes:
+        M *= p
+    T = 0
+    for (p, _), r in zip(primes, residues):
+        Mi = M // p
+        T += r * Mi * pow(Mi % p, p - 2, p)
+    return Fraction(T % M, denom)
+
+
+def log2_fraction(x):
+    """
+    有理数的精确 log2（结果为 float，误差在最后一位）
+    """
+    if x <= 0:
+        return float("-inf")
+
+    def _log2(n):
+        shift = max(n.bit_length() - 64, 0)
+        return log2(n >> shift) + shift
+
+    return _log2(x.numerator) - _log2(x.denominator)
@@ -0,0 +1,182 @@
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# =============================
+# 进程内共用的执行器
+# =============================
+#
+# 进程池与线程池在首次使用时创建，之后各次计算共用，不再为每次
+# compute_failure_probability 重新启动工作进程、重新导入模块。
+#
+# 同时在途的任务数取 min(工作进程数, 内存预算 // 单个任务的内存估计)，
+# 大参数下每个任务持有很大的分布时自动降低并发。内存预算是所有在途任务
+# 共用的总量，不是每个工作进程各自的上限。
+#
+# 工作进程默认与原先的 multiprocessing.Pool 一样用 fork 启动（平台不支持时
+# 用 spawn），未加 if __name__ == "__main__" 保护的脚本和 notebook 照常可用。
+# 调用方是带线程池的 GUI 或服务时，fork 会复制其它线程持有的锁，子进程可能
+# 死锁，可用 configure(start_method="forkserver") 改用 forkserver；此时工作
+# 进程会重新导入主模块，脚本的入口须放在 if __name__ == "__main__" 之下。
+
+_lock = threading.Lock()
+_process_pool = None
+_thread_pool = None
+
+# 工作进程数，None 为 CPU 核数
+_max_workers = None
+# 在途任务的总内存预算（字节），None 为物理内存的一半
+_memory_budget = None
+# 工作进程的启动方式，None 为 fork（不可用时 spawn）
+_start_method = None
+
+# configure 中表示“未传入、保持原值”
+_UNSET = object()
+
+
+def _default_memory_budget():
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // 2
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def configure(max_workers=_UNSET, memory_budget=_UNSET, start_method=_UNSET):
+    """
+    设置工作进程数、内存预算与启动方式，只改动传入的参数；
+    进程数或启动方式变化时，现有进程池在下次使用前重建
+
+    参数
+    ----
+    max_workers : int or None
+        工作进程数，None 为 CPU 核数
+    memory_budget : int or None
+        所有在途任务共用的内存预算（字节），None 为物理内存的一半
+    start_method : str or None
+        "fork"、"forkserver" 或 "spawn"，None 为 fork（不可用时 spawn）
+    """
+    global _max_workers, _memory_budget, _start_method
+    if start_method not in (_UNSET, None) and start_method not in multiprocessing.get_all_start_methods():
+        raise ValueError(f"不支持的进程启动方式: {start_method}")
+    with _lock:
+        if max_workers is not _UNSET:
+            if max_workers != _max_workers:
+                _shutdown_process_pool()
+            _max_workers = max_workers
+        if memory_budget is not _UNSET:
+            _memory_budget = memory_budget
+        if start_method is not _UNSET:
+            if start_method != _start_method:
+                _shutdown_process_pool()
+            _start_method = start_method
+
+
+def max_workers():
+    return _max_workers or os.cpu_count() or 1
+
+
+def memory_budget():
+    return _default_memory_budget() if _memory_budget is None else _memory_budget
+
+
+def _mp_context():
+    method = _start_method
+    if method is None:
+        method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def process_pool():
+    """
+    共用的进程池，首次调用时创建
+    """
+    global _process_pool
+    with _lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=max_workers(), mp_context=_mp_context())
+        return _process_pool
+
+
+def thread_pool():
+    """
+    共用的线程池（parallel 卷积等释放 GIL 的计算），首次调用时创建
+    """
+    global _thread_pool
+    with _lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="failure")
+        return _thread_pool
+
+
+def _shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def shutdown():
+    """
+    关闭共用的进程池与线程池，之后的调用会重新创建
+    """
+    global _thread_pool
+    with _lock:
+        _shutdown_process_pool()
+        if _thread_pool is not None:
+            _thread_pool.shutdown(wait=False, cancel_futures=True)
+            _thread_pool = None
+
+
+def concurrency(task_bytes=0, limit=None):
+    """
+    同时在途的任务数：不超过工作进程数、limit 与 内存预算 // task_bytes，至少为 1
+    """
+    n = max_workers()
+    if limit is not None:
+        n = min(n, limit)
+    budget = memory_budget()
+    if task_bytes and budget is not None:
+        n = min(n, budget // task_bytes)
+    return max(int(n), 1)
+
+
+def map_tasks(fn, args, task_bytes=0, limit=None):
+    """
+    在共用进程池中按顺序执行 fn(a)，逐个给出结果（与 map 顺序一致）
+
+    参数
+    ----
+    fn : callable
+        模块级函数（需可序列化）
+    args : iterable
+    task_bytes : int
+        单个任务的内存估计，用于按内存预算限制并发
+    limit : int or None
+        并发上限（如调用方指定的 processes）
+
+    返回
+    ----
+    generator
+    """
+    window = concurrency(task_bytes, limit)
+    pool = process_pool()
+    pending = deque()
+    try:
+        for a in args:
+            if len(pending) >= window:
+                yield pending.popleft().result()
+            pending.append(pool.submit(fn, a))
+        while pending:
+            yield pending.popleft().result()
+    except BrokenProcessPool:
+        # 工作进程异常退出（如内存不足被杀），丢弃进程池，下次调用时重建
+        with _lock:
+            if _process_pool is pool:
+                _shutdown_process_pool()
+        raise
+    finally:
+        for f in pending:
+            f.cancel()
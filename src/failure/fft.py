@@ -0,0 +1,604 @@
+from math import lcm, gcd, log, log2, pi
+
+import numpy as np
+
+from .law import Law, SymmetricLaw, as_law, align_grids, combine_errors, UNIT_ROUNDOFF
+from .progress import NO_PROGRESS
+
+# =============================
+# 指数倾斜 FFT 卷积
+# =============================
+#
+# 普通 float64 FFT 卷积的绝对误差约为 u·log2(n)·|a|_1·|b|_1，
+# 远小于 1e-16 的尾部概率会被舍入噪声淹没。
+#
+# 指数倾斜：a_θ(x) = a(x)·e^{θx}，卷积满足
+#     (a * b)_θ = a_θ * b_θ
+# 选取 θ 使倾斜后分布的峰值落在目标尾部附近，FFT 误差相对于该区域
+# 的概率就变得很小；再乘回 e^{-θx} 即得原分布在该区域的高相对精度值。
+# 对不同区域依次选取 θ，对每个点保留误差界最小的那一次结果。
+
+# tilted_convolution / fused_sum 默认的目标相对误差
+DEFAULT_RTOL = 2.0 ** -20
+
+# FFT 卷积绝对误差常数：实测 |ĉ - c|_∞ / (u·log2(n)·|a|_1·|b|_1) < 0.4
+_FFT_ERR_CONST = 4.0
+
+
+def _fft_size(size):
+    n = 1
+    while n < size:
+        n <<= 1
+    return n
+
+
+def _log_probs(A):
+    with np.errstate(divide="ignore"):
+        return np.log(A.probs)
+
+
+def _tilt(logp, theta):
+    """
+    返回倾斜并归一化到最大值为 1 的数组及其对数缩放因子
+    """
+    t = logp + theta * np.arange(len(logp))
+    s = t.max()
+    return np.exp(t - s), s
+
+
+def _tilted_mean_var(logps, theta, counts=None):
+    """
+    独立变量之和在倾斜 θ 下的均值与方差（局部坐标），counts 为各项的重复次数
+    """
+    mean = var = 0.0
+    for logp, c in zip(logps, counts or [1] * len(logps)):
+        w, _ = _tilt(logp, theta)
+        x = np.arange(len(w))
+        z = w.sum()
+        m = (w * x).sum() / z
+        mean += c * m
+        var += c * (w * (x - m) ** 2).sum() / z
+    return mean, var
+
+
+def _solve_tilt(logps, target, counts=None):
+    """
+    求 θ 使倾斜后的均值落在 target 附近（鞍点方程 K'(θ) = target）
+    """
+    mean, var = _tilted_mean_var(logps, 0.0, counts)
+    if abs(mean - target) <= 0.5:
+        return 0.0
+    sign = 1.0 if target > mean else -1.0
+
+    # 先倍增找到包含解的区间
+    lo, hi = 0.0, sign
+    for _ in range(64):
+        mean, var = _tilted_mean_var(logps, hi, counts)
+        if sign * (mean - target) >= 0:
+            break
+        lo, hi = hi, 2 * hi
+
+    # 牛顿法 + 二分保护
+    theta = hi
+    for _ in range(100):
+        mean, var = _tilted_mean_var(logps, theta, counts)
+        if abs(mean - target) <= max(0.5, 0.1 * np.sqrt(var)):
+            break
+        if sign * (mean - target) > 0:
+            hi = theta
+        else:
+            lo = theta
+        step = theta - (mean - target) / var if var > 0 else hi
+        theta = step if min(lo, hi) < step < max(lo, hi) else (lo + hi) / 2
+    return theta
+
+
+def _mask_sum(ma, mb):
+    """
+    两个支撑（布尔数组）的和集
+    """
+    size = len(ma) + len(mb) - 1
+    if ma.all() and mb.all():
+        return np.ones(size, dtype=bool)
+    n = _fft_size(size)
+    ia, ib = ma.astype(np.float64), mb.astype(np.float64)
+    cnt = np.fft.irfft(np.fft.rfft(ia, n) * np.fft.rfft(ib, n), n)[:size]
+    return cnt > 0.5
+
+
+def _sumset_mask(A, B):
+    """
+    A + B 的精确支撑（哪些点的概率严格为正）
+    """
+    return _mask_sum(A.probs > 0, B.probs > 0)
+
+
+def _refine_tilts(run, logps, counts, size, support, rtol, max_tilts):
+    """
+    依次选取倾斜参数 θ 调用 run(θ) -> (值, 逐点绝对误差界)，对每个点保留误差界
+    最小的结果，直到支撑上所有点的相对误差不超过 rtol 或用完 max_tilts 次
+
+    返回
+    ----
+    (np.ndarray, np.ndarray)
+        估计值与逐点误差界
+    """
+    est = np.zeros(size)
+    bound = np.full(size, np.inf)
+    stuck = np.zeros(size, dtype=bool)
+
+    def record(theta):
+        val, b = run(theta)
+        better = support & (b < bound)
+        est[better] = val[better]
+        bound[better] = b[better]
+
+    def todo():
+        return support & ~(bound <= rtol * est) & ~stuck
+
+    record(0.0)
+    tilts = 1
+    peak = int(np.argmax(est))
+    reach = {1: 0, -1: 0}
+
+    while tilts < max_tilts:
+        pending = todo()
+        right = np.flatnonzero(pending[peak + 1:]) + peak + 1
+        left = np.flatnonzero(pending[:peak + 1])
+        if not right.size and not left.size:
+            break
+        for side, idx in ((1, right), (-1, left)):
+            if not idx.size or tilts >= max_tilts:
+                continue
+            first = int(idx[0] if side > 0 else idx[-1])
+            target = min(max(first + side * reach[side], 0), size - 1)
+            record(_solve_tilt(logps, target, counts))
+            tilts += 1
+
+            if todo()[first]:
+                # 瞄准点本身没有被覆盖：缩小步长重试，已经对准仍失败则放弃该点
+                if reach[side]:
+                    reach[side] //= 2
+                else:
+                    stuck[first] = True
+                continue
+            # 用本次覆盖到的宽度估计下一次的步长
+            rest = np.flatnonzero(todo()[target + 1:] if side > 0 else todo()[:target][::-1])
+            reach[side] = int(rest[0]) if rest.size else reach[side]
+    return est, bound
+
+
+def _settle(est, bound, support):
+    """
+    误差界不小于估计值本身的点无法与 0 区分，置零并计入丢弃质量
+
+    返回
+    ----
+    (float, float)
+        保留点的最大相对误差与丢弃质量上界
+    """
+    lost = support & ~(bound < est)
+    dropped = float(np.sum(est[lost].clip(min=0) + bound[lost]))
+    est[lost] = 0.0
+    kept = est > 0
+    rel = float((bound[kept] / est[kept]).max()) if kept.any() else 0.0
+    return rel, dropped
+
+
+def tilted_convolution(A, B, rtol=DEFAULT_RTOL, max_tilts=256):
+    """
+    尾部相对精度可控的 FFT 卷积
+
+    对每个输出点给出相对误差上界，必要时用多个倾斜参数 θ 分段计算，
+    直到所有点的相对误差都不超过 rtol。
+
+    参数
+    ----
+    A, B : Law or dict
+    rtol : float
+        每个概率值的目标相对误差
+    max_tilts : int
+        最多使用的倾斜次数
+
+    返回
+    ----
+    Law
+        A + B 的分布；err 为逐点相对误差上界，无法达到精度而置零的
+        点的质量上界计入 dropped
+    """
+    A, B = as_law(A), as_law(B)
+    if not len(A) or not len(B):
+        return Law(0, [])
+    # 在共同步长的压缩下标上计算，θ 也按压缩下标理解
+    A, B = align_grids(A, B)
+
+    size = len(A) + len(B) - 1
+    n = _fft_size(size)
+    k = np.arange(size)
+    la = _log_probs(A)
+    lb = la if B is A else _log_probs(B)
+    finite = [l[np.isfinite(l)] for l in (la, lb)]
+    log_range = max(np.abs(f).max() for f in finite)
+
+    def run(theta):
+        ta, sa = _tilt(la, theta)
+        Fa = np.fft.rfft(ta, n)
+        if B is A:
+            tb, sb, Fb = ta, sa, Fa
+        else:
+            tb, sb = _tilt(lb, theta)
+            Fb = np.fft.rfft(tb, n)
+        c = np.fft.irfft(Fa * Fb, n)[:size]
+
+        abs_err = _FFT_ERR_CONST * UNIT_ROUNDOFF * log2(n) * ta.sum() * tb.sum()
+        # exp / log 缩放本身的相对误差
+        rel_err = 4 * UNIT_ROUNDOFF * (log_range + abs(theta) * size + abs(sa) + abs(sb))
+        logscale = sa + sb - theta * k
+        with np.errstate(over="ignore", invalid="ignore"):
+            scale = np.exp(logscale)
+            val = c * scale
+            return val, abs_err * scale + rel_err * np.abs(val)
+
+    support = _sumset_mask(A, B)
+    est, bound = _refine_tilts(run, [la, lb], None, size, support, rtol, max_tilts)
+    rel, dropped = _settle(est, bound, support)
+
+    err, dropped = combine_errors(A, B, rel, dropped)
+    return Law(A.offset + B.offset, est, err, dropped, A.stride, A.scale).trim()
+
+
+# =============================
+# 变换域融合求和
+# =============================
+#
+# Σ_k (X_k 的 c_k 次独立和) 的特征函数为 Π_k φ_k^{c_k}：各项只做一次正变换，
+# 在变换域里求幂并相乘，再逆变换一次，中间的自卷积结果都不落地。
+#
+# 尾部精度同样靠指数倾斜控制。倾斜后各项归一化为概率分布，|φ_k| ≤ 1，
+# 求幂不会溢出；c 次幂把单项变换的绝对误差至多放大 c 倍，所以逆变换后
+# 的绝对误差约为 u·(log2 N + π)·Σ c_k（相对于倾斜后的总质量 1）。
+
+def _align_all(laws):
+    """
+    把一组分布换到共同的定点分母与步长上（多个分布的 align_grids）
+    """
+    scale = lcm(*(L.scale for L in laws))
+    laws = [L.rescale(scale) for L in laws]
+    s = 0
+    for L in laws:
+        if len(L) > 1:
+            s = gcd(s, L.stride)
+    return [L.restride(s or 1) for L in laws]
+
+
+def _power_mask(mask, c):
+    """
+    支撑 mask 的 c 重和集（二进制快速幂）
+    """
+    out, base = np.ones(1, dtype=bool), mask
+    while c:
+        if c & 1:
+            out = _mask_sum(out, base)
+        c >>= 1
+        if c:
+            base = _mask_sum(base, base)
+    return out
+
+
+def fused_sum(terms, rtol=DEFAULT_RTOL, max_tilts=256):
+    """
+    独立项之和的分布：在变换域中一次完成所有自卷积与卷积
+
+    参数
+    ----
+    terms : list of (Law, int)
+        各项的分布及其重复次数
+    rtol : float
+        每个概率值的目标相对误差
+    max_tilts : int
+        最多使用的倾斜次数
+
+    返回
+    ----
+    Law
+        err / dropped 的含义同 tilted_convolution
+    """
+    terms = [(as_law(L), c) for L, c in terms if c]
+    if not terms or any(not len(L) for L, _ in terms):
+        return Law(0, [])
+    laws = _align_all([L for L, _ in terms])
+    counts = [c for _, c in terms]
+
+    size = sum(c * (len(L) - 1) for L, c in zip(laws, counts)) + 1
+    n = _fft_size(size)
+    k = np.arange(size)
+    logps = [_log_probs(L) for L in laws]
+    log_range = max(np.abs(l[np.isfinite(l)]).max() for l in logps)
+    total = sum(counts)
+
+    def run(theta):
+        F = np.ones(n // 2 + 1, dtype=np.complex128)
+        shift = 0.0
+        for logp, c in zip(logps, counts):
+            t, s = _tilt(logp, theta)
+            z = t.sum()
+            F *= np.fft.rfft(t / z, n) ** c
+            shift += c * (s + log(z))
+        v = np.fft.irfft(F, n)[:size]
+
+        abs_err = _FFT_ERR_CONST * UNIT_ROUNDOFF * (log2(n) + pi) * (1 + total)
+        # exp / log 缩放本身的相对误差
+        rel_err = 4 * UNIT_ROUNDOFF * (total * log_range + abs(theta) * size + abs(shift))
+        logscale = shift - theta * k
+        with np.errstate(over="ignore", invalid="ignore"):
+            scale = np.exp(logscale)
+            val = v * scale
+            return val, abs_err * scale + rel_err * np.abs(val)
+
+    support = np.ones(1, dtype=bool)
+    for L, c in zip(laws, counts):
+        support = _mask_sum(support, _power_mask(L.probs > 0, c))
+    est, bound = _refine_tilts(run, logps, counts, size, support, rtol, max_tilts)
+    rel, dropped = _settle(est, bound, support)
+
+    err = 1 + rel
+    for L, c in zip(laws, counts):
+        err *= (1 + L.err) ** c
+        dropped += c * L.dropped
+    offset = sum(c * L.offset for L, c in zip(laws, counts))
+    return Law(offset, est, err - 1, dropped, laws[0].stride, laws[0].scale).trim()
+
+
+# =============================
+# 批量尾概率
+# =============================
+#
+# 一批和 X_j = Σ_k (L_k 的 c_jk 次独立和) 共用同一组基础分布，只有重复次数
+# 不同（如 3n 方案的 n/2 个系数位置）。把各行按鞍点 θ_j 分组，每组取一个
+# 公共倾斜 θ：各基础分布倾斜后的谱 φ_k 与 log φ_k 每组只算一次，组内各行
+# 的谱为 exp(Σ_k c_jk·log φ_k)（一次 (行, K) × (K, 频率) 的矩阵乘法，指数
+# 沿行变化），逆变换后只对尾部加权求和，不构造任何中间分布。
+#
+# 组内各行的鞍点与公共 θ 相差 δ 时，尾部起点处的相对精度约损失
+# e^{(δσ)²/2} 倍（σ 为倾斜后的标准差），分组时限制 |δ|·σ ≤ _GROUP_SPREAD。
+
+# 每块复数数组的元素个数上限
+_BATCH_ELEMS = 1 << 22
+
+# 变换窗口之外允许的倾斜后概率质量
+_WINDOW_MASS = UNIT_ROUNDOFF
+
+# 组内鞍点与公共倾斜之差（以倾斜后的标准差为单位）的上限
+_GROUP_SPREAD = 4.0
+
+
+def _batch_tilted_mean_var(logps, counts, theta):
+    """
+    各行在倾斜 θ_j 下的均值与方差（局部下标坐标）
+    """
+    mean, var = np.zeros(len(theta)), np.zeros(len(theta))
+    for k, logp in enumerate(logps):
+        x = np.arange(len(logp))
+        t = logp[None, :] + theta[:, None] * x[None, :]
+        w = np.exp(t - t.max(axis=1, keepdims=True))
+        z = w.sum(axis=1)
+        m = (w * x).sum(axis=1) / z
+        mean += counts[:, k] * m
+        var += counts[:, k] * (w * (x - m[:, None]) ** 2).sum(axis=1) / z
+    return mean, var
+
+
+def _batch_log_mgf(logps, counts, theta):
+    """
+    各行的 log E[e^{θY}]（局部下标坐标）
+    """
+    K = np.zeros(len(theta))
+    for k, logp in enumerate(logps):
+        t = logp[None, :] + theta[:, None] * np.arange(len(logp))[None, :]
+        s = t.max(axis=1)
+        K += counts[:, k] * (s + np.log(np.exp(t - s[:, None]).sum(axis=1)))
+    return K
+
+
+def _batch_window(logps, counts, theta, mu, var, top):
+    """
+    倾斜 θ_j 后的分布落在 [μ - a_L, μ + a_R] 之外的质量不超过 _WINDOW_MASS
+
+    两侧分别用 Chernoff 界 P_θ(±(Y - μ) ≥ a) ≤ exp(K(θ ± λ) - K(θ) ∓ λ(μ ± a))，
+    λ = a/σ²，a 从 6σ 起逐步放大到界满足为止（不超过支撑）
+
+    返回
+    ----
+    (np.ndarray, np.ndarray)
+        窗口的起点与终点（含）
+    """
+    K0 = _batch_log_mgf(logps, counts, theta)
+    sd = np.sqrt(np.maximum(var, 1e-300))
+    ends = []
+    for side in (1, -1):
+        a = 6 * sd
+        limit = top - mu if side > 0 else mu
+        todo = a < limit
+        for _ in range(60):
+            if not todo.any():
+                break
+            lam = a[todo] / sd[todo] ** 2
+            K = _batch_log_mgf(logps, counts[todo], theta[todo] + side * lam)
+            ok = K - K0[todo] - lam * (side * mu[todo] + a[todo]) <= log(_WINDOW_MASS / 2)
+            grow = np.flatnonzero(todo)[~ok]
+            a[grow] *= 1.25
+            todo[:] = False
+            todo[grow] = a[grow] < limit[grow]
+        ends.append(np.minimum(a, limit))
+    lo = np.maximum(np.floor(mu - ends[1]), 0).astype(np.int64)
+    hi = np.minimum(np.ceil(mu + ends[0]), top).astype(np.int64)
+    return lo, hi
+
+
+def _batch_solve_tilt(logps, counts, target):
+    """
+    逐行求 θ_j ≥ 0 使倾斜后的均值落在 target_j 附近（均值已超过 target 的行取 0）
+    """
+    theta = np.zeros(len(target))
+    active = _batch_tilted_mean_var(logps, counts, theta)[0] < target - 0.5
+    if not active.any():
+        return theta
+    c, tg = counts[active], target[active]
+    lo, hi = np.zeros(len(tg)), np.ones(len(tg))
+    # 倍增找到包含解的区间，再二分
+    for _ in range(64):
+        grow = _batch_tilted_mean_var(logps, c, hi)[0] < tg
+        if not grow.any():
+            break
+        lo[grow], hi[grow] = hi[grow], 2 * hi[grow]
+    for _ in range(40):
+        mid = (lo + hi) / 2
+        over = _batch_tilted_mean_var(logps, c, mid)[0] >= tg
+        hi, lo = np.where(over, mid, hi), np.where(over, lo, mid)
+    theta[active] = (lo + hi) / 2
+    return theta
+
+
+def _tilt_groups(theta, sigma):
+    """
+    按 θ 排序后贪心分组，组内 |θ_j - θ_g|·σ_j ≤ _GROUP_SPREAD
+
+    返回
+    ----
+    list of (行下标数组, θ_g)
+    """
+    order = np.argsort(theta)
+    groups, start = [], 0
+    while start < len(order):
+        end = start + 1
+        lo = theta[order[start]]
+        while end < len(order):
+            hi = theta[order[end]]
+            g = order[start:end + 1]
+            if ((hi - lo) / 2 * sigma[g]).max() > _GROUP_SPREAD:
+                break
+            end += 1
+        g = order[start:end]
+        groups.append((g, (theta[g].min() + theta[g].max()) / 2))
+        start = end
+    return groups
+
+
+def _batch_right_tails(logps, counts, start, progress=NO_PROGRESS, stage="tails"):
+    """
+    Σ_{y ≥ start_j} P(Y_j = y)，Y_j 为各项局部下标之和
+
+    每处理完一批行在 progress 上回报 stage 阶段的进度
+
+    返回
+    ----
+    (np.ndarray, np.ndarray)
+        尾概率估计与绝对误差界
+    """
+    lens = np.array([len(l) for l in logps])
+    top = counts @ (lens - 1)
+    total = counts.sum(axis=1)
+    tails, bounds = np.zeros(len(start)), np.zeros(len(start))
+    live = np.flatnonzero(start <= top)
+    if not live.size:
+        return tails, bounds
+    theta = _batch_solve_tilt(logps, counts[live], np.minimum(start[live], top[live] - 0.5))
+    mu, var = _batch_tilted_mean_var(logps, counts[live], theta)
+    log_range = max(np.abs(l[np.isfinite(l)]).max() for l in logps)
+
+    groups = _tilt_groups(theta, np.sqrt(var))
+    # 倾斜后的分布集中在均值附近，变换长度只需覆盖质量在 _WINDOW_MASS 之外的窗口；
+    # 窗外的质量折叠进窗口或被截掉，对加权尾和的影响各不超过 _WINDOW_MASS
+    lo, hi = np.zeros(len(live), dtype=np.int64), np.zeros(len(live), dtype=np.int64)
+    for group, th in groups:
+        g_theta = np.full(len(group), th)
+        m, v = _batch_tilted_mean_var(logps, counts[live[group]], g_theta)
+        lo[group], hi[group] = _batch_window(logps, counts[live[group]], g_theta, m, v, top[live[group]])
+    full = top[live] + 1
+    n = _fft_size(int((hi - lo).max()) + 1)
+    rows = max(1, _BATCH_ELEMS // (n // 2 + 1))
+
+    steps = sum(-(-len(group) // rows) for group, _ in groups)
+    done = 0
+    progress.update(stage, 0, steps, n)
+    for group, th in groups:
+        # 公共倾斜下各基础分布的谱，每组只算一次
+        logphi = np.empty((len(logps), n // 2 + 1), dtype=np.complex128)
+        shifts = np.empty(len(logps))
+        with np.errstate(divide="ignore"):
+            for k, logp in enumerate(logps):
+                t, s = _tilt(logp, th)
+                z = t.sum()
+                logphi[k] = np.log(np.fft.rfft(t / z, n))
+                shifts[k] = s + log(z)
+        # 谱为 0 的频率：c = 0 时贡献 φ^0 = 1，c > 0 时 exp 下溢为 0
+        logphi[np.isneginf(logphi.real)] = -1e4
+
+        for r in range(0, len(group), rows):
+            sub = group[r:r + rows]
+            idx = live[sub]
+            c = counts[idx].astype(np.float64)
+            v = np.fft.irfft(np.exp(c @ logphi), n, axis=1)
+            shift = c @ shifts
+
+            # 窗口内的下标 y = lo + (0..n-1)，循环卷积的结果在 y mod n 处
+            clipped = np.where(full[sub] <= n, 0.0, 2 * _WINDOW_MASS)
+            y = np.where(full[sub] <= n, 0, lo[sub])[:, None] + np.arange(n)[None, :]
+            v = np.take_along_axis(v, y % n, axis=1)
+
+            # 从 start 起按 e^{-θ(y - start)} 加权，尾部只含 y ≤ top
+            d = y - start[idx, None]
+            mask = (d >= 0) & (y <= top[idx, None])
+            W = np.where(mask, np.exp(-th * np.where(mask, d, 0)), 0.0)
+            head = np.exp(shift - th * start[idx])
+            est = (W * v).sum(axis=1)
+
+            # 误差模型同 fused_sum：倾斜后的绝对误差，加上 exp / log 缩放的相对误差
+            abs_err = _FFT_ERR_CONST * UNIT_ROUNDOFF * (log2(n) + pi) * (1 + total[idx])
+            rel_err = 4 * UNIT_ROUNDOFF * (total[idx] * log_range + th * top[idx] + np.abs(shift))
+            tails[idx] = head * np.maximum(est, 0.0)
+            bounds[idx] = head * (abs_err * W.sum(axis=1) + rel_err * np.abs(est) + clipped)
+            done += 1
+            progress.update(stage, done, steps, n)
+    return tails, bounds
+
+
+def fused_tails(laws, counts, t, progress=NO_PROGRESS):
+    """
+    一批独立项之和的尾概率 P(|X_j| > t)，X_j = Σ_k (laws[k] 的 counts[j][k] 次独立和)
+
+    所有行在变换域中一起计算，不构造各行的分布；尾部求和范围与
+    3n 模块的 |x| > t 一致
+
+    参数
+    ----
+    laws : list of Law
+        基础分布
+    counts : array-like, shape (M, K)
+        各行中每个基础分布的重复次数
+    t : int
+        阈值（实际取值）
+    progress : Progress
+        进度回报与取消检查，见 failure.progress
+
+    返回
+    ----
+    (np.ndarray, np.ndarray)
+        各行尾概率的估计值与绝对误差界
+    """
+    laws = _align_all([as_law(L) for L in laws])
+    counts = np.asarray(counts, dtype=np.int64).reshape(-1, len(laws))
+    S, s = laws[0].scale, laws[0].stride
+    off = counts @ np.array([L.offset for L in laws], dtype=np.int64)
+    top = counts @ np.array([len(L) - 1 for L in laws], dtype=np.int64)
+    T = int(t * S)
+
+    logps = [_log_probs(L) for L in laws]
+    # 右尾：off + s·y > T
+    right, rb = _batch_right_tails(logps, counts, (T - off) // s + 1, progress)
+    if all(isinstance(L, SymmetricLaw) for L in laws):
+        return 2 * right, 2 * rb
+    # 左尾：off + s·y < -T，翻转后为 top - y ≥ top - yl
+    yl = -((T + off) // s) - 1
+    left, lb = _batch_right_tails([l[::-1] for l in logps], counts, top - yl, progress, "left tails")
+    return right + left, rb + lb
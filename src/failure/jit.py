@@ -0,0 +1,79 @@
+import os
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# =============================
+# 可选的 JIT 内核
+# =============================
+#
+# 安装了 Numba 时，下面几个内层循环编译为机器码（cache=True，编译结果
+# 缓存在 __pycache__ 中，之后的启动不再付编译开销）；否则对应的名字为
+# None，util.py 走 NumPy / 纯 Python 的实现。设置环境变量
+# FAILURE_NO_JIT=1 可以强制关闭。
+#
+# 内核只接收连续的 int64 / float64 数组，输出数组由调用方分配。
+
+HAVE_JIT = numba is not None and not os.environ.get("FAILURE_NO_JIT")
+
+
+def _jit(f):
+    if not HAVE_JIT:
+        return None
+    return numba.njit(cache=True, nogil=True)(f)
+
+
+def _sparse_convolve(ia, pa, ib, pb, out):
+    """
+    out[i + j] += pa[i]·pb[j]，只遍历非零点
+    """
+    for x in range(ia.shape[0]):
+        i, p = ia[x], pa[x]
+        for y in range(ib.shape[0]):
+            out[i + ib[y]] += p * pb[y]
+
+
+def _scatter_products(xa, pa, xb, pb, lo, g, out):
+    """
+    out[(a·b - lo) / g] += P(a)·P(b)
+    """
+    for x in range(xa.shape[0]):
+        a, p = xa[x], pa[x]
+        for y in range(xb.shape[0]):
+            out[(a * xb[y] - lo) // g] += p * pb[y]
+
+
+def _tail_sum(probs, offset, stride, t0, ma):
+    """
+    Σ_j P_j·([t0 ≤ x_j < ma] + [t0 ≤ -x_j < ma])，x_j = offset + stride·j
+
+    从两端向中心累加（先加尾部的小项）
+    """
+    s = 0.0
+    n = probs.shape[0]
+    lo, hi = 0, n - 1
+    while lo <= hi:
+        # 每次取离中心更远的一端
+        xl = offset + stride * lo
+        xh = offset + stride * hi
+        if -xl >= xh:
+            j, x = lo, xl
+            lo += 1
+        else:
+            j, x = hi, xh
+            hi -= 1
+        c = 0
+        if t0 <= x < ma:
+            c += 1
+        if t0 <= -x < ma:
+            c += 1
+        if c:
+            s += c * probs[j]
+    return s
+
+
+sparse_convolve = _jit(_sparse_convolve)
+scatter_products = _jit(_scatter_products)
+tail_sum = _jit(_tail_sum)
@@ -0,0 +1,513 @@
+from fractions import Fraction
+from math import gcd, lcm
+
+import numpy as np
+
+
+# 定点分母上限：float 取值 / 缩放系数取分母不超过它的最近有理数，
+# 运算结果的定点分母超过它时报错
+MAX_SCALE = 10 ** 6
+
+
+def as_fraction(x):
+    """
+    取值或缩放系数对应的有理数
+
+    float 取分母不超过 MAX_SCALE 的最近有理数（0.1 → 1/10，1/3 → 1/3），
+    不按十进制写法展开成 3333333333333333/10^16；int / Fraction 保持精确
+    """
+    if isinstance(x, float):
+        return Fraction(x).limit_denominator(MAX_SCALE)
+    return Fraction(x)
+
+
+def check_scale(scale):
+    """
+    定点分母超过 MAX_SCALE 时抛出 ValueError
+    """
+    if scale > MAX_SCALE:
+        raise ValueError(f"定点分母 {scale} 超过上限 {MAX_SCALE}")
+    return scale
+
+
+def grid_slice(offset, stride, n, a, b):
+    """
+    格点 offset + stride·j（0 ≤ j < n）中 a ≤ x < b 的下标范围
+
+    返回
+    ----
+    slice
+    """
+    lo = min(max(-((offset - a) // stride), 0), n)
+    hi = min(max(-((offset - b) // stride), lo), n)
+    return slice(lo, hi)
+
+
+# =============================
+# 数组表示的概率分布
+# =============================
+
+class Law:
+    """
+    整数支撑上的离散概率分布
+
+    用一个整数偏移 offset、步长 stride 加一段连续的 float64 数组 probs 表示：
+        probs[j] = P(X = offset + stride·j)
+
+    支撑落在子格 offset + stride·Z 上时（例如放大 3 倍后的分布），
+    只保存格点上的值，卷积 / FFT 的规模按 stride 缩小。
+
+    非整数取值用定点表示：格点 x 代表取值 x / scale。offset、stride、
+    support()、prob() 等都以格点（整数）为单位，只有 items() / to_dict()
+    给出实际取值。
+
+    与 dict {x: P(X = x)} 相比，卷积 / 乘积 / 尾概率都可以直接
+    在 NumPy 数组上完成，不再有逐项哈希和浮点装箱的开销。
+
+    误差信息随分布一起传递：
+        err     : probs 中每一项的相对误差上界
+        dropped : 未计入 probs 的概率质量上界
+    """
+
+    __slots__ = ("offset", "probs", "err", "dropped", "stride", "scale")
+
+    def __init__(self, offset, probs, err=0.0, dropped=0.0, stride=1, scale=1):
+        self.offset = int(offset)
+        self.probs = np.ascontiguousarray(probs, dtype=np.float64)
+        self.err = float(err)
+        self.dropped = float(dropped)
+        self.stride = int(stride)
+        self.scale = int(scale)
+
+    # -----------------------------
+    # 构造
+    # -----------------------------
+
+    @classmethod
+    def from_dict(cls, D):
+        """
+        由 dict {x: P(X = x)} 构造分布
+
+        非整数 x 取有理数（见 as_fraction），scale 取各分母的最小公倍数
+        """
+        if not D:
+            return cls(0, [])
+        if all(x == int(x) for x in D):
+            return Law.from_support([int(x) for x in D], list(D.values()))
+        keys = [as_fraction(x) for x in D]
+        scale = check_scale(lcm(*(k.denominator for k in keys)))
+        return Law.from_support([int(k * scale) for k in keys], list(D.values()), scale)
+
+    @classmethod
+    def from_support(cls, values, probs, scale=1):
+        """
+        由（可能重复的）支撑点数组与对应概率数组构造分布，重复点概率相加，
+        支撑点之差的最大公约数作为 stride
+
+        参数
+        ----
+        values : array_like of int
+            格点
+        probs : array_like of float
+        scale : int
+            定点分母，格点 x 代表取值 x / scale
+
+        返回
+        ----
+        Law
+        """
+        values = np.asarray(values, dtype=np.int64)
+        probs = np.asarray(probs, dtype=np.float64)
+        if values.size == 0:
+            return cls(0, [])
+        lo = int(values.min())
+        idx = values - lo
+        s = max(int(np.gcd.reduce(idx)), 1)
+        acc = np.bincount(idx // s, weights=probs, minlength=int(idx.max()) // s + 1)
+        return cls(lo, acc, stride=s, scale=scale)
+
+    @classmethod
+    def point(cls, x=0):
+        """
+        退化分布 P(X = x) = 1
+        """
+        return cls(x, [1.0])
+
+    # -----------------------------
+    # 基本属性
+    # -----------------------------
+
+    def __len__(self):
+        return len(self.probs)
+
+    def __repr__(self):
+        return f"Law(offset={self.offset}, size={len(self.probs)}, stride={self.stride}, scale={self.scale})"
+
+    @property
+    def lo(self):
+        """支撑下界"""
+        return self.offset
+
+    @property
+    def hi(self):
+        """支撑上界"""
+        return self.offset + self.stride * (len(self.probs) - 1)
+
+    def support(self):
+        """
+        返回与 probs 一一对应的支撑点数组
+        """
+        return self.offset + self.stride * np.arange(len(self.probs), dtype=np.int64)
+
+    def prob(self, xs):
+        """
+        批量查询 P(X = x)，支撑外返回 0
+
+        参数
+        ----
+        xs : array_like of int
+
+        返回
+        ----
+        np.ndarray
+        """
+        xs = np.asarray(xs, dtype=np.int64)
+        idx, rem = np.divmod(xs - self.offset, self.stride)
+        inside = (rem == 0) & (idx >= 0) & (idx < len(self.probs))
+        out = np.zeros(xs.shape)
+        out[inside] = self.probs[idx[inside]]
+        return out
+
+    def get(self, x, default=0.0):
+        j, r = divmod(x - self.offset, self.stride)
+        if r == 0 and 0 <= j < len(self.probs):
+            return float(self.probs[j])
+        return default
+
+    def mass(self):
+        """总概率质量"""
+        return float(self.probs.sum())
+
+    def nonzero(self):
+        """
+        返回概率非零的 (支撑点, 概率) 两个数组
+        """
+        idx = np.flatnonzero(self.probs)
+        return self.offset + self.stride * idx, self.probs[idx]
+
+    def items(self):
+        """
+        与 dict.items() 相同的迭代接口，只给出非零项，键为实际取值
+        """
+        xs, ps = self.nonzero()
+        if self.scale != 1:
+            return zip((xs / self.scale).tolist(), ps.tolist())
+        return zip(xs.tolist(), ps.tolist())
+
+    # -----------------------------
+    # 变换
+    # -----------------------------
+
+    def trim(self):
+        """
+        去掉两端的零概率项
+        """
+        idx = np.flatnonzero(self.probs)
+        if idx.size == 0:
+            return Law(0, [], self.err, self.dropped)
+        a, b = idx[0], idx[-1] + 1
+        if a == 0 and b == len(self.probs):
+            return self
+        return Law(self.offset + self.stride * a, self.probs[a:b], self.err, self.dropped,
+                   self.stride, self.scale)
+
+    def copy(self):
+        return Law(self.offset, self.probs.copy(), self.err, self.dropped, self.stride, self.scale)
+
+    def restride(self, s):
+        """
+        换成更细的步长 s（s 须整除 stride），中间补零；单点分布可取任意步长
+        """
+        if s == self.stride:
+            return self
+        if len(self.probs) <= 1:
+            return Law(self.offset, self.probs, self.err, self.dropped, s, self.scale)
+        f = self.stride // s
+        probs = np.zeros((len(self.probs) - 1) * f + 1)
+        probs[::f] = self.probs
+        return Law(self.offset, probs, self.err, self.dropped, s, self.scale)
+
+    def rescale(self, scale):
+        """
+        换成更细的定点分母 scale（须为当前 scale 的倍数）：
+        格点整体放大，概率数组不变
+        """
+        k = scale // self.scale
+        if k == 1:
+            return self
+        return Law(self.offset * k, self.probs, self.err, self.dropped, self.stride * k, scale)
+
+    def reduce_scale(self):
+        """
+        约去 offset、stride 与 scale 的公因子，得到最小的定点分母
+        """
+        g = gcd(self.offset, self.stride, self.scale)
+        if g == 1:
+            return self
+        return Law(self.offset // g, self.probs, self.err, self.dropped, self.stride // g, self.scale // g)
+
+    def to_dict(self):
+        """
+        转换回 dict {x: P(X = x)}，仅在 API 边界使用
+        """
+        return dict(self.items())
+
+
+class SymmetricLaw(Law):
+    """
+    关于 0 对称的分布 P(X = x) = P(X = -x)，只保存 x ≥ 0 的一半：
+        half[j] = P(X = stride·j), j = 0..h
+
+    offset / probs 以属性形式给出完整分布，未做对称优化的代码可以
+    直接把它当作普通 Law 使用；只有访问 probs 时才会展开成完整数组。
+    """
+
+    __slots__ = ("half",)
+
+    def __init__(self, half, err=0.0, dropped=0.0, stride=1, scale=1):
+        self.half = np.ascontiguousarray(half, dtype=np.float64)
+        self.err = float(err)
+        self.dropped = float(dropped)
+        self.stride = int(stride)
+        self.scale = int(scale)
+
+    def __reduce__(self):
+        # offset / probs 是只读属性，不能按 __slots__ 默认方式序列化
+        return SymmetricLaw, (self.half, self.err, self.dropped, self.stride, self.scale)
+
+    @classmethod
+    def point(cls, x=0):
+        if x != 0:
+            return Law.point(x)
+        return cls([1.0])
+
+    @property
+    def offset(self):
+        return -self.hi
+
+    @property
+    def probs(self):
+        return np.concatenate((self.half[:0:-1], self.half))
+
+    def __len__(self):
+        return max(2 * len(self.half) - 1, 0)
+
+    def __repr__(self):
+        return f"SymmetricLaw(half={len(self.half)}, stride={self.stride}, scale={self.scale})"
+
+    @property
+    def hi(self):
+        return self.stride * (len(self.half) - 1)
+
+    def prob(self, xs):
+        idx, rem = np.divmod(np.abs(np.asarray(xs, dtype=np.int64)), self.stride)
+        inside = (rem == 0) & (idx < len(self.half))
+        out = np.zeros(idx.shape)
+        out[inside] = self.half[idx[inside]]
+        return out
+
+    def get(self, x, default=0.0):
+        j, r = divmod(abs(x), self.stride)
+        if r == 0 and j < len(self.half):
+            return float(self.half[j])
+        return default
+
+    def mass(self):
+        return float(self.half[0] + 2 * self.half[1:].sum()) if len(self.half) else 0.0
+
+    def trim(self):
+        idx = np.flatnonzero(self.half)
+        if idx.size == 0:
+            return Law(0, [], self.err, self.dropped)
+        if idx[-1] + 1 == len(self.half):
+            return self
+        return SymmetricLaw(self.half[:idx[-1] + 1], self.err, self.dropped, self.stride, self.scale)
+
+    def copy(self):
+        return SymmetricLaw(self.half.copy(), self.err, self.dropped, self.stride, self.scale)
+
+    def restride(self, s):
+        if s == self.stride:
+            return self
+        if len(self.half) <= 1:
+            return SymmetricLaw(self.half, self.err, self.dropped, s, self.scale)
+        f = self.stride // s
+        half = np.zeros((len(self.half) - 1) * f + 1)
+        half[::f] = self.half
+        return SymmetricLaw(half, self.err, self.dropped, s, self.scale)
+
+    def rescale(self, scale):
+        k = scale // self.scale
+        if k == 1:
+            return self
+        return SymmetricLaw(self.half, self.err, self.dropped, self.stride * k, scale)
+
+    def reduce_scale(self):
+        g = gcd(self.stride, self.scale)
+        if g == 1:
+            return self
+        return SymmetricLaw(self.half, self.err, self.dropped, self.stride // g, self.scale // g)
+
+
+def as_symmetric(A, rtol=2.0 ** -40):
+    """
+    若 A 在相对误差 rtol 内关于 0 对称，返回 SymmetricLaw，否则原样返回
+
+    两侧取平均，平均引入的相对偏差计入 err
+    """
+    if isinstance(A, SymmetricLaw) or not isinstance(A, Law) or not len(A):
+        return A
+    A = A.trim()
+    if A.offset != -A.hi:
+        return A
+    p = A.probs
+    q = p[::-1]
+    diff = np.abs(p - q)
+    if np.any(diff > rtol * np.maximum(p, q)):
+        return A
+    h = len(p) // 2
+    half = (p[h:] + q[h:]) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel = float(np.max(np.where(half > 0, diff[h:] / (2 * half), 0.0)))
+    err = (1 + A.err) * (1 + rel) - 1
+    return SymmetricLaw(half, err, A.dropped, A.stride, A.scale)
+
+
+def common_stride(A, B):
+    """
+    A + B 所在子格的步长：两者 stride 的最大公约数，单点分布不参与
+    """
+    sa = A.stride if len(A) > 1 else 0
+    sb = B.stride if len(B) > 1 else 0
+    return gcd(sa, sb) or 1
+
+
+def align_grids(A, B):
+    """
+    把 A、B 换到共同的定点分母与步长上，之后可以直接对 probs 做卷积
+
+    返回
+    ----
+    (Law, Law)
+    """
+    if A.scale != B.scale:
+        scale = lcm(A.scale, B.scale)
+        A, B = A.rescale(scale), B.rescale(scale)
+    s = common_stride(A, B)
+    return A.restride(s), B.restride(s)
+
+
+def as_law(A):
+    """
+    把 dict 形式的分布转换为 Law，Law 原样返回
+    """
+    if isinstance(A, Law):
+        return A
+    return Law.from_dict(A)
+
+
+# =============================
+# 误差传递
+# =============================
+
+# 双精度单位舍入误差
+UNIT_ROUNDOFF = 2.0 ** -53
+
+
+def gamma(k):
+    """
+    k 次浮点加乘累积的相对误差界 γ_k = k·u / (1 - k·u)
+    """
+    ku = k * UNIT_ROUNDOFF
+    return ku / (1 - ku)
+
+
+def combine_errors(A, B, rel=0.0, dropped=0.0):
+    """
+    独立变量之和 / 积的误差传递
+
+    参数
+    ----
+    A, B : Law
+        两个输入分布
+    rel : float
+        本次运算自身引入的相对误差
+    dropped : float
+        本次运算自身丢弃的概率质量
+
+    返回
+    ----
+    (float, float)
+        结果分布的 (err, dropped)
+    """
+    err = (1 + A.err) * (1 + B.err) * (1 + rel) - 1
+    lost = A.dropped + B.dropped + A.dropped * B.dropped + dropped
+    return err, lost
+
+
+class FailureExponent(float):
+    """
+    log2 失败概率的估计值（可直接当作 float 使用）
+
+    属性
+    ----
+    upper : float
+        log2 失败概率的严格上界
+    error : float
+        upper - 估计值（bit），即估计值到严格上界的距离
+    """
+
+    def __new__(cls, value, upper, error):
+        obj = super().__new__(cls, value)
+        obj.upper = float(upper)
+        obj.error = float(error)
+        return obj
+
+    def __reduce__(self):
+        return FailureExponent, (float(self), self.upper, self.error)
+
+    def __str__(self):
+        return float.__repr__(self)
+
+    def __repr__(self):
+        return f"FailureExponent({float(self)!r}, upper={self.upper!r}, error={self.error!r})"
+
+
+class SaddlepointExponent(float):
+    """
+    鞍点法得到的 log2 失败概率估计值（可直接当作 float 使用）
+
+    鞍点估计本身没有严格的误差界，因此不提供 error 属性。
+
+    属性
+    ----
+    upper : float
+        log2 失败概率的 Chernoff 上界（严格成立）
+    chernoff_gap : float
+        upper - 估计值（bit），只说明估计值比 Chernoff 上界低多少，不是误差界
+    """
+
+    def __new__(cls, value, upper, chernoff_gap):
+        obj = super().__new__(cls, value)
+        obj.upper = float(upper)
+        obj.chernoff_gap = float(chernoff_gap)
+        return obj
+
+    def __reduce__(self):
+        return SaddlepointExponent, (float(self), self.upper, self.chernoff_gap)
+
+    def __str__(self):
+        return float.__repr__(self)
+
+    def __repr__(self):
+        return f"SaddlepointExponent({float(self)!r}, upper={self.upper!r}, chernoff_gap={self.chernoff_gap!r})"
@@ -0,0 +1,340 @@
+from math import ceil, gcd, lcm, log
+
+import numpy as np
+
+from .law import Law, as_law, as_fraction, check_scale, grid_slice, gamma, UNIT_ROUNDOFF
+from .progress import NO_PROGRESS
+
+# =============================
+# 对数域分布
+# =============================
+#
+# float64 的概率在 2^-1074 处下溢，Law 为此在 2^-300 处剪枝；
+# 需要 2^-1000 量级的尾部时，把概率存成自然对数 log P。
+#
+# 卷积仍用 np.convolve 完成：把两边按 log P 的大小分成若干层，
+# 每层内的动态范围不超过 _BAND 个 nat，减去层内最大值后取 exp 不会下溢，
+# 两层之积也不会下溢。各层两两卷积，再用 logaddexp 合并到输出上。
+# 非负项求和的逐点相对误差界与直接卷积相同，工作量也相同，
+# 只多出 (层数)² 次 np.convolve 调用的开销。
+
+# 每层的动态范围（nat）：e^-300·e^-300 ≈ 1e-261 仍远高于下溢阈值
+_BAND = 300.0
+
+# 默认剪枝阈值：丢弃 P < 2^-1200 的项
+DEFAULT_LOG_PRUNE = -1200 * log(2)
+
+
+class LogLaw:
+    """
+    对数域的离散分布：logp[j] = log P(X = offset + stride·j)，P = 0 记为 -inf
+
+    格点与定点分母的含义同 Law；err 为逐点相对误差上界
+    """
+
+    __slots__ = ("offset", "logp", "err", "stride", "scale")
+
+    def __init__(self, offset, logp, err=0.0, stride=1, scale=1):
+        self.offset = int(offset)
+        self.logp = np.ascontiguousarray(logp, dtype=np.float64)
+        self.err = float(err)
+        self.stride = int(stride)
+        self.scale = int(scale)
+
+    @classmethod
+    def from_law(cls, A):
+        """
+        由 Law 或 dict 构造
+        """
+        A = as_law(A)
+        with np.errstate(divide="ignore"):
+            logp = np.log(A.probs)
+        # log 本身的舍入换算成概率的相对误差
+        err = (1 + A.err) * (1 + 2 * UNIT_ROUNDOFF * (1 + np.abs(logp[np.isfinite(logp)]).max(initial=0))) - 1
+        return cls(A.offset, logp, err, A.stride, A.scale)
+
+    def to_law(self):
+        """
+        转换为 Law（低于 2^-1074 的概率下溢为 0）
+        """
+        return Law(self.offset, np.exp(self.logp), self.err, 0.0, self.stride, self.scale)
+
+    def __len__(self):
+        return len(self.logp)
+
+    def __repr__(self):
+        return f"LogLaw(offset={self.offset}, size={len(self.logp)}, stride={self.stride}, scale={self.scale})"
+
+    @property
+    def lo(self):
+        return self.offset
+
+    @property
+    def hi(self):
+        return self.offset + self.stride * (len(self.logp) - 1)
+
+    def log_prob(self, xs):
+        """
+        批量查询 log P(X = x)，支撑外返回 -inf
+        """
+        xs = np.asarray(xs, dtype=np.int64)
+        idx, rem = np.divmod(xs - self.offset, self.stride)
+        inside = (rem == 0) & (idx >= 0) & (idx < len(self.logp))
+        out = np.full(xs.shape, -np.inf)
+        out[inside] = self.logp[idx[inside]]
+        return out
+
+    def trim(self):
+        """
+        去掉两端的零概率项
+        """
+        idx = np.flatnonzero(np.isfinite(self.logp))
+        if not idx.size:
+            return LogLaw(0, [], self.err)
+        a, b = idx[0], idx[-1] + 1
+        return LogLaw(self.offset + self.stride * a, self.logp[a:b], self.err, self.stride, self.scale)
+
+    def restride(self, s):
+        """
+        换成更细的步长 s（s 须整除 stride），中间补 -inf
+        """
+        if s == self.stride:
+            return self
+        if len(self.logp) <= 1:
+            return LogLaw(self.offset, self.logp, self.err, s, self.scale)
+        f = self.stride // s
+        logp = np.full((len(self.logp) - 1) * f + 1, -np.inf)
+        logp[::f] = self.logp
+        return LogLaw(self.offset, logp, self.err, s, self.scale)
+
+    def rescale(self, scale):
+        """
+        换成更细的定点分母 scale（须为当前 scale 的倍数）
+        """
+        k = scale // self.scale
+        if k == 1:
+            return self
+        return LogLaw(self.offset * k, self.logp, self.err, self.stride * k, scale)
+
+    def reduce_scale(self):
+        """
+        约去 offset、stride 与 scale 的公因子
+        """
+        g = gcd(self.offset, self.stride, self.scale)
+        if g == 1:
+            return self
+        return LogLaw(self.offset // g, self.logp, self.err, self.stride // g, self.scale // g)
+
+
+def as_log_law(A):
+    """
+    把 Law / dict 转换为 LogLaw，LogLaw 原样返回
+    """
+    return A if isinstance(A, LogLaw) else LogLaw.from_law(A)
+
+
+def _align(A, B):
+    """
+    对数域版本的 align_grids
+    """
+    if A.scale != B.scale:
+        scale = lcm(A.scale, B.scale)
+        A, B = A.rescale(scale), B.rescale(scale)
+    sa = A.stride if len(A) > 1 else 0
+    sb = B.stride if len(B) > 1 else 0
+    s = gcd(sa, sb) or 1
+    return A.restride(s), B.restride(s)
+
+
+def _bands(logp):
+    """
+    按 log P 的大小把下标切成连续段，每段内的动态范围不超过 _BAND
+
+    返回
+    ----
+    list of (start, 缩放后的概率数组, 段内最大 log P)
+    """
+    finite = np.isfinite(logp)
+    if not finite.any():
+        return []
+    top = logp[finite].max()
+    level = np.where(finite, np.floor((top - logp) / _BAND), -1)
+    cuts = np.flatnonzero(np.diff(level)) + 1
+    out = []
+    for s, e in zip(np.r_[0, cuts], np.r_[cuts, len(logp)]):
+        if level[s] < 0:
+            continue
+        seg = logp[s:e]
+        m = seg.max()
+        out.append((int(s), np.exp(seg - m), m))
+    return out
+
+
+def log_law_convolution(A, B):
+    """
+    对数域中两个独立随机变量之和的分布
+
+    参数
+    ----
+    A, B : LogLaw, Law or dict
+
+    返回
+    ----
+    LogLaw
+    """
+    A, B = as_log_law(A), as_log_law(B)
+    if not len(A) or not len(B):
+        return LogLaw(0, [])
+    A, B = _align(A, B)
+    out = np.full(len(A) + len(B) - 1, -np.inf)
+    bands_b = _bands(B.logp)
+    with np.errstate(divide="ignore"):
+        for sa, ea, ma in _bands(A.logp):
+            for sb, eb, mb in bands_b:
+                c = np.log(np.convolve(ea, eb)) + (ma + mb)
+                s = sa + sb
+                out[s:s + len(c)] = np.logaddexp(out[s:s + len(c)], c)
+    # 直接卷积的求和误差，加上 exp / log / logaddexp 的舍入（log 值的绝对误差即概率的相对误差）
+    rel = gamma(min(len(A), len(B))) + 4 * UNIT_ROUNDOFF * (1 + np.abs(out[np.isfinite(out)]).max(initial=0))
+    err = (1 + A.err) * (1 + B.err) * (1 + rel) - 1
+    return LogLaw(A.offset + B.offset, out, err, A.stride, A.scale).trim()
+
+
+def _log_prune(A, floor):
+    """
+    丢弃 log P < floor 的项
+    """
+    return LogLaw(A.offset, np.where(A.logp >= floor, A.logp, -np.inf), A.err, A.stride, A.scale).trim()
+
+
+def iter_log_law_convolution(A, i, prune=DEFAULT_LOG_PRUNE, progress=NO_PROGRESS):
+    """
+    对数域中 A 的 i 次自卷积（二进制快速幂）
+
+    参数
+    ----
+    A : LogLaw, Law or dict
+    i : int
+    prune : float
+        每步之后丢弃 log P < prune 的项（自然对数）
+    progress : Progress
+        每步卷积前检查取消，见 failure.progress
+
+    返回
+    ----
+    LogLaw
+    """
+    A = as_log_law(A)
+    D = LogLaw(0, [0.0])
+    while i:
+        progress.check()
+        if i & 1:
+            D = _log_prune(log_law_convolution(D, A), prune)
+        i >>= 1
+        if i:
+            A = _log_prune(log_law_convolution(A, A), prune)
+    return D
+
+
+def log_dist_scale(A, c):
+    """
+    对数域版本的 dist_scale：分布 c·X
+
+    参数
+    ----
+    A : LogLaw, Law or dict
+    c : int, float or Fraction
+
+    返回
+    ----
+    LogLaw
+    """
+    A = as_log_law(A)
+    c = as_fraction(c)
+    if c == 0 or not len(A):
+        return LogLaw(0, [0.0]) if len(A) else LogLaw(0, [])
+    num, den = c.numerator, c.denominator
+    if num > 0:
+        B = LogLaw(A.offset * num, A.logp, A.err, A.stride * num, A.scale * den)
+    else:
+        B = LogLaw(A.hi * num, A.logp[::-1], A.err, A.stride * -num, A.scale * den)
+    B = B.reduce_scale()
+    check_scale(B.scale)
+    return B
+
+
+def log_sum_error_terms(terms, prune=DEFAULT_LOG_PRUNE, progress=NO_PROGRESS):
+    """
+    对数域中独立误差项之和的分布，见 sum_error_terms
+
+    参数
+    ----
+    terms : list of (Law, int)
+    progress : Progress
+        每加上一项回报 "terms" 阶段的进度，见 failure.progress
+
+    返回
+    ----
+    LogLaw
+    """
+    D = None
+    progress.update("terms", 0, len(terms))
+    for j, (law, count) in enumerate(terms, 1):
+        X = iter_log_law_convolution(law, count, prune, progress)
+        D = X if D is None else log_law_convolution(D, X)
+        progress.update("terms", j, len(terms), len(D))
+    return D
+
+
+def log_tail_probability(D, t):
+    """
+    log P(|X| > t)（自然对数），求和范围与 tail_probability 一致
+
+    参数
+    ----
+    D : LogLaw, Law or dict
+    t : int
+        阈值（实际取值）
+
+    返回
+    ----
+    float
+        尾概率为 0 时返回 -inf
+    """
+    D = as_log_law(D)
+    if not len(D):
+        return -np.inf
+    ma = D.hi
+    if t * D.scale >= ma:
+        return -np.inf
+    # 只取支撑上 t0 ≤ |x| < max(D) 的格点
+    t0 = int(ceil(t * D.scale))
+    v = np.concatenate((D.logp[grid_slice(D.offset, D.stride, len(D), t0, ma)],
+                        D.logp[grid_slice(D.offset, D.stride, len(D), 1 - ma, 1 - t0)]))
+    v = v[np.isfinite(v)]
+    if not v.size:
+        return -np.inf
+    m = v.max()
+    return float(m + np.log(np.exp(v - m).sum()))
+
+
+def log_failure_probability(terms, t, n=1, prune=DEFAULT_LOG_PRUNE, progress=NO_PROGRESS):
+    """
+    对数域计算 log2(n · P(|X| > t))
+
+    参数
+    ----
+    terms : list of (Law, int)
+        各独立项的分布及其重复次数（*_error_terms 的返回值）
+    t : int
+        阈值
+    n : int
+        系数个数（按 union bound 乘到尾概率上）
+    progress : Progress
+        进度回报与取消检查，见 failure.progress
+
+    返回
+    ----
+    float
+    """
+    return (log_tail_probability(log_sum_error_terms(terms, prune, progress), t) + log(n)) / log(2)
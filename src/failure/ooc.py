@@ -0,0 +1,94 @@
+import mmap
+import tempfile
+
+import numpy as np
+
+# =============================
+# 磁盘映射数组
+# =============================
+#
+# 很宽的分布（n = 1024、k = 4，或大 q 的 LWR）在剪枝前可能有上千万个点。
+# 分块卷积把输出放在临时文件映射的数组里，按块累加，内存占用只取决于块长。
+# 临时文件创建后立即删除，映射释放时磁盘空间随之回收。
+
+# 按块扫描映射数组时每块的元素个数
+_SCAN_CHUNK = 1 << 20
+
+
+def mapped_zeros(n, directory=None):
+    """
+    长度为 n 的零数组，数据放在 directory 下的临时文件中
+
+    参数
+    ----
+    n : int
+    directory : str or None
+        临时文件目录，None 为系统默认
+
+    返回
+    ----
+    np.memmap
+    """
+    f = tempfile.TemporaryFile(dir=directory)
+    f.truncate(max(n, 1) * 8)
+    return np.memmap(f, dtype=np.float64, mode="r+", shape=(n,))
+
+
+def is_mapped(a):
+    """
+    a 的数据是否来自磁盘映射
+    """
+    while a is not None:
+        if isinstance(a, (np.memmap, mmap.mmap)):
+            return True
+        a = getattr(a, "base", None)
+    return False
+
+
+def prune_inplace(a, prune):
+    """
+    分块把 a 中 ≤ prune 的项置零
+
+    返回
+    ----
+    float
+        置零的概率质量
+    """
+    lost = 0.0
+    for i in range(0, len(a), _SCAN_CHUNK):
+        c = a[i:i + _SCAN_CHUNK]
+        small = c <= prune
+        lost += float(c[small].sum())
+        c[small] = 0.0
+    return lost
+
+
+def nonzero_span(a):
+    """
+    分块求第一个与最后一个非零项的位置
+
+    返回
+    ----
+    (int, int)
+        [start, stop)；全为零时 start == stop == 0
+    """
+    start = None
+    for i in range(0, len(a), _SCAN_CHUNK):
+        nz = np.flatnonzero(a[i:i + _SCAN_CHUNK])
+        if nz.size:
+            start = i + int(nz[0])
+            break
+    if start is None:
+        return 0, 0
+    for i in range((len(a) - 1) // _SCAN_CHUNK * _SCAN_CHUNK, -1, -_SCAN_CHUNK):
+        nz = np.flatnonzero(a[i:i + _SCAN_CHUNK])
+        if nz.size:
+            return start, i + int(nz[-1]) + 1
+    return start, start + 1
+
+
+def load_if_fits(a, max_bytes):
+    """
+    不超过 max_bytes 时把映射数组读入内存，否则原样返回
+    """
+    return np.array(a) if is_mapped(a) and a.nbytes <= max_bytes else a
@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# =============================
+# 进度回报与取消
+# =============================
+#
+# 长时间的计算（3n 方案逐个位置的卷积、大 n 下的自卷积等）在各阶段
+# 调用 Progress.update：先检查取消令牌，已取消则抛出 Cancelled；
+# 再按节流间隔把 ProgressEvent 交给调用方的回调。
+# 调用方（GUI、服务、批处理）通过 params 中的 progress / cancel 传入。
+
+
+class Cancelled(Exception):
+    """
+    计算已被 CancelToken 取消
+    """
+
+
+class CancelToken:
+    """
+    取消令牌，可在任意线程中调用 cancel()
+
+    同一令牌可交给多个计算（如 compute_failure_probabilities 的一批任务），
+    它们在下一个检查点停止
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        """
+        已取消时抛出 Cancelled
+        """
+        if self._event.is_set():
+            raise Cancelled()
+
+
+class ProgressEvent:
+    """
+    一次进度事件
+
+    属性
+    ----
+    stage : str
+        阶段名，如 "terms"、"powers"、"tails"
+    done, total : int
+        本阶段已完成 / 总步数
+    fraction : float
+        done / total
+    eta : float or None
+        本阶段剩余时间估计（秒），尚无完成的步骤时为 None
+    support : int or None
+        当前分布的支撑大小（点数）
+    """
+
+    __slots__ = ("stage", "done", "total", "fraction", "eta", "support")
+
+    def __init__(self, stage, done, total, eta=None, support=None):
+        self.stage = stage
+        self.done = done
+        self.total = total
+        self.fraction = done / total if total else 1.0
+        self.eta = eta
+        self.support = support
+
+    def __repr__(self):
+        return (f"ProgressEvent(stage={self.stage!r}, done={self.done}, total={self.total}, "
+                f"eta={self.eta}, support={self.support})")
+
+
+class Progress:
+    """
+    计算内部使用的进度回报器
+
+    参数
+    ----
+    callback : callable or None
+        callback(ProgressEvent)，在计算线程中调用
+    cancel : CancelToken or None
+    interval : float
+        两次回调之间的最短间隔（秒）；各阶段的开始与结束总会回报
+    """
+
+    def __init__(self, callback=None, cancel=None, interval=0.0):
+        self.callback = callback
+        self.cancel = cancel
+        self.interval = interval
+        self._stage = None
+        self._start = 0.0
+        self._last = 0.0
+
+    def check(self):
+        """
+        检查点：已取消时抛出 Cancelled
+        """
+        if self.cancel is not None:
+            self.cancel.check()
+
+    def update(self, stage, done, total, support=None):
+        """
+        回报 stage 阶段完成了 done / total 步，同时检查取消
+        """
+        self.check()
+        if self.callback is None and not logger.isEnabledFor(logging.DEBUG):
+            return
+        now = time.monotonic()
+        if stage != self._stage or done == 0:
+            self._stage, self._start, self._last = stage, now, 0.0
+        if 0 < done < total and now - self._last < self.interval:
+            return
+        self._last = now
+        eta = (now - self._start) * (total - done) / done if done else None
+        event = ProgressEvent(stage, done, total, eta, support)
+        logger.debug("%s: %d/%d", stage, done, total)
+        if self.callback is not None:
+            self.callback(event)
+
+
+class _NoProgress(Progress):
+    """
+    不回报、不可取消；没有节流状态，可在任意多个线程的计算间共用
+    """
+
+    def check(self):
+        pass
+
+    def update(self, stage, done, total, support=None):
+        logger.debug("%s: %d/%d", stage, done, total)
+
+
+# 各函数 progress 参数的默认值
+NO_PROGRESS = _NoProgress()
+
+
+def as_progress(progress=None, cancel=None):
+    """
+    由 params 中的 progress（回调或 Progress）与 cancel（CancelToken）构造 Progress
+    """
+    if isinstance(progress, Progress):
+        if cancel is None or cancel is progress.cancel:
+            return progress
+        return Progress(progress.callback, cancel, progress.interval)
+    if progress is None and cancel is None:
+        return NO_PROGRESS
+    return Progress(progress, cancel)
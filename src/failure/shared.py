@@ -0,0 +1,93 @@
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .law import Law, SymmetricLaw
+
+# =============================
+# 共享内存中的分布表
+# =============================
+#
+# 3n 方案的 n/2 个任务共用同一组分布表。逐个任务序列化这些表，
+# 传输量与每个工作进程的内存都随 n 和进程数增长；这里把全部概率数组
+# 依次放进一块共享内存，每个任务只带上 (名字, 元数据)；
+# 工作进程在首次遇到时挂接（见 attach_laws），直接在共享内存上构造 Law，不复制数组。
+
+
+class SharedLaws:
+    """
+    发布到一块共享内存中的一组 Law，用 with 管理生命周期
+
+    name 与 spec 交给 attach_laws 即可在其它进程中得到同一组分布
+    """
+
+    def __init__(self, laws):
+        laws = list(laws)
+        arrays = [L.half if isinstance(L, SymmetricLaw) else L.probs for L in laws]
+        size = sum(a.nbytes for a in arrays)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.spec = []
+        start = 0
+        for L, a in zip(laws, arrays):
+            np.ndarray(a.shape, np.float64, self._shm.buf, start)[:] = a
+            symmetric = isinstance(L, SymmetricLaw)
+            self.spec.append((symmetric, 0 if symmetric else L.offset, len(a), start,
+                              L.err, L.dropped, L.stride, L.scale))
+            start += a.nbytes
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _laws_from_buffer(buf, spec):
+    laws = []
+    for symmetric, offset, size, start, err, dropped, stride, scale in spec:
+        a = np.ndarray((size,), np.float64, buf, start)
+        if symmetric:
+            laws.append(SymmetricLaw(a, err, dropped, stride, scale))
+        else:
+            laws.append(Law(offset, a, err, dropped, stride, scale))
+    return laws
+
+
+# 当前进程已挂接的共享内存：常驻的工作进程会依次处理多次计算的任务，
+# 同一块只挂接一次；换到新的一块时释放旧的
+_attached = {}
+_attached_lock = threading.Lock()
+
+
+def attach_laws(name, spec):
+    """
+    在当前进程中挂接 SharedLaws 发布的分布表（零拷贝）
+
+    spec 可以只是 SharedLaws.spec 的一部分，只构造需要的分布
+
+    返回
+    ----
+    (SharedMemory, list of Law)
+        分布的数组直接引用共享内存，使用期间须保留第一个返回值
+    """
+    with _attached_lock:
+        shm = _attached.get(name)
+        if shm is None:
+            for old in _attached.values():
+                try:
+                    old.close()
+                except BufferError:
+                    # 仍有数组引用旧的映射，留给垃圾回收
+                    pass
+            _attached.clear()
+            shm = _attached[name] = shared_memory.SharedMemory(name=name)
+    return shm, _laws_from_buffer(shm.buf, spec)
@@ -1,7 +1,35 @@
+import os
 from math import factorial as fac, floor
-from math import log, ceil, erf, sqrt, exp
+from fractions import Fraction
+from math import log, ceil, erf, sqrt, gcd, lcm
 import numpy as np
 
+from .law import (Law, SymmetricLaw, FailureExponent, as_law, align_grids, combine_errors, gamma,
+                  UNIT_ROUNDOFF, as_fraction, check_scale, grid_slice)
+from .fft import tilted_convolution, fused_sum, _fft_size, _FFT_ERR_CONST, DEFAULT_RTOL
+from .cache import PowerTableCache, law_digest
+from .dispatch import ConvolutionCostModel
+from .ooc import mapped_zeros, is_mapped, prune_inplace, nonzero_span, load_if_fits
+from .executor import thread_pool
+from .progress import NO_PROGRESS, as_progress
+from . import jit
+from .exact import ExactLaw, exact_law_convolution, exact_law_product, exact_tail_probability, log2_fraction
+from .saddlepoint import saddlepoint_failure_probability
+from .loglaw import log_failure_probability
+
+# 方案模块用 from .util import * 取得的名字只限于本模块定义的工具函数；
+# 分布类型、FFT、进度等从各自的模块导入
+__all__ = [
+    "gaussian_center_weight", "binomial", "centered_binomial_pdf", "build_centered_binomial_law",
+    "build_discrete_gaussian_law", "build_sparse_ternary_law", "build_uniform_law",
+    "mod_switch", "mod_centered", "build_mod_switching_error_law",
+    "cost_model", "OOC_MAX_BYTES", "CONVOLUTION_WORKERS", "law_convolution", "parallel_convolution",
+    "blocked_convolution", "law_product", "quadratic_form_law", "law_mixture",
+    "DEFAULT_PRUNE", "clean_dist", "power_cache", "iter_law_convolution", "iter_power_sweep", "sum_error_terms",
+    "tail_probability", "failure_exponent", "tail_curve", "failure_curve", "resolve_options",
+    "failure_probability_by_mode", "law_convolution_fft", "power_law_convolution_fft", "dist_scale",
+]
+
 # =============================
 # 与高斯分布相关的工具函数
 # =============================
@@ -70,7 +98,7 @@ def centered_binomial_pdf(k, x):
     return binomial(2 * k, x + k) / 2. ** (2 * k)
 
 
-def build_centered_binomial_law(k):
+def build_centered_binomial_law(k, exact=False):
     """
     构造中心二项分布的概率分布表
 
@@ -78,16 +106,17 @@ def build_centered_binomial_law(k):
     ----
     k : int
         分布参数
+    exact : bool
+        为 True 时返回整数计数形式的 ExactLaw（公分母 2^(2k)）
 
     返回
     ----
-    dict
-        {x : P(X = x)}, x ∈ [-k, k]
+    SymmetricLaw or ExactLaw
+        P(X = x), x ∈ [-k, k]
     """
-    D = {}
-    for i in range(-k, k + 1):
-        D[i] = centered_binomial_pdf(k, i)
-    return D
+    if exact:
+        return ExactLaw(-k, [binomial(2 * k, i + k) for i in range(-k, k + 1)], 2 ** (2 * k))
+    return SymmetricLaw([centered_binomial_pdf(k, i) for i in range(k + 1)])
 
 
 # =============================
@@ -100,18 +129,13 @@ def build_discrete_gaussian_law(sigma):
     """
     tail = 3
     B = int(floor(tail * sigma))
-    D = {}
 
     # 未归一化概率
-    for x in range(-B, B + 1):
-        D[x] = exp(- (x * x) / (2 * sigma * sigma))
+    x = np.arange(-B, B + 1)
+    D = np.exp(- (x * x) / (2 * sigma * sigma))
 
-    # 归一化
-    Z = sum(D.values())
-    for x in D:
-        D[x] /= Z
-
-    return D
+    # 归一化，只保留 x ≥ 0 的一半
+    return SymmetricLaw(D[B:] / D.sum())
 
 
 # =============================
@@ -133,22 +157,18 @@ def build_sparse_ternary_law(p):
 
     返回
     ----
-    dict
-        {-1: p, 0: 1-2p, 1: p}
+    SymmetricLaw
+        P(-1) = p, P(0) = 1-2p, P(1) = p
     """
     assert 0 <= p <= 0.5
-    return {
-        -1: p,
-         0: 1 - 2 * p,
-         1: p
-    }
+    return SymmetricLaw([1 - 2 * p, p])
 
 
 # =============================
 # 新增 3：均匀分布
 # =============================
 
-def build_uniform_law(B):
+def build_uniform_law(B, exact=False):
     """
     构造区间 [-B, B] 上的离散均匀分布
 
@@ -156,15 +176,18 @@ def build_uniform_law(B):
     ----
     B : int
         支撑区间上界
+    exact : bool
+        为 True 时返回 ExactLaw
 
     返回
     ----
-    dict
-        {x : 1/(2B+1)}, x ∈ [-B, B]
+    SymmetricLaw or ExactLaw
+        P(X = x) = 1/(2B+1), x ∈ [-B, B]
     """
     size = 2 * B + 1
-    p = 1.0 / size
-    return {x: p for x in range(-B, B + 1)}
+    if exact:
+        return ExactLaw(-B, [1] * size, size)
+    return SymmetricLaw(np.full(B + 1, 1.0 / size))
 
 
 # =============================
@@ -211,7 +234,97 @@ def mod_centered(x, q):
     return a - q
 
 
-def build_mod_switching_error_law(q, rq):
+def _round_div(n, d):
+    """
+    整数除法 n / d 的就近取整（恰为一半时取偶数，与 Python round 一致）
+
+    参数
+    ----
+    n : np.ndarray of int
+    d : int, d > 0
+
+    返回
+    ----
+    np.ndarray
+    """
+    # object 数组（Python 整数）不支持 np.divmod
+    t, r = n // d, n % d
+    up = (2 * r > d) | ((2 * r == d) & (t % 2 == 1))
+    return t + up
+
+
+def _mod_switching_error_counts(q, rq):
+    """
+    统计 x ∈ [0, q) 上模数切换误差 mod_centered(x - z, q) 的出现次数，
+    其中 y = mod_switch(x, q, rq)，z = mod_switch(y, rq, q)
+
+    记 g = gcd(q, rq)，q = g·q'，rq = g·r'。两次取整只与 r'x/q' 有关，
+    x 增加 2q' 时 y、z 分别增加 2r'、2q'，误差不变（取偶规则也保持不变），
+    所以只需计算 x ∈ [0, 2q')：前 q' 个点出现 ceil(g/2) 次，后 q' 个点
+    出现 floor(g/2) 次。y 不取模与取模得到的 z 相差 q 的倍数，中心化后相同。
+
+    rq ≥ q 时 y 的取整误差经 q'/r' ≤ 1 缩放后严格小于 1/2，z = x，误差恒为 0。
+    否则记 s = r'x - q'y，则 z = round(x - s/r')，误差 x - z 只由 s 决定，
+    s/r' 恰为半整数时再由 x 的奇偶决定。r'、q' 互素，x 取遍 [0, q') 时
+    s 取遍模 q' 的中心化余数各一次，于是每个误差值的非平局计数是一段区间的长度，
+    只需逐个检查两类取整平局：q' 为偶数时 s = ±q'/2（一个 x），
+    r' 为偶数时 s = r'k + r'/2（对应的 x = s·r'^(-1) mod q'）。
+    运行时间为 O(支撑大小)，与 q、r' 无关。
+
+    返回
+    ----
+    (int, np.ndarray of int64)
+        最小误差值与从它开始的计数数组
+    """
+    if rq >= q:
+        return 0, np.array([q], dtype=np.int64)
+
+    g = gcd(q, rq)
+    qp, rp = q // g, rq // g
+    weights = ((g + 1) // 2, g // 2)
+    inv = pow(rp, -1, qp)
+    # q' 为偶数时 ±q'/2 单独处理，其余余数 s 落在 [-smax, smax]
+    smax = (qp - 1) // 2
+    # s·r'^(-1) 超过 int64 范围时退回 Python 整数
+    dtype = np.int64 if qp * qp < 2 ** 62 else object
+
+    # 非平局：round(s/r') = e 的 s 构成区间 [r'e - h, r'e + h]，两段各出现一次
+    h = (rp - 1) // 2
+    E = smax // rp + 1
+    e = np.arange(-E, E + 1, dtype=np.int64)
+    c = e * rp
+    es = [e]
+    ws = [np.maximum(np.minimum(c + h, smax) - np.maximum(c - h, -smax) + 1, 0) * g]
+
+    # z 的平局：s/r' = k + 1/2，取 z 为偶数，即误差与 x 同奇偶
+    if rp % 2 == 0:
+        k = np.arange(-((smax + rp // 2) // rp), (smax - rp // 2) // rp + 1, dtype=np.int64)
+        x0 = (k.astype(dtype) * rp + rp // 2) * inv % qp
+        for b, wt in enumerate(weights):
+            es.append(np.asarray(k + (x0 + b * qp - k) % 2, dtype=np.int64))
+            ws.append(np.full(len(k), wt, dtype=np.int64))
+
+    # y 的平局：r'x ≡ q'/2 (mod q')，x 增加 q' 时 y 增加奇数 r'，s 变号
+    if qp % 2 == 0:
+        x0 = qp // 2 * inv % qp
+        s = rp * x0 - qp * _round_div(rp * x0, qp)
+        es.append(np.array([_round_div(s, rp), _round_div(-s, rp)], dtype=np.int64))
+        ws.append(np.array(weights, dtype=np.int64))
+
+    e, w = np.concatenate(es), np.concatenate(ws)
+    keep = w > 0
+    e, w = e[keep], w[keep]
+
+    # 中心化到 [-q/2, q/2)，与 mod_centered 一致
+    a = e % q
+    e = np.where(2 * a < q, a, a - q)
+    lo = int(e.min())
+    counts = np.zeros(int(e.max()) - lo + 1, dtype=np.int64)
+    np.add.at(counts, e - lo, w)
+    return lo, counts
+
+
+def build_mod_switching_error_law(q, rq, exact=False):
     """
     构造模数切换引入的误差分布
 
@@ -221,113 +334,600 @@ def build_mod_switching_error_law(q, rq):
         原模数
     rq : int
         中间模数
+    exact : bool
+        为 True 时返回 ExactLaw（公分母 q）
 
     返回
     ----
-    dict
-        误差分布 {e : P(E = e)}
+    Law, SymmetricLaw or ExactLaw
+        误差分布 P(E = e)；计数关于 0 对称时返回 SymmetricLaw
     """
-    D = {}
-    for x in range(q):
-        y = mod_switch(x, q, rq)
-        z = mod_switch(y, rq, q)
-        d = mod_centered(x - z, q)
-        D[d] = D.get(d, 0) + 1.0 / q
-    return D
+    lo, counts = _mod_switching_error_counts(q, rq)
+    if exact:
+        return ExactLaw(lo, counts.tolist(), q)
+    # 支撑为 [lo, -lo] 且计数首尾对称
+    if len(counts) == 1 - 2 * lo and np.array_equal(counts, counts[::-1]):
+        return SymmetricLaw(counts[-lo:] / q)
+    return Law(lo, counts / q)
 
 
 # =============================
 # 分布运算（卷积 / 乘积）
 # =============================
 
-def law_convolution(A, B):
+def _as_float_law(A):
+    """
+    与浮点分布混合运算时，ExactLaw 退化为 Law
+    """
+    return A.to_law() if isinstance(A, ExactLaw) else as_law(A)
+
+
+# method="auto" 使用的卷积代价模型，常数在首次使用时测定
+cost_model = ConvolutionCostModel()
+
+# auto 卷积的输出超过该字节数时改用分块卷积，输出放在磁盘映射文件中（可修改）
+OOC_MAX_BYTES = 1 << 28
+
+# parallel 卷积的线程数（可修改），auto 只在大于 1 时考虑 parallel
+CONVOLUTION_WORKERS = os.cpu_count() or 1
+
+
+def law_convolution(A, B, method="auto", rtol=DEFAULT_RTOL):
     """
     两个独立随机变量之和的分布（卷积）
 
     参数
     ----
-    A : dict
-    B : dict
+    A : Law or dict
+    B : Law or dict
+    method : str
+        "direct" 直接卷积；"sparse" 只对非零点做外积；"fft" 指数倾斜 FFT 卷积
+        （见 tilted_convolution）；"blocked" 分块卷积，输出放在磁盘映射文件中
+        （见 blocked_convolution）；"parallel" 多线程直接卷积（见 parallel_convolution）；
+        "auto" 按规模、稀疏度与 rtol 由 cost_model 选择，输出超过 OOC_MAX_BYTES
+        时使用 blocked。
+        两边都是 ExactLaw 时总是精确整数卷积
+    rtol : float
+        fft 方法每个概率值的目标相对误差
 
     返回
     ----
-    dict
+    Law
         A + B 的分布
     """
-    C = {}
-    for a in A:
-        for b in B:
-            c = a + b
-            C[c] = C.get(c, 0) + A[a] * B[b]
-    return C
+    if isinstance(A, ExactLaw) and isinstance(B, ExactLaw):
+        return exact_law_convolution(A, B)
+    A, B = _as_float_law(A), _as_float_law(B)
+    if not len(A) or not len(B):
+        return Law(0, [])
+    # 换到共同的定点分母与步长，之后在压缩下标上卷积
+    A, B = align_grids(A, B)
+    if method == "auto":
+        big = 8 * (len(A) + len(B) - 1) > OOC_MAX_BYTES
+        method = "blocked" if big else cost_model.choose(A, B, rtol, CONVOLUTION_WORKERS)
+    if method == "blocked":
+        return blocked_convolution(A, B, rtol=rtol)
+    if method == "fft":
+        return tilted_convolution(A, B, rtol)
+    if method == "sparse":
+        return _sparse_convolution(A, B)
+    if method == "parallel":
+        return _direct_convolution(A, B, CONVOLUTION_WORKERS)
+    if method != "direct":
+        raise ValueError(f"未知的卷积方法: {method}")
+    return _direct_convolution(A, B)
+
+
+def _direct_convolution(A, B, workers=1):
+    """
+    直接卷积；workers > 1 时把 A 分块做重叠相加，在线程池中计算（误差界不变）
+    """
+    if isinstance(A, SymmetricLaw) and isinstance(B, SymmetricLaw):
+        return _symmetric_convolution(A, B, workers)
+    if len(A) < len(B):
+        A, B = B, A
+    probs = _overlap_add(A.probs, B.probs, workers) if workers > 1 else np.convolve(A.probs, B.probs)
+    # 非负项求和，每个输出点最多累加 min(|A|, |B|) 项
+    err, dropped = combine_errors(A, B, gamma(min(len(A), len(B))))
+    return Law(A.offset + B.offset, probs, err, dropped, A.stride, A.scale)
+
+
+def _overlap_add(a, b, workers):
+    """
+    np.convolve(a, b)（完整卷积，|a| ≥ |b|），a 切成 workers 块的重叠相加
+
+    每块与 b 做一次完整卷积，乘加次数合计恰为 |a|·|b|，不补零；
+    np.convolve 计算时释放 GIL，各块在线程池中并行。相邻块的输出重叠 |b|-1 个点，
+    由调用线程依次累加，额外的加法只有 |a| + 块数·|b|
+    """
+    cuts = np.linspace(0, len(a), min(workers, len(a)) + 1).astype(np.int64)
+    out = np.zeros(len(a) + len(b) - 1)
+
+    def run(k0, k1):
+        return np.convolve(a[k0:k1], b)
+
+    for k0, part in zip(cuts[:-1], thread_pool().map(run, cuts[:-1], cuts[1:])):
+        out[k0:k0 + len(part)] += part
+    return out
+
+
+def parallel_convolution(A, B, workers=None):
+    """
+    多线程直接卷积，误差界与 direct 相同
+
+    参数
+    ----
+    A, B : Law or dict
+    workers : int or None
+        切分的段数，默认 CONVOLUTION_WORKERS
+
+    返回
+    ----
+    Law
+    """
+    A, B = align_grids(_as_float_law(A), _as_float_law(B))
+    if not len(A) or not len(B):
+        return Law(0, [])
+    return _direct_convolution(A, B, CONVOLUTION_WORKERS if workers is None else workers)
+
+
+def _sparse_convolution(A, B):
+    """
+    支撑中零很多时，只对非零点做外积，再按和的下标用 bincount 累加
+    """
+    pa, pb = A.probs, B.probs
+    ia, ib = np.flatnonzero(pa), np.flatnonzero(pb)
+    C = np.zeros(len(pa) + len(pb) - 1)
+    if jit.sparse_convolve is not None:
+        jit.sparse_convolve(ia, pa[ia], ib, pb[ib], C)
+        err, dropped = combine_errors(A, B, gamma(min(len(ia), len(ib)) + 1))
+        return Law(A.offset + B.offset, C, err, dropped, A.stride, A.scale)
+    rows = max(1, _PRODUCT_CHUNK // max(len(ib), 1))
+    for i in range(0, len(ia), rows):
+        idx = np.add.outer(ia[i:i + rows], ib).ravel()
+        C += np.bincount(idx, weights=np.multiply.outer(pa[ia[i:i + rows]], pb[ib]).ravel(), minlength=len(C))
+    err, dropped = combine_errors(A, B, gamma(min(len(ia), len(ib)) + 1))
+    return Law(A.offset + B.offset, C, err, dropped, A.stride, A.scale)
+
+
+def blocked_convolution(A, B, method="auto", max_bytes=None, directory=None, rtol=DEFAULT_RTOL):
+    """
+    分块卷积：输入按块切开，逐对卷积后累加到磁盘映射的输出数组上（overlap-add）
+
+    工作内存只取决于块长，输入也可以是磁盘映射数组。结果在
+    max_bytes 之内时读回内存，否则 probs 仍是映射数组，clean_dist 会分块剪枝。
+
+    参数
+    ----
+    A, B : Law or dict
+    method : str
+        每对块的卷积方法，见 law_convolution（"auto" 时不再嵌套分块）
+    max_bytes : int or None
+        内存预算，默认 OOC_MAX_BYTES
+    directory : str or None
+        临时文件目录
+    rtol : float
+        fft 方法的目标相对误差
+
+    返回
+    ----
+    Law
+    """
+    A, B = align_grids(_as_float_law(A), _as_float_law(B))
+    if not len(A) or not len(B):
+        return Law(0, [])
+    max_bytes = OOC_MAX_BYTES if max_bytes is None else max_bytes
+    # 每对块约需 2L 个输入、2L 个输出与同量级的 FFT 缓冲
+    L = max(1, max_bytes // 128)
+    pa, pb = A.probs, B.probs
+    out = mapped_zeros(len(pa) + len(pb) - 1, directory)
+    rel, dropped = 0.0, 0.0
+    for i in range(0, len(pa), L):
+        a = Law(i, pa[i:i + L])
+        if not a.probs.any():
+            continue
+        for j in range(0, len(pb), L):
+            b = Law(j, pb[j:j + L])
+            if not b.probs.any():
+                continue
+            m = cost_model.choose(a, b, rtol) if method == "auto" else method
+            C = law_convolution(a, b, m, rtol)
+            if len(C):
+                out[C.offset:C.offset + len(C)] += C.probs
+                rel, dropped = max(rel, C.err), dropped + C.dropped
+    err, dropped = combine_errors(A, B, rel, dropped)
+    return Law(A.offset + B.offset, load_if_fits(out, max_bytes), err, dropped, A.stride, A.scale)
+
+
+def _symmetric_convolution(A, B, workers=1):
+    """
+    两个对称分布之和仍对称，只计算 x ≥ 0 的一半输出，卷积工作量约减半
+    """
+    if len(A.half) < len(B.half):
+        A, B = B, A
+    hb = len(B.half) - 1
+    # 记 A 的半宽为 ha，x ≥ 0 的输出只用到 A 在 [-hb, ha] 上的值；
+    # 它与 B 的完整卷积从 x = -2hb 开始，去掉前 2hb 个点
+    a = np.concatenate((A.half[hb:0:-1], A.half))
+    full = _overlap_add(a, B.probs, workers) if workers > 1 else np.convolve(a, B.probs)
+    half = full[2 * hb:]
+    err, dropped = combine_errors(A, B, gamma(min(len(A), len(B))))
+    return SymmetricLaw(half, err, dropped, A.stride, A.scale)
+
+
+# 乘积外积分块的元素个数上限，控制临时数组内存
+_PRODUCT_CHUNK = 1 << 22
+
+# 输出范围超过 (配对数 × 该倍数) 时按稀疏支撑累加
+_PRODUCT_SPARSE_RATIO = 4
+
+
+def _product_pairs(xa, pa, xb, pb):
+    """
+    分块生成外积 (a*b, P(a)·P(b))，每块不超过 _PRODUCT_CHUNK 个元素
+    """
+    rows = max(1, _PRODUCT_CHUNK // len(xb))
+    for i in range(0, len(xa), rows):
+        yield (np.multiply.outer(xa[i:i + rows], xb).ravel(),
+               np.multiply.outer(pa[i:i + rows], pb).ravel())
+
+
+def _product_step(xa, xb, lo):
+    """
+    所有 a*b - lo 的最大公约数，只用两个下标向量计算
+
+    记 a = a0 + α，b = b0 + β，ga、gb 为 α、β 的最大公约数，则
+        gcd(ab - a0·b0) = gcd(a0·gb, b0·ga, ga·gb)
+    """
+    a0, b0 = int(xa[0]), int(xb[0])
+    ga, gb = int(np.gcd.reduce(xa - a0)), int(np.gcd.reduce(xb - b0))
+    return gcd(a0 * gb, b0 * ga, ga * gb, a0 * b0 - lo) or 1
+
+
+def _scatter_products(xa, pa, xb, pb, lo, hi):
+    """
+    把外积 (a*b, P(a)·P(b)) 累加到 [lo, hi] 上
+
+    所有 a*b - lo 的最大公约数 g 作为输出步长，只在格点上累加。
+    范围远大于配对数时（例如支撑只落在少数几个因子的倍数上），
+    逐块对乘积去重再合并，最后只分配到实际的最大乘积为止
+
+    返回
+    ----
+    (np.ndarray, int)
+        步长 g 下的概率数组与 g
+    """
+    g = _product_step(xa, xb, lo)
+    size = (hi - lo) // g + 1
+    if size <= _PRODUCT_SPARSE_RATIO * xa.size * xb.size:
+        C = np.zeros(size)
+        if jit.scatter_products is not None:
+            jit.scatter_products(xa.astype(np.int64), pa, xb.astype(np.int64), pb, lo, g, C)
+            return C, g
+        for v, p in _product_pairs(xa, pa, xb, pb):
+            C += np.bincount((v - lo) // g, weights=p, minlength=size)
+        return C, g
+
+    vals, probs = [], []
+    for v, p in _product_pairs(xa, pa, xb, pb):
+        u, inv = np.unique(v, return_inverse=True)
+        vals.append(u)
+        probs.append(np.bincount(inv, weights=p))
+    u, inv = np.unique(np.concatenate(vals), return_inverse=True)
+    C = np.zeros((int(u[-1]) - lo) // g + 1)
+    C[(u - lo) // g] = np.bincount(inv, weights=np.concatenate(probs))
+    return C, g
 
 
 def law_product(A, B):
     """
     两个独立随机变量乘积的分布
 
+    对非零支撑做外积，再用 bincount 散射累加到输出范围，
+    输出范围由两端点的四个乘积确定，输出步长取乘积之差的最大公约数，
+    定点分母为两者 scale 之积。
+    任一方对称时结果也对称，走只计算一半输出的 _symmetric_product。
+
     参数
     ----
-    A : dict
-    B : dict
+    A : Law or dict
+    B : Law or dict
 
     返回
     ----
-    dict
+    Law
         A * B 的分布
     """
-    C = {}
-    for a in A:
-        for b in B:
-            c = a * b
-            C[c] = C.get(c, 0) + A[a] * B[b]
-    return C
+    if isinstance(A, ExactLaw) and isinstance(B, ExactLaw):
+        return exact_law_product(A, B)
+    A, B = _as_float_law(A), _as_float_law(B)
+    if isinstance(B, SymmetricLaw) and not isinstance(A, SymmetricLaw):
+        A, B = B, A
+    if isinstance(A, SymmetricLaw):
+        return _symmetric_product(A, B)
+    xa, pa = A.nonzero()
+    xb, pb = B.nonzero()
+    if xa.size == 0 or xb.size == 0:
+        return Law(0, [])
+
+    # 乘积的支撑范围由两端点的四个乘积决定
+    ends = [int(a) * int(b) for a in (xa[0], xa[-1]) for b in (xb[0], xb[-1])]
+    lo, hi = min(ends), max(ends)
+    C, g = _scatter_products(xa, pa, xb, pb, lo, hi)
+    err, dropped = combine_errors(A, B, gamma(len(xa) + len(xb)))
+    return Law(lo, C, err, dropped, g, A.scale * B.scale).trim().reduce_scale()
+
+
+def _symmetric_product(A, B):
+    """
+    A 对称时 A·B 也对称（B 不必对称），只计算 c ≥ 0 的一半：
+        P(AB = c) = Σ_{a,b>0, ab=c} P(A=a)·(P(B=b) + P(B=-b)),  c > 0
+    两方都对称时只需 a, b > 0 的四分之一外积
+    """
+    if isinstance(B, SymmetricLaw):
+        j = np.flatnonzero(B.half[1:]) + 1
+        xb, fold = B.stride * j, 2 * B.half[j]
+    else:
+        xs, ps = B.nonzero()
+        keep = xs != 0
+        xb, inv = np.unique(np.abs(xs[keep]), return_inverse=True)
+        fold = np.bincount(inv, weights=ps[keep])
+    j = np.flatnonzero(A.half[1:]) + 1
+    xa, pa = A.stride * j, A.half[j]
+
+    # 乘积为 0：a = 0 或 b = 0
+    zero = A.get(0) * B.mass() + (A.mass() - A.get(0)) * B.get(0)
+    if xa.size and xb.size:
+        half, g = _scatter_products(xa, pa, xb, fold, 0, int(xa[-1]) * int(xb[-1]))
+    else:
+        half, g = np.zeros(1), 1
+    half[0] += zero
+    err, dropped = combine_errors(A, B, gamma(len(xa) + len(xb) + 1))
+    return SymmetricLaw(half, err, dropped, g, A.scale * B.scale).trim().reduce_scale()
+
+
+def quadratic_form_law(A, B, mixed=False):
+    """
+    a1, a2 ~ A，b1, b2 ~ B 相互独立时二次型的分布（3n 方案的噪声基本项）：
+        mixed=False : a1·a2 + b1·b2 = (A·A) + (B·B)，两个乘积分布的卷积
+        mixed=True  : a1·b1 + b2·(a1 + a2)，a1 出现两次，对 a1 取条件：
+                      a1 = x 时为 x·B + B·(A + x)，再按 P(a1 = x) 混合
+
+    全部由数组化的乘积、卷积与混合组成，工作量约为 |A|·|B|·|B·(A+x)|，
+    不再是四重循环的 |A|²·|B|²
 
+    参数
+    ----
+    A, B : Law or dict
+    mixed : bool
 
-def clean_dist(A):
+    返回
+    ----
+    Law
     """
-    清理概率极小的事件以加速计算
-    丢弃概率 < 2^-300 的项
+    A, B = _as_float_law(A), _as_float_law(B)
+    if not mixed:
+        return law_convolution(law_product(A, A), law_product(B, B))
+    components = []
+    for k, w in zip(*A.nonzero()):
+        # k 为 a1 在定点表示下的取值，a1 = k / scale
+        shifted = Law(A.offset + int(k), A.probs, A.err, A.dropped, A.stride, A.scale)
+        scaled = dist_scale(B, Fraction(int(k), A.scale))
+        components.append((w, law_convolution(scaled, law_product(B, shifted))))
+    return law_mixture(components)
+
+
+def law_mixture(components):
+    """
+    混合分布 Σ w_k·L_k
 
     参数
     ----
-    A : dict
+    components : list of (float, Law)
+        权重与分布，权重之和一般为 1
 
     返回
     ----
-    dict
+    Law
     """
-    B = {}
-    for x, y in A.items():
-        if y > 2 ** (-300):
-            B[x] = y
-    return B
+    components = [(float(w), _as_float_law(L)) for w, L in components if w > 0 and len(L)]
+    if not components:
+        return Law(0, [])
+    # 统一到共同的定点分母与步长（步长还须整除各 offset 之差）
+    scale = lcm(*(L.scale for _, L in components))
+    laws = [(w, L.rescale(scale)) for w, L in components]
+    o = laws[0][1].offset
+    s = gcd(*(L.stride if len(L) > 1 else 0 for _, L in laws), *(L.offset - o for _, L in laws)) or 1
+    lo = min(L.lo for _, L in laws)
+    hi = max(L.hi for _, L in laws)
+    probs = np.zeros((hi - lo) // s + 1)
+    rel, dropped = 0.0, 0.0
+    for w, L in laws:
+        L = L.restride(s)
+        i = (L.offset - lo) // s
+        probs[i:i + len(L)] += w * L.probs
+        rel, dropped = max(rel, L.err), dropped + w * L.dropped
+    # 每个输出点一次乘法、至多 len(laws) 次加法
+    err = (1 + rel) * (1 + gamma(len(laws) + 1)) - 1
+    return Law(lo, probs, err, dropped, s, scale).trim()
+
+
+# clean_dist 默认丢弃的概率阈值
+DEFAULT_PRUNE = 2.0 ** -300
+
+
+def clean_dist(A, prune=DEFAULT_PRUNE):
+    """
+    清理概率极小的事件以加速计算
+    丢弃概率 ≤ prune 的项，丢弃的质量（按 err 放大后）计入 dropped；
+    磁盘映射的数组（blocked_convolution 的输出）原地分块处理
 
+    参数
+    ----
+    A : Law or dict
+    prune : float
+        概率阈值；调大（如 2^-200）可以大幅缩短支撑，代价是 dropped 变大
 
-def iter_law_convolution(A, i):
+    返回
+    ----
+    Law
+    """
+    A = as_law(A)
+    # 计算值 p̂ 与真实值 p 满足 p ≤ p̂ / (1 - err)
+    inflate = 1 / (1 - A.err) if A.err < 1 else np.inf
+    if is_mapped(A.probs):
+        # 分块卷积的输出：在映射数组上原地分块剪枝，剪枝后放得下时读回内存
+        lost = prune_inplace(A.probs, prune)
+        a, b = nonzero_span(A.probs)
+        probs = load_if_fits(A.probs[a:b], OOC_MAX_BYTES)
+        return Law(A.offset + A.stride * a, probs, A.err, A.dropped + lost * inflate, A.stride, A.scale)
+    if isinstance(A, SymmetricLaw):
+        small = A.half <= prune
+        lost = 2 * A.half[small].sum() - (A.half[0] if small.size and small[0] else 0.0)
+        half = np.where(small, 0.0, A.half)
+        return SymmetricLaw(half, A.err, A.dropped + lost * inflate, A.stride, A.scale).trim()
+    small = A.probs <= prune
+    probs = np.where(small, 0.0, A.probs)
+    lost = A.probs[small].sum()
+    return Law(A.offset, probs, A.err, A.dropped + lost * inflate, A.stride, A.scale).trim()
+
+
+# A^(2^j) 幂表缓存，可通过 power_cache.max_bytes 调整内存上限
+power_cache = PowerTableCache()
+
+
+def _power_table(A, bits, method, cache, prune, progress=NO_PROGRESS, rtol=DEFAULT_RTOL):
+    """
+    返回 [A, A^2, A^4, ..., A^(2^(bits-1))]，每一项都经过 clean_dist
+
+    cache 为 True 时先查 power_cache，只补算缺少的高次项
+    """
+    key = law_digest(A, method, prune, rtol) if cache else None
+    powers = (power_cache.table(key) if cache else None) or [A]
+    grown = len(powers) < bits
+    while len(powers) < bits:
+        progress.check()
+        P = powers[-1]
+        powers.append(clean_dist(law_convolution(P, P, method, rtol), prune))
+    if cache and grown:
+        power_cache.store(key, powers)
+    return powers
+
+
+def iter_law_convolution(A, i, method="auto", cache=True, prune=DEFAULT_PRUNE, progress=NO_PROGRESS,
+                         rtol=DEFAULT_RTOL):
     """
     计算分布 A 的 i 次自卷积（使用二进制快速幂）
 
+    A^(2^j) 按分布内容缓存在 power_cache 中，参数扫描时不同的 i
+    共用同一组平方，只需补做几次乘法
+
     参数
     ----
-    A : dict
+    A : Law or dict
         输入分布
     i : int
         卷积次数
+    method : str
+        每一步卷积使用的方法，见 law_convolution
+    cache : bool
+        是否使用幂表缓存
+    prune : float
+        每步卷积后丢弃的概率阈值，见 clean_dist
+    progress : Progress
+        每步卷积前检查取消，见 failure.progress
+    rtol : float
+        每一步卷积的目标相对误差，见 law_convolution
 
     返回
     ----
-    dict
+    Law
         i 次卷积后的分布
     """
-    D = {0: 1.0}
-    i_bin = bin(i)[2:]
-    for ch in i_bin:
-        D = law_convolution(D, D)
-        D = clean_dist(D)
-        if ch == '1':
-            D = law_convolution(D, A)
-            D = clean_dist(D)
+    A = as_law(A)
+    if i == 0:
+        return SymmetricLaw.point(0) if isinstance(A, SymmetricLaw) else Law.point(0)
+    powers = _power_table(A, i.bit_length(), method, cache, prune, progress, rtol)
+    D = None
+    for j, P in enumerate(powers):
+        if i >> j & 1:
+            progress.check()
+            D = P if D is None else clean_dist(law_convolution(D, P, method, rtol), prune)
+    return D
+
+
+def iter_power_sweep(A, step, count, start=None, method="auto", prune=DEFAULT_PRUNE,
+                     progress=NO_PROGRESS, stage="powers", rtol=DEFAULT_RTOL):
+    """
+    依次生成 start + A^0, start + A^step, start + A^(2·step), ...，共 count 项
+
+    相邻两项只差一次与 A^step 的卷积，按 j 扫描 A^(j·step) 时
+    不必对每个 j 重新做快速幂
+
+    参数
+    ----
+    A : Law or dict
+    step : int
+    count : int
+    start : Law or None
+        首项（与幂次独立的部分），None 为 0 处的单点分布
+    method : str
+        卷积方法，见 law_convolution
+    prune : float
+        每步卷积后丢弃的概率阈值，见 clean_dist
+    progress : Progress
+        每生成一项回报 stage 阶段的进度（含当前支撑大小），见 failure.progress
+    rtol : float
+        每一步卷积的目标相对误差，见 law_convolution
+
+    返回
+    ----
+    generator of Law
+    """
+    S = iter_law_convolution(A, step, method, prune=prune, progress=progress, rtol=rtol)
+    D = Law.point(0) if start is None else as_law(start)
+    for j in range(count):
+        progress.update(stage, j, count, len(D))
+        yield D
+        if j + 1 < count:
+            D = clean_dist(law_convolution(D, S, method, rtol), prune)
+    progress.update(stage, count, count, len(D))
+
+
+def sum_error_terms(terms, method="auto", prune=DEFAULT_PRUNE, progress=NO_PROGRESS, rtol=DEFAULT_RTOL):
+    """
+    独立误差项之和的分布
+
+    参数
+    ----
+    terms : list of (Law, int)
+        各项的分布及其重复（自卷积）次数
+    method : str
+        卷积方法，见 law_convolution；"fused" 在变换域中一次完成全部求和，
+        不构造中间分布（见 fused_sum，此时不做剪枝）
+    prune : float
+        自卷积时丢弃的概率阈值，见 clean_dist
+    progress : Progress
+        每加上一项回报 "terms" 阶段的进度（含当前支撑大小），见 failure.progress
+    rtol : float
+        每个概率值的目标相对误差，决定 auto 的选择与 fft / fused 的倾斜次数
+
+    返回
+    ----
+    Law
+        丢弃的质量累计在 dropped 中
+    """
+    if method == "fused":
+        progress.update("terms", 0, 1)
+        D = fused_sum(terms, rtol)
+        progress.update("terms", 1, 1, len(D))
+        return D
+    D = None
+    progress.update("terms", 0, len(terms))
+    for j, (law, count) in enumerate(terms, 1):
+        X = law if count == 1 else iter_law_convolution(law, count, method, prune=prune, progress=progress, rtol=rtol)
+        D = X if D is None else law_convolution(D, X, method, rtol)
+        progress.update("terms", j, len(terms), len(D))
     return D
 
 
@@ -337,102 +937,267 @@ def tail_probability(D, t):
 
     参数
     ----
-    D : dict
+    D : Law or dict
         离散分布
     t : int
-        阈值
+        阈值（实际取值，定点分布按 scale 换算到格点）
 
     返回
     ----
     float
     """
-    if not D:
+    if not len(D):
         return 0.0
 
-    s = 0.0
-    ma = max(D.keys())
-    if t >= ma:
+    D = as_law(D)
+    ma = D.hi
+    if t * D.scale >= ma:
         return 0.0
 
-    # 从尾部向中心累加，提高数值稳定性
-    for i in reversed(range(int(ceil(t)), int(ma))):
-        s += D.get(i, 0) + D.get(-i, 0)
-    return s
+    t0 = int(ceil(t * D.scale))
+    if jit.tail_sum is not None:
+        if not isinstance(D, SymmetricLaw):
+            return float(jit.tail_sum(D.probs, D.offset, D.stride, t0, int(ma)))
+        if t0 > 0:
+            return float(2 * jit.tail_sum(D.half, 0, D.stride, t0, int(ma)))
 
+    # 只遍历支撑上 t0 ≤ |x| < max(D) 的格点，从尾部向中心累加，提高数值稳定性
+    if isinstance(D, SymmetricLaw) and t0 > 0:
+        return float(2 * D.half[grid_slice(0, D.stride, len(D.half), t0, ma)][::-1].sum())
+    pos = D.probs[grid_slice(D.offset, D.stride, len(D), t0, ma)]
+    neg = D.probs[grid_slice(D.offset, D.stride, len(D), 1 - ma, 1 - t0)]
+    return float(pos[::-1].sum() + neg.sum())
 
 
-def law_convolution_fft(A, B, eps=1e-18):
+def failure_exponent(D, t, n=1):
     """
-    用 FFT 计算两个整数分布 A,B 的卷积
-    A,B: dict {int: prob}
+    log2(n · P(|X| > t))，附带计入误差传递的严格上界
+
+    参数
+    ----
+    D : Law
+        最终误差分布
+    t : int
+        阈值
+    n : int
+        系数个数（按 union bound 乘到尾概率上）
+
+    返回
+    ----
+    FailureExponent
+        upper 把逐点相对误差 err 与丢弃质量 dropped 全部算作尾部质量，
+        error = upper - 估计值（bit）
+    """
+    D = as_law(D)
+    proba = tail_probability(D, t)
+    value = log(n * proba) / log(2) if proba > 0 else float("-inf")
+    if D.err >= 1:
+        return FailureExponent(value, float("inf"), float("inf"))
+    covered = proba
+    if D.dropped > 0 and len(D) and ceil(t * D.scale) <= D.hi:
+        # 剪枝后 max(D) 可能小于真实的最大值，tail_probability 不计入的 ±max(D) 也属于尾部
+        covered += float(D.prob([D.hi, -D.hi]).sum())
+    bound = covered * (1 + gamma(max(len(D), 1))) / (1 - D.err) + D.dropped
+    upper = log(n * bound) / log(2) if bound > 0 else float("-inf")
+    return FailureExponent(value, upper, upper - value if proba > 0 else float("inf"))
+
+
+def tail_curve(D):
     """
-    if not A or not B:
-        return {}
+    一次计算所有非负阈值下的尾概率，p[j] 与 tail_probability(D, t[j]) 一致
 
-    amin, amax = min(A), max(A)
-    bmin, bmax = min(B), max(B)
+    参数
+    ----
+    D : Law or dict
+        离散分布
 
-    size = (amax - amin) + (bmax - bmin) + 1
-    n = 1
-    while n < size:
-        n <<= 1
+    返回
+    ----
+    (np.ndarray, np.ndarray)
+        (t, p)：t 取 0、max(D) 以及支撑上出现的各个 |x|（实际取值），
+        相邻两个 t 之间的阈值与较大的一个尾概率相同
+    """
+    D = as_law(D)
+    ma = int(D.hi) if len(D) else 0
+    if ma <= 0:
+        return np.zeros(1), np.zeros(1)
+    # 每个格点计入 t ≤ |x| 的全部阈值；与 tail_probability 相同，x = 0 计两次
+    if isinstance(D, SymmetricLaw):
+        x, w = D.stride * np.arange(len(D.half), dtype=np.int64), 2 * D.half
+    else:
+        x, w = D.support(), D.probs
+        w = np.where(x == 0, 2 * w, w)
+        x = np.abs(x)
+    keep = x < ma
+    u, inv = np.unique(x[keep], return_inverse=True)
+    # 与 tail_probability 相同，从尾部向中心累加
+    tail = np.cumsum(np.bincount(inv, weights=w[keep], minlength=len(u))[::-1])[::-1]
+    t = np.union1d(u, [0, ma])
+    j = np.searchsorted(u, t)
+    p = np.where(j < len(u), tail[np.minimum(j, len(u) - 1)], 0.0)
+    return (t if D.scale == 1 else t / D.scale), p
+
+
+def failure_curve(D, n=1):
+    """
+    所有阈值下的 log2(n · P(|X| > t))，见 tail_curve
+
+    返回
+    ----
+    (np.ndarray, np.ndarray)
+        (t, log2 失败概率)，尾概率为 0 处为 -inf
+    """
+    t, p = tail_curve(D)
+    with np.errstate(divide="ignore"):
+        return t, np.log2(n * p)
+
+
+def resolve_options(ps):
+    """
+    取出 params 中与方案无关的计算选项
+
+    参数
+    ----
+    ps : SimpleNamespace
+        可含 method（卷积方法，见 sum_error_terms，默认 "auto"）、
+        prune（自卷积时丢弃的概率阈值，默认 2^-300，丢弃质量计入误差上界）、
+        progress（进度回调，接收 ProgressEvent）、cancel（CancelToken，取消后抛出 Cancelled）
+        与 rtol（每个概率值的目标相对误差，默认 2^-20，见 sum_error_terms）
+
+    返回
+    ----
+    (str, float, Progress, float)
+        顺序与 sum_error_terms 的参数一致
+    """
+    method = getattr(ps, "method", "auto")
+    prune = getattr(ps, "prune", DEFAULT_PRUNE)
+    rtol = getattr(ps, "rtol", DEFAULT_RTOL)
+    return method, prune, as_progress(getattr(ps, "progress", None), getattr(ps, "cancel", None)), rtol
+
+
+def failure_probability_by_mode(mode, ps, error_terms, n=1):
+    """
+    按计算模式求 log2(n · P(|X| > threshold))，各方案的 compute_failure_probability 共用
+
+    参数
+    ----
+    mode : str
+        "float" 浮点分布卷积，返回值附带严格上界 upper，剪枝丢弃的质量全部计入其中；
+        "exact" 多素数 NTT 精确计算；
+        "saddlepoint" 鞍点法快速估计，upper 为 Chernoff 上界，附带 chernoff_gap，估计值本身没有误差界；
+        "log" 对数域分布卷积，尾部可低至 2^-1000 以下
+    ps : SimpleNamespace
+        方案参数，含 threshold；可选项见 resolve_options
+    error_terms : callable
+        error_terms(ps, exact=False) 返回 [(分布, 重复次数), ...]
+    n : int
+        系数个数（按 union bound 乘到尾概率上）
+
+    返回
+    ----
+    FailureExponent, SaddlepointExponent or float
+    """
+    method, prune, progress, rtol = resolve_options(ps)
+    if mode == "float":
+        return failure_exponent(sum_error_terms(error_terms(ps), method, prune, progress, rtol), ps.threshold, n)
+    if mode == "exact":
+        return log2_fraction(n * exact_tail_probability(error_terms(ps, exact=True), ps.threshold, progress))
+    if mode == "saddlepoint":
+        progress.check()
+        return saddlepoint_failure_probability(error_terms(ps), ps.threshold, n)
+    if mode == "log":
+        return log_failure_probability(error_terms(ps), ps.threshold, n, progress=progress)
+    raise ValueError(f"未知的计算模式: {mode}")
 
-    fa = np.zeros(n)
-    fb = np.zeros(n)
 
-    for x,p in A.items():
-        fa[x - amin] = p
-    for x,p in B.items():
-        fb[x - bmin] = p
+def law_convolution_fft(A, B, eps=1e-18):
+    """
+    用 FFT 计算两个整数分布 A,B 的卷积
+    A,B: Law 或 dict {int: prob}
+
+    普通 float64 FFT，1e-16 以下的尾部概率会被舍入噪声淹没；
+    需要尾部精度时使用 tilted_convolution
+    """
+    A, B = as_law(A), as_law(B)
+    if not len(A) or not len(B):
+        return Law(0, [])
+    A, B = align_grids(A, B)
+
+    size = len(A) + len(B) - 1
+    n = _fft_size(size)
 
-    F = np.fft.fft(fa)
-    G = np.fft.fft(fb)
-    H = F * G
-    h = np.fft.ifft(H).real
+    F = np.fft.rfft(A.probs, n)
+    G = np.fft.rfft(B.probs, n)
+    h = np.fft.irfft(F * G, n)[:size]
+
+    h[np.abs(h) <= eps] = 0.0
+    abs_err = _FFT_ERR_CONST * UNIT_ROUNDOFF * np.log2(n) * A.mass() * B.mass()
+    err, dropped = combine_errors(A, B, _fft_relative_error(h, abs_err))
+    return Law(A.offset + B.offset, h, err, dropped, A.stride, A.scale).trim()
 
-    C = {}
-    for i in range(size):
-        v = h[i]
-        if abs(v) > eps:
-            C[i + amin + bmin] = v
-    return C
 
 def power_law_convolution_fft(A, t, eps=1e-18):
     """
     计算 A 的 t 次自卷积: A^{*t}
     """
+    A = as_law(A)
     if t == 0:
-        return {0:1.0}
+        return Law.point(0)
     if t == 1:
         return A.copy()
 
-    amin, amax = min(A), max(A)
-    width = amax - amin
-    size = t * width + 1
-
-    n = 1
-    while n < size:
-        n <<= 1
+    size = t * (len(A) - 1) + 1
 
-    f = np.zeros(n)
-    for x,p in A.items():
-        f[x - amin] = p
+    n = _fft_size(size)
 
-    F = np.fft.fft(f)
+    F = np.fft.rfft(A.probs, n)
     F **= t
-    res = np.fft.ifft(F).real
+    res = np.fft.irfft(F, n)[:size]
+
+    res[np.abs(res) <= eps] = 0.0
+    abs_err = _FFT_ERR_CONST * UNIT_ROUNDOFF * (np.log2(n) + t) * A.mass() ** t
+    rel = _fft_relative_error(res, abs_err)
+    return Law(t * A.offset, res, (1 + A.err) ** t * (1 + rel) - 1, t * A.dropped,
+               A.stride, A.scale).trim()
+
+
+def _fft_relative_error(h, abs_err):
+    """
+    普通 FFT 结果中保留下来的项的相对误差上界
+    """
+    kept = np.abs(h[h != 0])
+    return abs_err / kept.min() if kept.size else 0.0
 
-    out = {}
-    for i in range(size):
-        v = res[i]
-        if abs(v) > eps:
-            out[i + t*amin] = v
-    return out
 
 def dist_scale(A, c):
-    """ XXX: not general. Assumes A has integer keys and rounds a*c to the first decimal place. """
-    B = {}
-    for a in A:
-        B[round(10 * a * c)/10] = A[a]
-    return B
+    """
+    分布 c·X，c 可以是非整数
+
+    c 取有理数 num / den（float 见 as_fraction），格点乘以 num、定点分母乘以 den，
+    结果仍在整数格点上，可以继续走数组与 FFT 卷积；定点分母超过 MAX_SCALE
+    时抛出 ValueError
+
+    参数
+    ----
+    A : Law or dict
+    c : int, float or Fraction
 
+    返回
+    ----
+    Law
+    """
+    A = as_law(A)
+    c = as_fraction(c)
+    if c == 0 or not len(A):
+        return Law.point(0) if len(A) else Law(0, [])
+    num, den = c.numerator, c.denominator
+    # 放大只改变 offset、stride 与 scale，概率数组不变
+    if isinstance(A, SymmetricLaw):
+        B = SymmetricLaw(A.half, A.err, A.dropped, A.stride * abs(num), A.scale * den)
+    elif num > 0:
+        B = Law(A.offset * num, A.probs, A.err, A.dropped, A.stride * num, A.scale * den)
+    else:
+        B = Law(A.hi * num, A.probs[::-1], A.err, A.dropped, A.stride * -num, A.scale * den)
+    B = B.reduce_scale()
+    check_scale(B.scale)
+    return B
@@ -0,0 +1,107 @@
+"""
+测试用的基准实现：重构前 failure/util.py 中基于 dict 的逐项循环
+
+各测试把新的实现与这里的结果在小参数上逐点比较
+"""
+from math import ceil
+
+from failure.util import mod_switch, mod_centered
+
+
+def mod_switching_error_law(q, rq):
+    D = {}
+    for x in range(q):
+        y = mod_switch(x, q, rq)
+        z = mod_switch(y, rq, q)
+        d = mod_centered(x - z, q)
+        D[d] = D.get(d, 0) + 1.0 / q
+    return D
+
+
+def law_convolution(A, B):
+    C = {}
+    for a in A:
+        for b in B:
+            c = a + b
+            C[c] = C.get(c, 0) + A[a] * B[b]
+    return C
+
+
+def law_product(A, B):
+    C = {}
+    for a in A:
+        for b in B:
+            c = a * b
+            C[c] = C.get(c, 0) + A[a] * B[b]
+    return C
+
+
+def clean_dist(A):
+    return {x: y for x, y in A.items() if y > 2 ** (-300)}
+
+
+def iter_law_convolution(A, i):
+    D = {0: 1.0}
+    for ch in bin(i)[2:]:
+        D = clean_dist(law_convolution(D, D))
+        if ch == '1':
+            D = clean_dist(law_convolution(D, A))
+    return D
+
+
+def tail_probability(D, t):
+    if not D:
+        return 0.0
+    s = 0.0
+    ma = max(D.keys())
+    if t >= ma:
+        return 0.0
+    for i in reversed(range(int(ceil(t)), int(ma))):
+        s += D.get(i, 0) + D.get(-i, 0)
+    return s
+
+
+def as_dict(L):
+    """
+    Law（或 dict）转成去掉零概率项的 dict
+    """
+    return {x: p for x, p in L.items() if p}
+
+
+def assert_laws_close(L, D, rtol=1e-12, atol=1e-300):
+    """
+    L 与基准 dict D 支撑相同、逐点概率在容差内
+    """
+    L = as_dict(L)
+    D = {x: p for x, p in D.items() if p}
+    assert set(L) == set(D)
+    for x, p in D.items():
+        assert abs(L[x] - p) <= rtol * p + atol, (x, L[x], p)
+
+
+def quadratic_form(A, B):
+    """
+    a1·a2 + b1·b2 的四重循环（重构前 3n 方案的 build_table1 / build_re_table1 / build_se_table1）
+    """
+    C = {}
+    for a1 in A:
+        for a2 in A:
+            for b1 in B:
+                for b2 in B:
+                    c = a1 * a2 + b1 * b2
+                    C[c] = C.get(c, 0) + A[a1] * A[a2] * B[b1] * B[b2]
+    return C
+
+
+def mixed_quadratic_form(A, B):
+    """
+    a1·b1 + b2·(a1 + a2) 的四重循环（重构前的 build_table2 / build_re_table2 / build_se_table2）
+    """
+    C = {}
+    for a1 in A:
+        for a2 in A:
+            for b1 in B:
+                for b2 in B:
+                    c = a1 * b1 + b2 * (a1 + a2)
+                    C[c] = C.get(c, 0) + A[a1] * A[a2] * B[b1] * B[b2]
+    return C
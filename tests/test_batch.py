@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from decryption_failure_calculator import compute_failure_probability, compute_failure_probabilities
+from failure.util import power_cache
+
+from test_modes import CASES
+
+JOBS = [(name, params) for name, params in CASES.items()] + [
+    ("RLWE_3n", dict(n=16, q=61, psi_1=1, threshold=9)),
+    ("LWE", dict(CASES["LWE"], threshold=30)),
+]
+
+
+def test_batch_matches_sequential():
+    power_cache.clear()
+    expected = [compute_failure_probability(name, params) for name, params in JOBS]
+    power_cache.clear()
+    got = compute_failure_probabilities(JOBS, max_workers=4)
+    assert [float(x) for x in got] == pytest.approx([float(x) for x in expected], abs=1e-12)
+
+
+def test_concurrent_calls_share_caches_safely():
+    name, params = JOBS[3]
+    expected = float(compute_failure_probability(name, params))
+    power_cache.clear()
+    with ThreadPoolExecutor(8) as pool:
+        got = list(pool.map(lambda _: float(compute_failure_probability(name, params)), range(16)))
+    assert got == pytest.approx([expected] * 16, abs=1e-12)
+
+
+def test_batch_progress_is_tagged_by_job():
+    seen = set()
+    compute_failure_probabilities(JOBS[:3], progress=lambda j, event: seen.add(j))
+    assert seen == {0, 1, 2}
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from failure.cache import PowerTableCache, law_digest
+from failure.law import Law
+from failure.util import iter_law_convolution, build_centered_binomial_law, power_cache
+
+from baseline import iter_law_convolution as dict_iter_law_convolution, as_dict, assert_laws_close
+
+SKEW = Law(-1, [0.2, 0.5, 0.3])
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    power_cache.clear()
+    yield
+    power_cache.clear()
+
+
+def test_sweep_reuses_the_table():
+    for i in (3, 12, 7, 16, 5):
+        # 每次重新构造分布：按内容命中
+        L = iter_law_convolution(Law(-1, [0.2, 0.5, 0.3]), i, "direct")
+        assert np.array_equal(L.probs, iter_law_convolution(SKEW, i, "direct", cache=False).probs)
+        assert_laws_close(L, dict_iter_law_convolution(as_dict(SKEW), i), rtol=1e-11)
+    assert len(power_cache) == 1
+    assert power_cache.hits >= 4
+
+
+def test_key_separates_content_and_method():
+    A = build_centered_binomial_law(2)
+    assert law_digest(A) == law_digest(build_centered_binomial_law(2))
+    assert law_digest(A) != law_digest(SKEW)
+    assert law_digest(A, "direct") != law_digest(A, "fft")
+
+
+def test_lru_eviction_respects_the_budget():
+    cache = PowerTableCache(max_bytes=150)
+    tables = {k: [Law(0, np.full(8, 0.125))] for k in "abc"}
+    for k, powers in tables.items():
+        cache.store(k, powers)
+    assert cache.nbytes <= 150
+    assert cache.table("a") is None and cache.table("c") is not None
+    cache.store("big", [Law(0, np.zeros(100))])
+    assert cache.table("big") is None and cache.nbytes <= 150
@@ -0,0 +1,28 @@
+import importlib
+import math
+
+import numpy as np
+import pytest
+
+from failure.util import failure_curve, build_centered_binomial_law, law_product
+
+from baseline import iter_law_convolution, tail_probability as dict_tail_probability, as_dict
+
+from test_modes import CASES
+
+
+def test_curve_matches_dict_tails():
+    D = iter_law_convolution(as_dict(law_product(build_centered_binomial_law(2), build_centered_binomial_law(1))), 9)
+    t, lp = failure_curve(D, n=8)
+    for tj, pj in zip(t, lp):
+        p = dict_tail_probability(D, tj)
+        assert pj == (-np.inf if p == 0 else pytest.approx(math.log2(8 * p), abs=1e-12))
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_scheme_curve_matches_single_thresholds(name):
+    mod = importlib.import_module("failure." + name)
+    t, lp = mod.compute_failure_curve(**CASES[name])
+    for j in np.linspace(0, len(t) - 2, 6).astype(int):
+        params = dict(CASES[name], threshold=t[j])
+        assert lp[j] == pytest.approx(float(mod.compute_failure_probability(**params)), abs=1e-9)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from failure.dispatch import ConvolutionCostModel
+from failure.law import Law
+from failure.util import law_convolution, build_centered_binomial_law
+
+from baseline import law_convolution as dict_law_convolution, iter_law_convolution, as_dict, assert_laws_close
+
+
+def _model(c_d=1e-9, c_s=2e-8, c_z=1e-9, c_f=5e-9, c_t=1e-5):
+    model = ConvolutionCostModel()
+    model._consts = (c_d, c_s, c_z, c_f, c_t)
+    return model
+
+
+def _sparse(n, gap):
+    probs = np.zeros(n * gap)
+    probs[::gap] = 1.0 / n
+    probs[1] = 1e-3
+    return Law(0, probs / probs.sum())
+
+
+def test_choice_follows_the_costs():
+    model = _model()
+    small = build_centered_binomial_law(3)
+    assert model.choose(small, small, 2.0 ** -20) == "direct"
+    assert model.choose(_sparse(20, 500), _sparse(20, 500), 2.0 ** -20) == "sparse"
+    wide = Law(0, np.full(1 << 15, 2.0 ** -15))
+    assert model.choose(wide, wide, 2.0 ** -20) == "fft"
+    assert model.choose(wide, wide, 2.0 ** -20, workers=8) in ("fft", "parallel")
+
+
+def test_unreachable_rtol_never_picks_fft():
+    wide = Law(0, np.full(1 << 15, 2.0 ** -15))
+    model = _model()
+    assert model.tilts(wide, wide, 2.0 ** -60) == np.inf
+    assert model.choose(wide, wide, 2.0 ** -60) != "fft"
+
+
+@pytest.mark.parametrize("A, B", [
+    (as_dict(build_centered_binomial_law(2)), as_dict(build_centered_binomial_law(3))),
+    ({0: 0.5, 1000: 0.25, 5000: 0.25}, {-7: 0.5, 4000: 0.5}),
+    (iter_law_convolution(as_dict(build_centered_binomial_law(2)), 60), {-1: 0.3, 0: 0.4, 1: 0.3}),
+], ids=["small", "sparse", "wide"])
+def test_auto_matches_dict(A, B):
+    L = law_convolution(A, B)
+    assert_laws_close(L, dict_law_convolution(A, B), rtol=max(L.err, 1e-12))
+
+
+def test_parallel_cost_tracks_the_direct_work():
+    model = _model()
+    wide = Law(0, np.full(1 << 15, 2.0 ** -15))
+    costs = model.costs(wide, wide, 2.0 ** -20, workers=8)
+    assert costs["direct"] == pytest.approx(1e-9 * len(wide) ** 2)
+    assert costs["direct"] / 8 < costs["parallel"] < costs["direct"] / 7
+    # 对称分布：较宽一方的 [-hb, ha] 段与较窄一方的完整支撑
+    A, B = build_centered_binomial_law(30), build_centered_binomial_law(10)
+    assert model.costs(A, B, 2.0 ** -20)["direct"] == pytest.approx(1e-9 * (30 + 10 + 1) * 21)
+
+
+@pytest.mark.parametrize("method", ["auto", "fused"])
+def test_caller_rtol_reaches_every_convolution(monkeypatch, method):
+    # compute_failure_probability 的 rtol 一直传到每次卷积的方法选择与 fused_sum
+    from failure import LWE, util
+    seen = []
+    choose = util.cost_model.choose
+    fused = util.fused_sum
+    monkeypatch.setattr(util.cost_model, "choose", lambda A, B, rtol, *a: seen.append(rtol) or choose(A, B, rtol, *a))
+    monkeypatch.setattr(util, "fused_sum", lambda terms, rtol: seen.append(rtol) or fused(terms, rtol))
+    params = dict(n=16, q=3329, ks=2, ke_pk=2, kr=2, ke=2, threshold=40, method=method, rtol=2.0 ** -30)
+    LWE.compute_failure_probability(**params)
+    assert seen and set(seen) == {2.0 ** -30}
@@ -0,0 +1,63 @@
+from fractions import Fraction
+
+import pytest
+
+from failure.exact import ExactLaw, exact_law_convolution, exact_tail_probability, tail_weights
+
+from baseline import tail_probability as dict_tail_probability
+
+
+def _convolve_terms(terms):
+    D = ExactLaw(0, [1], 1)
+    for law, count in terms:
+        for _ in range(count):
+            D = exact_law_convolution(D, law)
+    return D
+
+
+def _direct_tail(terms, t):
+    D = _convolve_terms(terms)
+    w = tail_weights(D.lo, D.hi, t)
+    return Fraction(sum(int(a) * c for a, c in zip(w, D.counts)), D.denom)
+
+
+CBD = ExactLaw(-2, [1, 4, 6, 4, 1], 16)
+
+CASES = {
+    # 对称：半频谱求幂
+    "symmetric": [(CBD, 7)],
+    # 非对称、lo < -hi
+    "skewed": [(ExactLaw(-3, [1, 1, 2], 4), 5)],
+    "mixed": [(CBD, 3), (ExactLaw(-1, [3, 1, 2, 5], 11), 4)],
+    # count = 1 的两点项折进权重
+    "folded": [(CBD, 6), (ExactLaw(0, [1, 1], 2), 1), (ExactLaw(-1, [1, 2], 3), 1)],
+}
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_exact_tail_matches_direct_convolution(name):
+    terms = CASES[name]
+    D = _convolve_terms(terms)
+    for t in range(-1, D.hi + 2):
+        assert exact_tail_probability(terms, t) == _direct_tail(terms, t), t
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_exact_tail_matches_dict(name):
+    terms = CASES[name]
+    D = _convolve_terms(terms)
+    d = {D.lo + j: c / D.denom for j, c in enumerate(D.counts) if c}
+    for t in range(0, D.hi + 1):
+        assert float(exact_tail_probability(terms, t)) == pytest.approx(dict_tail_probability(d, t), rel=1e-12, abs=0)
+
+
+def test_exact_tail_beyond_support_is_zero():
+    assert exact_tail_probability([(CBD, 4)], 8) == 0
+    assert exact_tail_probability([(CBD, 4)], 100) == 0
+
+
+def test_exact_tail_long_transform():
+    # 变换长度 > 256：多批素数、四步法读出
+    terms = [(CBD, 150), (ExactLaw(-1, [1, 2, 1], 4), 1)]
+    for t in (0, 5, 40, 120, 300):
+        assert exact_tail_probability(terms, t) == _direct_tail(terms, t), t
@@ -0,0 +1,66 @@
+import multiprocessing
+import os
+import subprocess
+import sys
+
+import pytest
+
+from failure import executor
+from failure.RLWE_3n import compute_failure_probability as rlwe_3n
+
+
+@pytest.fixture
+def restore_config():
+    saved = executor._max_workers, executor._memory_budget, executor._start_method
+    yield
+    executor.configure(*saved)
+
+
+def test_default_start_method_matches_pool():
+    method = executor._mp_context().get_start_method()
+    assert method == ("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+
+
+def test_start_method_is_configurable(restore_config):
+    executor.configure(start_method="spawn")
+    assert executor.process_pool()._mp_context.get_start_method() == "spawn"
+    assert list(executor.map_tasks(abs, [-2, 3])) == [2, 3]
+    with pytest.raises(ValueError):
+        executor.configure(start_method="bogus")
+
+
+def test_map_tasks_keeps_order():
+    assert list(executor.map_tasks(abs, range(-5, 5), limit=2)) == [abs(x) for x in range(-5, 5)]
+
+
+def test_sweep_in_pool_matches_fused():
+    params = dict(n=16, q=61, psi_1=1, threshold=9)
+    assert rlwe_3n(method="sweep", processes=2, **params) == pytest.approx(rlwe_3n(**params), rel=1e-9)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="需要 fork")
+def test_unguarded_script_runs_the_sweep(tmp_path):
+    # 与原先的 Pool 一样，没有 __main__ 保护的脚本也能用进程池
+    script = tmp_path / "run.py"
+    script.write_text("from failure.RLWE_3n import compute_failure_probability as f\n"
+                      "print(f(n=16, q=61, method='sweep', processes=2))\n")
+    src = os.path.join(os.path.dirname(__file__), os.pardir, "src")
+    env = dict(os.environ, PYTHONPATH=os.path.abspath(src))
+    out = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, env=env, timeout=300)
+    assert out.returncode == 0, out.stderr
+    assert float(out.stdout) == pytest.approx(rlwe_3n(n=16, q=61), rel=1e-9)
+
+
+def test_concurrency_respects_memory_budget(restore_config):
+    executor.configure(max_workers=4, memory_budget=1000)
+    assert executor.concurrency(300) == 3
+    assert executor.concurrency(300, limit=2) == 2
+    assert executor.concurrency(5000) == 1
+
+
+def test_configure_keeps_unpassed_settings(restore_config):
+    executor.configure(memory_budget=1000)
+    executor.configure(max_workers=4)
+    assert executor.memory_budget() == 1000 and executor.max_workers() == 4
+    executor.configure(memory_budget=None)
+    assert executor.max_workers() == 4
@@ -0,0 +1,35 @@
+import pytest
+
+from failure.fft import fused_sum
+from failure.util import sum_error_terms, build_centered_binomial_law, build_mod_switching_error_law, law_product
+
+from baseline import law_convolution, iter_law_convolution, as_dict
+
+CBD = build_centered_binomial_law(2)
+PROD = law_product(CBD, build_centered_binomial_law(3))
+MS = build_mod_switching_error_law(3329, 1024)
+
+
+def _dict_sum(terms):
+    D = {0: 1.0}
+    for law, count in terms:
+        D = law_convolution(D, iter_law_convolution(as_dict(law), count))
+    return D
+
+
+@pytest.mark.parametrize("terms", [[(CBD, 30)], [(PROD, 24), (CBD, 1)], [(PROD, 8), (MS, 3), (CBD, 2)]],
+                         ids=["cbd", "product", "mixed"])
+def test_fused_sum_matches_dict(terms):
+    D = _dict_sum(terms)
+    L = fused_sum(terms)
+    assert L.err <= 2.0 ** -19
+    for x, p in D.items():
+        if p > 1e-280:
+            assert abs(L.get(x) - p) <= L.err * p + L.dropped, x
+
+
+def test_fused_method_in_sum_error_terms():
+    terms = [(PROD, 10), (CBD, 1)]
+    L = sum_error_terms(terms, "fused")
+    for x, p in _dict_sum(terms).items():
+        assert abs(L.get(x) - p) <= L.err * p + L.dropped
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from failure.fft import fused_tails
+from failure.law import Law, SymmetricLaw
+from failure.util import build_centered_binomial_law
+
+from baseline import law_convolution, iter_law_convolution, as_dict
+
+CBD = build_centered_binomial_law(2)
+SYM = SymmetricLaw([0.4, 0.2, 0.1])
+SKEW = Law(-1, [0.5, 0.2, 0.3])
+STRIDED = Law(-4, [0.25, 0.5, 0.25], stride=4)
+
+
+def _dict_tails(laws, counts, t):
+    tails = []
+    for row in counts:
+        D = {0: 1.0}
+        for L, c in zip(laws, row):
+            D = law_convolution(D, iter_law_convolution(as_dict(L), c))
+        tails.append(sum(p for x, p in D.items() if abs(x) > t))
+    return np.array(tails)
+
+
+CASES = {
+    "symmetric": ([CBD, SYM], [(2 * i, 12 - 2 * i) for i in range(6)], 5),
+    "skewed": ([CBD, SKEW, SYM], [(i, 8 - i, 1) for i in range(8)], 4),
+    "strided": ([STRIDED, CBD], [(i, 6) for i in range(5)], 7),
+    "deep": ([CBD], [(c,) for c in (10, 20, 40)], 30),
+}
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_fused_tails_match_dict(name):
+    laws, counts, t = CASES[name]
+    tails, bound = fused_tails(laws, counts, t)
+    expect = _dict_tails(laws, counts, t)
+    assert len(tails) == len(counts)
+    assert np.all(np.abs(tails - expect) <= bound + 1e-12 * expect)
+    assert np.allclose(tails, expect, rtol=1e-6, atol=0)
+
+
+def test_fused_tails_beyond_support_is_zero():
+    tails, bound = fused_tails([CBD], [(3,), (5,)], 20)
+    assert np.all(tails + bound < 1e-300)
@@ -0,0 +1,40 @@
+import pytest
+
+from failure import jit
+from failure.law import Law
+from failure.util import law_convolution, law_product, tail_probability, build_centered_binomial_law
+
+from baseline import law_convolution as dict_law_convolution, law_product as dict_law_product
+from baseline import tail_probability as dict_tail_probability, as_dict, assert_laws_close
+
+SKEW = Law(-3, [0.1, 0.0, 0.4, 0.2, 0.0, 0.3])
+SPARSE = {0: 0.5, 700: 0.25, 1900: 0.25}
+CBD = build_centered_binomial_law(2)
+
+
+@pytest.fixture(params=["numpy", "kernels"])
+def kernels(request, monkeypatch):
+    # 未安装 Numba 时也检查内核本身：直接以 Python 函数运行
+    if request.param == "kernels":
+        monkeypatch.setattr(jit, "sparse_convolve", jit._sparse_convolve)
+        monkeypatch.setattr(jit, "scatter_products", jit._scatter_products)
+        monkeypatch.setattr(jit, "tail_sum", jit._tail_sum)
+    else:
+        monkeypatch.setattr(jit, "sparse_convolve", None)
+        monkeypatch.setattr(jit, "scatter_products", None)
+        monkeypatch.setattr(jit, "tail_sum", None)
+
+
+def test_sparse_convolution(kernels):
+    assert_laws_close(law_convolution(SKEW, SPARSE, "sparse"), dict_law_convolution(as_dict(SKEW), SPARSE))
+
+
+def test_product(kernels):
+    assert_laws_close(law_product(SKEW, Law(-1, [0.3, 0.3, 0.4])),
+                      dict_law_product(as_dict(SKEW), {-1: 0.3, 0: 0.3, 1: 0.4}))
+
+
+@pytest.mark.parametrize("L", [SKEW, CBD], ids=repr)
+def test_tail_sum(kernels, L):
+    for t in range(-1, L.hi + 1):
+        assert tail_probability(L, t) == pytest.approx(dict_tail_probability(as_dict(L), t), rel=1e-15)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from failure.law import Law
+from failure.util import law_convolution, iter_law_convolution, clean_dist, build_centered_binomial_law
+
+from baseline import law_convolution as dict_law_convolution, iter_law_convolution as dict_iter_law_convolution
+from baseline import clean_dist as dict_clean_dist, as_dict, assert_laws_close
+
+
+def _dicts():
+    rng = np.random.default_rng(1)
+    for size in (1, 3, 6):
+        keys = rng.choice(np.arange(-10, 11), size, replace=False)
+        p = rng.random(size)
+        yield {int(x): float(v) for x, v in zip(keys, p / p.sum())}
+
+
+DICTS = list(_dicts()) + [as_dict(build_centered_binomial_law(2))]
+
+
+@pytest.mark.parametrize("D", DICTS, ids=str)
+def test_round_trip(D):
+    L = Law.from_dict(D)
+    assert_laws_close(L, D, rtol=0)
+    assert L.mass() == pytest.approx(sum(D.values()))
+    for x in range(-12, 13):
+        assert L.get(x) == D.get(x, 0.0)
+
+
+@pytest.mark.parametrize("A", DICTS, ids=str)
+@pytest.mark.parametrize("B", DICTS, ids=str)
+def test_convolution_matches_dict(A, B):
+    assert_laws_close(law_convolution(Law.from_dict(A), Law.from_dict(B), "direct"), dict_law_convolution(A, B))
+
+
+@pytest.mark.parametrize("D", DICTS, ids=str)
+def test_iter_convolution_matches_dict(D):
+    for i in range(1, 10):
+        assert_laws_close(iter_law_convolution(D, i, "direct", cache=False), dict_iter_law_convolution(D, i),
+                          rtol=1e-11)
+
+
+def test_clean_dist_matches_dict():
+    D = {0: 0.5, 1: 2.0 ** -310, 2: 0.5 - 2.0 ** -310, 3: 2.0 ** -400}
+    L = clean_dist(D)
+    assert_laws_close(L, dict_clean_dist(D), rtol=0)
+    assert L.dropped >= 2.0 ** -310
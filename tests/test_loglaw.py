@@ -0,0 +1,46 @@
+import math
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from failure.exact import ExactLaw, exact_law_convolution
+from failure.loglaw import log_law_convolution, iter_log_law_convolution, log_failure_probability
+from failure.util import build_centered_binomial_law
+from failure.NTRU import compute_failure_probability as ntru
+
+from baseline import law_convolution as dict_law_convolution, as_dict
+
+CBD = build_centered_binomial_law(2)
+
+
+def _log_fraction(x):
+    return math.log(x.numerator) - math.log(x.denominator)
+
+
+def test_convolution_matches_dict():
+    A, B = as_dict(CBD), {-3: 0.1, 0: 0.6, 5: 0.3}
+    L = log_law_convolution(A, B)
+    for x, p in dict_law_convolution(A, B).items():
+        assert L.log_prob([x])[0] == pytest.approx(math.log(p), abs=1e-13)
+
+
+def test_tail_below_double_underflow():
+    # CBD(2) 的 600 次自卷积，两端概率为 16^-600 = 2^-2400
+    E = ExactLaw(-2, [1, 4, 6, 4, 1], 16)
+    D = ExactLaw(0, [1], 1)
+    for _ in range(600):
+        D = exact_law_convolution(D, E)
+    L = iter_log_law_convolution(CBD, 600, prune=-np.inf)
+    for x in (1200, 1100, 900, -1150):
+        exact = _log_fraction(Fraction(D.counts[x - D.offset], D.denom))
+        assert L.log_prob([x])[0] == pytest.approx(exact, rel=1e-10)
+    t = 1000
+    tail = Fraction(sum(D.counts[j] for j in range(len(D.counts)) if t <= abs(D.offset + j) < D.hi), D.denom)
+    got = log_failure_probability([(CBD, 600)], t, prune=-np.inf)
+    assert got == pytest.approx(_log_fraction(tail) / math.log(2), rel=1e-10)
+    assert got < -1074
+
+
+def test_ntru_reference_value():
+    assert ntru(n=509, q=2048).endswith("2^(-223.32)")
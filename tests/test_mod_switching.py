@@ -0,0 +1,82 @@
+import random
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from failure.law import SymmetricLaw
+from failure.util import (
+    _mod_switching_error_counts, _round_div, build_mod_switching_error_law, mod_centered, mod_switch,
+)
+
+from baseline import mod_switching_error_law, assert_laws_close
+
+
+@pytest.mark.parametrize("q", range(1, 40))
+def test_matches_dict_loop(q):
+    for rq in range(1, q + 3):
+        assert_laws_close(build_mod_switching_error_law(q, rq), mod_switching_error_law(q, rq))
+
+
+@pytest.mark.parametrize("q, rq", [(8192, 1024), (12, 4), (4, 2), (3329, 1024), (3329, 16)])
+def test_symmetric_support_is_detected(q, rq):
+    L = build_mod_switching_error_law(q, rq)
+    D = mod_switching_error_law(q, rq)
+    assert_laws_close(L, D)
+    if all(abs(D[x] - D.get(-x, 0)) == 0 for x in D):
+        assert isinstance(L, SymmetricLaw)
+
+
+def test_total_mass():
+    for q, rq in [(2, 1), (4, 2), (12, 4), (7, 3)]:
+        assert build_mod_switching_error_law(q, rq).probs.sum() == pytest.approx(1.0)
+
+
+def _dict_counts(q, rq):
+    counts = {}
+    for x in range(q):
+        d = mod_centered(x - mod_switch(mod_switch(x, q, rq), rq, q), q)
+        counts[d] = counts.get(d, 0) + 1
+    return counts
+
+
+@pytest.mark.parametrize("q, rq", [(3329, 1024), (3329, 10), (8192, 1000), (7681, 7680), (6, 4), (5, 5)])
+def test_exact_counts_match_dict_loop(q, rq):
+    E = build_mod_switching_error_law(q, rq, exact=True)
+    D = _dict_counts(q, rq)
+    g = E.denom and q // E.denom
+    assert {E.lo + j: c * g for j, c in enumerate(E.counts) if c} == D
+
+
+def test_large_modulus_uses_python_ints():
+    # q·rq 超出 int64 时按 Python 整数计算；只依赖 q' = 3、r' = 2 与 g 的奇偶
+    g = 1 << 40
+    assert_laws_close(build_mod_switching_error_law(3 * g, 2 * g), mod_switching_error_law(6, 4), rtol=0)
+    E = build_mod_switching_error_law(3 * g, 2 * g, exact=True)
+    assert E.denom == 6 and {E.lo + j: c for j, c in enumerate(E.counts)} == _dict_counts(6, 4)
+
+
+def _exact_error(x, q, rq):
+    # 用整数就近取整（取偶）逐点计算，不经过浮点
+    y = round(Fraction(rq * x, q))
+    return mod_centered(x - round(Fraction(q * y, rq)), q)
+
+
+@pytest.mark.parametrize("q, rq", [(8380417, 8380416), (8380417, 4194304), (3 * 1048576, 2 * 786432)])
+def test_counts_match_vectorised_loop(q, rq):
+    # r' ≫ 支撑时不再逐个遍历 y
+    x = np.arange(q, dtype=np.int64)
+    y = _round_div(rq * x, q)
+    d = x - _round_div(q * y, rq)
+    d = np.where(2 * (d % q) < q, d % q, d % q - q)
+    lo, counts = _mod_switching_error_counts(q, rq)
+    assert lo == d.min() and np.array_equal(counts, np.bincount(d - lo))
+
+
+@pytest.mark.parametrize("q, rq", [(2 ** 40 + 15, 2 ** 30), (2 ** 61 - 1, 2 ** 55), (3 * 2 ** 50, 2 ** 51)])
+def test_huge_moduli(q, rq):
+    lo, counts = _mod_switching_error_counts(q, rq)
+    assert counts.sum() == q and counts[0] > 0 and counts[-1] > 0
+    rng = random.Random(q)
+    for x in [0, q - 1, q // 2] + [rng.randrange(q) for _ in range(200)]:
+        assert 0 <= _exact_error(x, q, rq) - lo < len(counts)
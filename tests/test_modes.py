@@ -0,0 +1,39 @@
+import importlib
+from types import SimpleNamespace
+
+import pytest
+
+from failure.progress import NO_PROGRESS
+from failure.fft import DEFAULT_RTOL
+from failure.util import resolve_options, DEFAULT_PRUNE
+
+CASES = {
+    "LWE": dict(n=16, q=3329, ks=2, ke_pk=2, kr=2, ke=2, threshold=40),
+    "LWR": dict(n=16, q=8192, p=1024, ks=2, kr=2, threshold=120),
+    "RLWE_2n": dict(n=16, ks=2, ke=2, q=3329, rqc=1024, rq2=16, rqk=None, threshold=150),
+    "MLWE_2n": dict(n=16, m=2, ks=2, ke=2, ke_ct=None, q=3329, rqk=None, rqc=1024, rq2=16, threshold=120),
+    "RLWR": dict(n=16, q=8192, rqk=1024, rqc=1024, rq2=16, ks=2, kr=2, threshold=250),
+    "MLWR": dict(n=16, m=2, q=8192, rqk=1024, rqc=1024, rq2=16, ks=2, kr=2, threshold=300),
+}
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_modes_agree(name):
+    mod = importlib.import_module("failure." + name)
+    exact = float(mod.compute_failure_probability(mode="exact", **CASES[name]))
+    assert float(mod.compute_failure_probability(**CASES[name])) == pytest.approx(exact, abs=1e-9)
+    assert float(mod.compute_failure_probability(mode="log", **CASES[name])) == pytest.approx(exact, abs=1e-9)
+    assert float(mod.compute_failure_probability(mode="saddlepoint", **CASES[name])) == pytest.approx(exact, abs=1)
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_unknown_mode(name):
+    mod = importlib.import_module("failure." + name)
+    with pytest.raises(ValueError):
+        mod.compute_failure_probability(mode="bogus", **CASES[name])
+
+
+def test_resolve_options_defaults():
+    assert resolve_options(SimpleNamespace()) == ("auto", DEFAULT_PRUNE, NO_PROGRESS, DEFAULT_RTOL)
+    method, prune, _, rtol = resolve_options(SimpleNamespace(method="fft", prune=0.0, rtol=2.0 ** -30))
+    assert (method, prune, rtol) == ("fft", 0.0, 2.0 ** -30)
@@ -0,0 +1,37 @@
+import pytest
+
+from failure import ooc
+from failure.util import blocked_convolution, clean_dist, build_centered_binomial_law
+
+from baseline import law_convolution as dict_law_convolution, iter_law_convolution, as_dict, assert_laws_close
+
+A = iter_law_convolution(as_dict(build_centered_binomial_law(2)), 30)
+B = {-9: 0.25, -2: 0.25, 0: 0.25, 40: 0.25}
+
+
+@pytest.mark.parametrize("method", ["direct", "sparse", "auto"])
+def test_blocked_matches_dict(method, tmp_path):
+    # 块长 16：每个输入切成若干块
+    L = blocked_convolution(A, B, method, max_bytes=128 * 16, directory=tmp_path)
+    assert_laws_close(L, dict_law_convolution(A, B), rtol=1e-12)
+
+
+def test_output_stays_mapped_and_prunes_in_place(tmp_path, monkeypatch):
+    monkeypatch.setattr(ooc, "_SCAN_CHUNK", 7)
+    L = blocked_convolution(A, B, "direct", max_bytes=128, directory=tmp_path)
+    assert ooc.is_mapped(L.probs)
+    P = clean_dist(L, 1e-6)
+    D = {x: p for x, p in dict_law_convolution(A, B).items() if p > 1e-6}
+    assert_laws_close(P, D, rtol=1e-12)
+    assert P.dropped == pytest.approx(sum(dict_law_convolution(A, B).values()) - sum(D.values()), rel=1e-9)
+
+
+def test_scan_helpers(monkeypatch):
+    monkeypatch.setattr(ooc, "_SCAN_CHUNK", 3)
+    a = ooc.mapped_zeros(11)
+    assert ooc.nonzero_span(a) == (0, 0)
+    a[[2, 4, 8]] = [1e-9, 0.5, 1e-9]
+    assert ooc.nonzero_span(a) == (2, 9)
+    assert ooc.prune_inplace(a, 1e-6) == pytest.approx(2e-9)
+    assert ooc.nonzero_span(a) == (4, 5)
+    assert not ooc.is_mapped(ooc.load_if_fits(a, 1 << 10))
@@ -0,0 +1,66 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from failure.law import Law
+from failure.util import parallel_convolution, law_convolution, build_centered_binomial_law
+
+from baseline import law_convolution as dict_law_convolution, as_dict, assert_laws_close
+
+rng = np.random.default_rng(3)
+A = Law(-40, rng.random(101) / 101)
+B = Law(5, rng.random(17) / 17)
+S = build_centered_binomial_law(6)
+
+
+@pytest.mark.parametrize("workers", [1, 2, 3, 7, 200])
+@pytest.mark.parametrize("X, Y", [(A, B), (B, A), (S, S), (A, S)], ids=["AB", "BA", "SS", "AS"])
+def test_parallel_matches_direct_and_dict(workers, X, Y):
+    L = parallel_convolution(X, Y, workers)
+    D = law_convolution(X, Y, "direct")
+    assert L.err == D.err
+    assert np.allclose(L.probs, D.probs, rtol=1e-15, atol=0)
+    assert_laws_close(L, dict_law_convolution(as_dict(X), as_dict(Y)))
+
+
+def _count_multiply_adds(monkeypatch):
+    work = []
+    convolve = np.convolve
+
+    def counting(a, b, mode="full"):
+        work.append(len(a) * len(b))
+        return convolve(a, b, mode)
+
+    monkeypatch.setattr(np, "convolve", counting)
+    return work
+
+
+@pytest.mark.parametrize("workers", [1, 2, 8])
+def test_blocks_add_no_work(monkeypatch, workers):
+    # 重叠相加不补零：各块的乘加次数之和与一次完整卷积相同
+    work = _count_multiply_adds(monkeypatch)
+    parallel_convolution(A, B, workers)
+    assert sum(work) == len(A) * len(B)
+    work.clear()
+    H = build_centered_binomial_law(40)
+    parallel_convolution(H, S, workers)
+    assert sum(work) == (40 + 6 + 1) * len(S)
+
+
+@pytest.mark.skipif((os.cpu_count() or 1) < 4, reason="需要至少 4 个核")
+def test_latency_drops_with_workers():
+    rng = np.random.default_rng(4)
+    X, Y = Law(0, rng.random(40000)), Law(0, rng.random(40000))
+
+    def best(workers):
+        t = np.inf
+        for _ in range(3):
+            start = time.perf_counter()
+            parallel_convolution(X, Y, workers)
+            t = min(t, time.perf_counter() - start)
+        return t
+
+    t1, t2, t4 = best(1), best(2), best(4)
+    assert t2 < 0.75 * t1 and t4 < 0.5 * t1
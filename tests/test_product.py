@@ -0,0 +1,48 @@
+from itertools import product
+from math import gcd
+
+import numpy as np
+import pytest
+
+from failure.law import Law, SymmetricLaw
+from failure.util import law_product, _product_step, build_centered_binomial_law
+
+from baseline import law_product as dict_law_product, as_dict, assert_laws_close
+
+
+def _laws():
+    rng = np.random.default_rng(5)
+    for offset in (-7, -2, 0, 4):
+        for stride in (1, 3):
+            p = rng.random(6)
+            yield Law(offset, p / p.sum(), stride=stride)
+    yield build_centered_binomial_law(3)
+    yield SymmetricLaw([0.4, 0.2, 0.1], stride=2)
+
+
+LAWS = list(_laws())
+
+
+@pytest.mark.parametrize("A, B", list(product(LAWS[::3], LAWS[1::3])), ids=repr)
+def test_product_matches_dict(A, B):
+    assert_laws_close(law_product(A, B), dict_law_product(as_dict(A), as_dict(B)))
+
+
+def test_sparse_product_matches_dict():
+    # 输出范围远大于配对数：按稀疏支撑累加
+    A = {-3: 0.1, 0: 0.2, 1000: 0.3, 7919: 0.4}
+    B = {-1: 0.25, 2: 0.25, 997: 0.5}
+    assert_laws_close(law_product(A, B), dict_law_product(A, B))
+    S = SymmetricLaw(np.r_[0.2, np.zeros(999), 0.4])
+    assert_laws_close(law_product(S, B), dict_law_product(as_dict(S), B))
+
+
+@pytest.mark.parametrize("xa, xb", [([2, 6, 10], [3, 9]), ([-4, 0, 6], [5, 15, 35]), ([7], [-2, 4]), ([1, 2], [0, 3])])
+def test_product_step_is_pairwise_gcd(xa, xb):
+    xa, xb = np.array(xa), np.array(xb)
+    v = np.multiply.outer(xa, xb).ravel()
+    lo = int(v.min())
+    g = 0
+    for x in v.tolist():
+        g = gcd(g, x - lo)
+    assert _product_step(xa, xb, lo) == (g or 1)
@@ -0,0 +1,42 @@
+import logging
+
+import pytest
+
+from api import evaluate_performance
+from decryption_failure_calculator import compute_failure_probability, CANCELLED
+from failure.progress import CancelToken, Cancelled, Progress, NO_PROGRESS, as_progress
+from failure.LWE import compute_failure_probability as lwe
+
+LWE = dict(n=16, q=3329, ks=2, ke_pk=2, kr=2, ke=2, threshold=40)
+
+
+def test_no_progress_is_stateless(caplog):
+    with caplog.at_level(logging.DEBUG, logger="failure.progress"):
+        before = dict(vars(NO_PROGRESS))
+        NO_PROGRESS.update("terms", 1, 3)
+        NO_PROGRESS.update("powers", 0, 2)
+        assert vars(NO_PROGRESS) == before
+    assert as_progress() is NO_PROGRESS
+
+
+def test_events_reach_callback():
+    events = []
+    r = lwe(progress=events.append, **LWE)
+    assert events and events[-1].stage == "terms" and events[-1].fraction == 1.0
+    assert float(r) == lwe(**LWE)
+
+
+def test_cancelled_run_is_reported_separately():
+    token = CancelToken()
+    token.cancel()
+    with pytest.raises(Cancelled):
+        lwe(cancel=token, **LWE)
+    assert compute_failure_probability("LWE", LWE, cancel=token) == CANCELLED
+    text = evaluate_performance("LWE", list(LWE.values()), "正确性评估", cancel=token)
+    assert CANCELLED in text and "2^(" not in text
+
+
+def test_progress_keeps_cancel_token():
+    token = CancelToken()
+    p = as_progress(Progress(print), token)
+    assert p.cancel is token and p.callback is print
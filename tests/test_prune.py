@@ -0,0 +1,33 @@
+import math
+
+import pytest
+
+from failure.util import iter_law_convolution, sum_error_terms, failure_exponent, build_centered_binomial_law, law_product
+
+from baseline import law_convolution, iter_law_convolution as dict_iter_law_convolution, tail_probability, as_dict
+
+CBD = build_centered_binomial_law(2)
+PROD = law_product(CBD, build_centered_binomial_law(3))
+
+
+@pytest.mark.parametrize("prune", [2.0 ** -300, 2.0 ** -60, 2.0 ** -30])
+def test_dropped_mass_bounds_the_loss(prune):
+    D = dict_iter_law_convolution(as_dict(PROD), 20)
+    L = iter_law_convolution(PROD, 20, "direct", cache=False, prune=prune)
+    lost = sum(p for x, p in D.items() if L.get(x) == 0)
+    assert lost <= L.dropped * (1 + 1e-12)
+    assert L.mass() + L.dropped >= 1 - 1e-12
+    if prune == 2.0 ** -300:
+        assert L.dropped == 0
+
+
+@pytest.mark.parametrize("prune", [2.0 ** -300, 2.0 ** -40])
+def test_upper_covers_the_unpruned_tail(prune):
+    terms = [(PROD, 16), (CBD, 1)]
+    D = law_convolution(dict_iter_law_convolution(as_dict(PROD), 16), as_dict(CBD))
+    L = sum_error_terms(terms, "direct", prune)
+    for t in range(0, max(D), 7):
+        exact = math.log2(tail_probability(D, t))
+        r = failure_exponent(L, t, n=4)
+        assert r.upper >= exact + 2 - 1e-9
+        assert r.error == pytest.approx(r.upper - r)
@@ -0,0 +1,41 @@
+import pickle
+from math import log2
+
+import pytest
+
+from failure.saddlepoint import saddlepoint_failure_probability, saddlepoint_tail
+from failure.util import build_centered_binomial_law, law_product
+
+from baseline import iter_law_convolution, law_convolution, tail_probability, as_dict
+
+CBD = build_centered_binomial_law(2)
+PROD = law_product(CBD, build_centered_binomial_law(3))
+
+
+@pytest.mark.parametrize("terms", [[(CBD, 40)], [(PROD, 12), (CBD, 1)]], ids=["cbd", "product"])
+def test_upper_bounds_dict_tail(terms):
+    D = {0: 1.0}
+    for law, count in terms:
+        D = law_convolution(D, iter_law_convolution(as_dict(law), count))
+    for t in range(1, max(D), 3):
+        exact = log2(tail_probability(D, t))
+        r = saddlepoint_failure_probability(terms, t, n=4)
+        assert r.upper >= exact + 2 - 1e-9
+        assert r.chernoff_gap == pytest.approx(r.upper - r)
+        assert r.chernoff_gap >= 0
+        assert not hasattr(r, "error")
+        # 估计值只在支撑中部可靠，没有严格的误差界
+        if t < max(D) // 2:
+            assert float(r) == pytest.approx(exact + 2, abs=0.5)
+
+
+def test_beyond_support():
+    r = saddlepoint_failure_probability([(CBD, 3)], 6)
+    assert float(r) == r.upper == float("-inf") and r.chernoff_gap == 0
+    assert saddlepoint_tail([(CBD, 3)], 6)[:2] == (float("-inf"), float("-inf"))
+
+
+def test_pickle_keeps_the_gap():
+    r = saddlepoint_failure_probability([(CBD, 40)], 20, n=4)
+    s = pickle.loads(pickle.dumps(r))
+    assert (float(s), s.upper, s.chernoff_gap) == (float(r), r.upper, r.chernoff_gap)
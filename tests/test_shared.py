@@ -0,0 +1,43 @@
+import numpy as np
+
+from failure import executor
+from failure.law import Law, SymmetricLaw
+from failure.shared import SharedLaws, attach_laws
+from failure.util import build_centered_binomial_law, law_convolution
+
+from baseline import law_convolution as dict_law_convolution, as_dict, assert_laws_close
+
+LAWS = [Law(-3, [0.1, 0.2, 0.3, 0.4], err=1e-14, dropped=1e-20, stride=2),
+        SymmetricLaw([0.5, 0.25], stride=3),
+        build_centered_binomial_law(4),
+        Law(7, [1.0])]
+
+
+def _same(L, M):
+    assert type(L) is type(M)
+    assert (L.lo, L.stride, L.scale, L.err, L.dropped) == (M.lo, M.stride, M.scale, M.err, M.dropped)
+    assert np.array_equal(L.probs, M.probs)
+
+
+def test_attach_round_trip():
+    with SharedLaws(LAWS) as shared:
+        _, laws = attach_laws(shared.name, shared.spec)
+        for L, M in zip(LAWS, laws):
+            _same(L, M)
+        # 只挂接其中一部分
+        _, (M,) = attach_laws(shared.name, shared.spec[1:2])
+        _same(LAWS[1], M)
+
+
+def _convolve_shared(args):
+    name, spec = args
+    _, (A, B) = attach_laws(name, spec)
+    return as_dict(law_convolution(A, B))
+
+
+def test_workers_attach_and_match_dict():
+    with SharedLaws(LAWS) as shared:
+        pairs = [(0, 1), (1, 2), (2, 3), (0, 2)]
+        args = [(shared.name, [shared.spec[i], shared.spec[j]]) for i, j in pairs]
+        for (i, j), D in zip(pairs, executor.map_tasks(_convolve_shared, args, limit=2)):
+            assert_laws_close(D, dict_law_convolution(as_dict(LAWS[i]), as_dict(LAWS[j])))
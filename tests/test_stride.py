@@ -0,0 +1,43 @@
+import pytest
+
+from failure.law import Law
+from failure.util import law_convolution, law_product, iter_law_convolution, dist_scale
+
+from baseline import law_convolution as dict_law_convolution, law_product as dict_law_product
+from baseline import iter_law_convolution as dict_iter_law_convolution, as_dict, assert_laws_close
+
+EVEN = {-4: 0.2, 0: 0.5, 6: 0.3}
+THIRDS = {3: 0.25, 9: 0.5, 15: 0.25}
+POINT = {7: 1.0}
+
+
+def test_from_dict_compresses_the_lattice():
+    L = Law.from_dict(EVEN)
+    assert (L.offset, L.stride, len(L)) == (-4, 2, 6)
+    L = Law.from_dict(THIRDS)
+    assert (L.offset, L.stride, len(L)) == (3, 6, 3)
+
+
+@pytest.mark.parametrize("A, B, stride", [(EVEN, EVEN, 2), (EVEN, THIRDS, 2), (THIRDS, THIRDS, 6),
+                                          (THIRDS, POINT, 6), (POINT, POINT, 1)])
+@pytest.mark.parametrize("method", ["direct", "sparse", "fft"])
+def test_convolution_on_compressed_index(A, B, stride, method):
+    L = law_convolution(A, B, method)
+    assert L.stride == stride
+    assert_laws_close(L, dict_law_convolution(A, B), rtol=1e-9)
+
+
+def test_product_and_powers_keep_the_stride():
+    P = law_product(EVEN, THIRDS)
+    assert P.stride == 6
+    assert_laws_close(P, dict_law_product(EVEN, THIRDS))
+    L = iter_law_convolution(THIRDS, 7, "direct", cache=False)
+    assert L.stride == 6
+    assert_laws_close(L, dict_iter_law_convolution(THIRDS, 7), rtol=1e-11)
+
+
+def test_mixed_scales_align():
+    A = dist_scale(EVEN, 0.5)
+    L = law_convolution(A, THIRDS, "direct")
+    assert L.scale == 1 and L.stride == 1
+    assert_laws_close(L, dict_law_convolution(as_dict(A), THIRDS))
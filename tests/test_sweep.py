@@ -0,0 +1,69 @@
+import math
+
+import numpy as np
+import pytest
+
+from failure import MLWE_3n, RLWE_3n
+from failure.law import Law
+from failure.util import iter_power_sweep, build_centered_binomial_law
+
+from baseline import law_convolution, iter_law_convolution, quadratic_form, mixed_quadratic_form, as_dict
+from baseline import assert_laws_close
+
+CBD = build_centered_binomial_law(2)
+SKEW = Law(-1, [0.5, 0.2, 0.3])
+
+
+def _dict_tail(D, threshold):
+    return sum(p for x, p in D.items() if abs(x) > threshold)
+
+
+@pytest.mark.parametrize("A", [CBD, SKEW], ids=["cbd", "skew"])
+@pytest.mark.parametrize("step", [1, 3])
+def test_power_sweep_matches_dict_powers(A, step):
+    start = {-2: 0.5, 1: 0.5}
+    for j, L in enumerate(iter_power_sweep(A, step, 6, start=Law(-2, [0.5, 0, 0, 0.5]))):
+        assert_laws_close(L, law_convolution(start, iter_law_convolution(as_dict(A), j * step)), rtol=1e-10)
+
+
+def test_rlwe_3n_matches_dict_loop():
+    n, q = 12, 61
+    threshold = (q - 3) // 6
+    psi = as_dict(RLWE_3n.psi_1_law())
+    d1, d2 = quadratic_form(psi, psi), mixed_quadratic_form(psi, psi)
+    tails = [_dict_tail(law_convolution(iter_law_convolution(d1, 2 * i), iter_law_convolution(d2, n - 2 * i)),
+                        threshold) for i in range(n // 2)]
+    log_p_success = sum(math.log1p(-2 * t) for t in tails) + (n // 2) * math.log1p(-2 * tails[0])
+    assert RLWE_3n.compute_failure_probability(n=n, q=q, processes=1) == \
+        pytest.approx(math.log2(-log_p_success), rel=1e-9)
+
+
+def test_rlwe_3n_sweep_matches_dict_loop():
+    n, threshold = 12, 3
+    law1, law2 = RLWE_3n.build_table1(), RLWE_3n.build_table2()
+    d1, d2 = as_dict(law1), as_dict(law2)
+    expect = [_dict_tail(law_convolution(iter_law_convolution(d1, 2 * i), iter_law_convolution(d2, n - 2 * i)),
+                         threshold) for i in range(n // 2)]
+    tails = RLWE_3n._sweep_tails(law1, law2, n, threshold, processes=1)
+    assert np.allclose(tails, expect, rtol=1e-10, atol=0)
+
+
+def test_mlwe_3n_sweep_matches_dict_loop():
+    n, k, threshold = 8, 2, 6
+    U, V, D_lin = CBD, SKEW, Law(-1, [0.25, 0.5, 0.25])
+    dU, dV, dL = as_dict(U), as_dict(V), as_dict(D_lin)
+    expect = []
+    for i in range(n // 2):
+        D = law_convolution(iter_law_convolution(dU, i * k), iter_law_convolution(dV, (n // 2 - i) * k))
+        expect.append(_dict_tail(law_convolution(D, dL), threshold))
+    tails = MLWE_3n._sweep_tails(U, V, D_lin, n, k, threshold, processes=1)
+    assert np.allclose(tails, expect, rtol=1e-10, atol=0)
+
+
+def test_sweep_matches_fused():
+    params = dict(n=16, q=61, psi_1=1, threshold=9)
+    assert RLWE_3n.compute_failure_probability(method="sweep", processes=1, **params) == \
+        pytest.approx(RLWE_3n.compute_failure_probability(**params), rel=1e-9)
+    params = dict(n=8, q=257, k=2, threshold=20, psi_1=0.8, rqc=64, rq2=32)
+    assert MLWE_3n.compute_failure_probability(method="sweep", processes=1, **params) == \
+        pytest.approx(MLWE_3n.compute_failure_probability(**params), rel=1e-9)
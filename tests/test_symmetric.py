@@ -0,0 +1,50 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from failure.law import Law, SymmetricLaw, as_symmetric
+from failure.util import law_convolution, law_product, iter_law_convolution, clean_dist, build_centered_binomial_law
+
+from baseline import law_convolution as dict_law_convolution, law_product as dict_law_product
+from baseline import iter_law_convolution as dict_iter_law_convolution, as_dict, assert_laws_close
+
+S1 = build_centered_binomial_law(2)
+S2 = SymmetricLaw([0.4, 0.2, 0.0, 0.1], stride=2)
+SKEW = Law(-1, [0.2, 0.5, 0.3])
+
+
+def test_half_storage():
+    assert isinstance(S1, SymmetricLaw)
+    assert len(S1.half) == 3 and S1.offset == -2
+    assert np.array_equal(S1.probs, S1.probs[::-1])
+    assert pickle.loads(pickle.dumps(S2)).to_dict() == S2.to_dict()
+
+
+@pytest.mark.parametrize("A, B", [(S1, S1), (S1, S2), (S2, S2), (S1, SKEW)], ids=repr)
+def test_convolution_matches_dict(A, B):
+    L = law_convolution(A, B, "direct")
+    assert_laws_close(L, dict_law_convolution(as_dict(A), as_dict(B)))
+    assert isinstance(L, SymmetricLaw) == (isinstance(B, SymmetricLaw))
+
+
+@pytest.mark.parametrize("A, B", [(S1, S1), (S2, S1), (S1, SKEW), (SKEW, S2)], ids=repr)
+def test_product_matches_dict(A, B):
+    L = law_product(A, B)
+    assert_laws_close(L, dict_law_product(as_dict(A), as_dict(B)))
+    assert isinstance(L, SymmetricLaw)
+
+
+def test_powers_match_dict():
+    for i in (1, 5, 12):
+        L = iter_law_convolution(S2, i, "direct", cache=False)
+        assert isinstance(L, SymmetricLaw)
+        assert_laws_close(L, dict_iter_law_convolution(as_dict(S2), i), rtol=1e-11)
+
+
+def test_as_symmetric_and_prune():
+    A = as_symmetric(Law(-2, [0.1, 0.2, 0.4, 0.2, 0.1]))
+    assert isinstance(A, SymmetricLaw) and A.err == 0
+    assert not isinstance(as_symmetric(SKEW), SymmetricLaw)
+    P = clean_dist(SymmetricLaw([0.5, 0.25 - 2.0 ** -310, 2.0 ** -310]))
+    assert P.hi == 1 and P.dropped >= 2 * 2.0 ** -310
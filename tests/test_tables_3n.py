@@ -0,0 +1,44 @@
+import pytest
+
+from failure import MLWE_3n, RLWE_3n
+from failure.law import Law
+from failure.util import quadratic_form_law, build_discrete_gaussian_law
+
+from baseline import (quadratic_form, mixed_quadratic_form, law_convolution, mod_switching_error_law, as_dict,
+                      assert_laws_close)
+
+A = {-2: 0.1, 0: 0.3, 1: 0.2, 5: 0.4}
+B = {-3: 0.25, -1: 0.25, 4: 0.5}
+
+
+@pytest.mark.parametrize("X, Y", [(A, B), (B, A), (A, A)], ids=["AB", "BA", "AA"])
+def test_quadratic_form_matches_dict(X, Y):
+    assert_laws_close(quadratic_form_law(X, Y), quadratic_form(X, Y))
+    assert_laws_close(quadratic_form_law(X, Y, mixed=True), mixed_quadratic_form(X, Y))
+
+
+def test_quadratic_form_strided():
+    X, Y = Law(-4, [0.1, 0.2, 0.3, 0.4], stride=2), Law(3, [0.5, 0.5], stride=3)
+    assert_laws_close(quadratic_form_law(X, Y), quadratic_form(as_dict(X), as_dict(Y)))
+    assert_laws_close(quadratic_form_law(X, Y, mixed=True), mixed_quadratic_form(as_dict(X), as_dict(Y)))
+
+
+def test_rlwe_3n_tables_match_dict():
+    psi = as_dict(RLWE_3n.psi_1_law())
+    assert_laws_close(RLWE_3n.build_table1(), quadratic_form(psi, psi))
+    assert_laws_close(RLWE_3n.build_table2(), mixed_quadratic_form(psi, psi))
+
+
+@pytest.mark.parametrize("sigma", [0.5, 1.0])
+def test_mlwe_3n_re_tables_match_dict(sigma):
+    g = as_dict(build_discrete_gaussian_law(sigma))
+    assert_laws_close(MLWE_3n.build_re_table1(sigma), quadratic_form(g, g), rtol=1e-11)
+    assert_laws_close(MLWE_3n.build_re_table2(sigma), mixed_quadratic_form(g, g), rtol=1e-11)
+
+
+@pytest.mark.parametrize("sigma, q, rq", [(0.5, 12, 4), (0.8, 20, 8)])
+def test_mlwe_3n_se_tables_match_dict(sigma, q, rq):
+    g = as_dict(build_discrete_gaussian_law(sigma))
+    Re = law_convolution(g, mod_switching_error_law(q, rq))
+    assert_laws_close(MLWE_3n.build_se_table1(sigma, q, rq), quadratic_form(g, Re), rtol=1e-11)
+    assert_laws_close(MLWE_3n.build_se_table2(sigma, q, rq), mixed_quadratic_form(g, Re), rtol=1e-11)
@@ -0,0 +1,65 @@
+import math
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from failure.law import Law, SymmetricLaw, MAX_SCALE
+from failure.loglaw import log_tail_probability, log_dist_scale
+from failure.util import dist_scale, tail_probability, tail_curve, build_centered_binomial_law
+
+from baseline import tail_probability as dict_tail_probability
+
+
+def _random_laws():
+    rng = np.random.default_rng(8)
+    for offset in (-9, -4, 0, 3):
+        for stride in (1, 2, 3):
+            p = rng.random(7)
+            yield Law(offset, p / p.sum(), stride=stride)
+    yield build_centered_binomial_law(3)
+    yield SymmetricLaw([0.4, 0.2, 0.1], stride=2)
+
+
+@pytest.mark.parametrize("L", list(_random_laws()), ids=repr)
+def test_tail_probability_matches_dict(L):
+    D = L.to_dict()
+    for t in range(-2, max(D) + 2):
+        assert tail_probability(L, t) == pytest.approx(dict_tail_probability(D, t), rel=1e-12, abs=0)
+
+
+@pytest.mark.parametrize("L", list(_random_laws()), ids=repr)
+def test_tail_curve_matches_tail_probability(L):
+    t, p = tail_curve(L)
+    assert t[0] == 0 and t[-1] == max(0, L.hi)
+    for tj, pj in zip(t, p):
+        assert pj == pytest.approx(tail_probability(L, tj), rel=1e-12, abs=0)
+
+
+@pytest.mark.parametrize("L", list(_random_laws()), ids=repr)
+def test_log_tail_matches_tail(L):
+    for t in range(0, L.hi):
+        assert math.exp(log_tail_probability(L, t)) == pytest.approx(tail_probability(L, t), rel=1e-12)
+
+
+def test_scaled_law_tails_walk_the_support():
+    # 1/3 取分母不超过 MAX_SCALE 的最近有理数，尾概率只遍历支撑格点
+    L = dist_scale(build_centered_binomial_law(2), 1 / 3)
+    assert L.scale == 3
+    assert tail_probability(L, 0.2) == pytest.approx(2 * 4 / 16)
+    t, p = tail_curve(L)
+    assert np.allclose(t, [0, 1 / 3, 2 / 3])
+    assert math.exp(log_tail_probability(log_dist_scale(L, 1), 0.2)) == pytest.approx(8 / 16)
+
+
+def test_dist_scale_matches_dict_keys():
+    A = build_centered_binomial_law(2)
+    L = dist_scale(A, 0.1)
+    assert dict(L.items()) == pytest.approx({x / 10: p for x, p in A.items()})
+    assert dict(dist_scale(A, Fraction(-3, 2)).items()) == pytest.approx({x * -1.5: p for x, p in A.items()})
+
+
+def test_dist_scale_rejects_huge_scale():
+    A = build_centered_binomial_law(2)
+    with pytest.raises(ValueError):
+        dist_scale(A, Fraction(1, 10 * MAX_SCALE + 1))
@@ -0,0 +1,36 @@
+import pytest
+
+from failure.fft import tilted_convolution
+from failure.util import law_convolution_fft, build_centered_binomial_law
+
+from baseline import law_convolution as dict_law_convolution, iter_law_convolution, as_dict
+
+CBD = as_dict(build_centered_binomial_law(2))
+A = iter_law_convolution(CBD, 40)          # 尾部约 2^-160
+B = iter_law_convolution(CBD, 25)
+
+
+@pytest.mark.parametrize("rtol", [2.0 ** -20, 2.0 ** -40])
+def test_tail_relative_error_matches_dict(rtol):
+    D = dict_law_convolution(A, B)
+    L = tilted_convolution(A, B, rtol)
+    # 2^-40 接近 exp / log 缩放的舍入下限，达不到时 err 如实给出
+    if rtol >= 2.0 ** -20:
+        assert L.err <= rtol
+    assert min(D.values()) < 2.0 ** -200
+    for x, p in D.items():
+        assert abs(L.get(x) - p) <= L.err * p, x
+
+
+def test_self_convolution():
+    D = dict_law_convolution(A, A)
+    L = tilted_convolution(A, A)
+    for x, p in D.items():
+        assert abs(L.get(x) - p) <= L.err * p, x
+
+
+def test_plain_fft_loses_the_tail():
+    # 对照：普通 FFT 在 1e-16 以下只剩舍入噪声
+    L = law_convolution_fft(A, B, eps=0)
+    x = max(dict_law_convolution(A, B))
+    assert abs(L.get(x) - dict_law_convolution(A, B)[x]) > 1e-20 or L.get(x) == 0